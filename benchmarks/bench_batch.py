@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Benchmark: per-payload obfuscate() calls vs. batched obfuscate_batch().
+
+Usage: python3 benchmarks/bench_batch.py [payload_count]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import techniques  # noqa: F401  (triggers registration)
+from core.engine import ObfuscationEngine
+from techniques.base import BaseTechnique, get_techniques_by_category
+
+SAMPLES = [
+    "<script>alert('xss')</script>",
+    "' UNION SELECT NULL,NULL,NULL--",
+    "<img src=x onerror=alert(1)>",
+    "; cat /etc/passwd",
+    "{{7*7}}",
+]
+
+
+def _best_of(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    payloads = [f"{SAMPLES[i % len(SAMPLES)]}{i}" for i in range(count)]
+
+    print(f"{count} payloads, best of 5\n")
+    print(f"{'technique':<22}{'loop (s)':>12}{'batch (s)':>12}{'speedup':>10}")
+    loop_total = batch_total = 0.0
+    for category in ("encoding", "structural", "context"):
+        for t in get_techniques_by_category(category):
+            loop = _best_of(lambda: BaseTechnique.obfuscate_batch(t, payloads))
+            batch = _best_of(lambda: t.obfuscate_batch(payloads))
+            if category == "encoding":
+                loop_total += loop
+                batch_total += batch
+            print(f"{t.name:<22}{loop:>12.4f}{batch:>12.4f}{loop / batch:>9.2f}x")
+    print(f"\n{'encoding stage':<22}{loop_total:>12.4f}{batch_total:>12.4f}"
+          f"{loop_total / batch_total:>9.2f}x")
+
+    engine = ObfuscationEngine(multiplier=5)
+    print(f"\n{'engine batch_size':<22}{'time (s)':>12}{'payloads/s':>12}")
+    for batch_size in (1, 16, 256):
+        elapsed = _best_of(lambda: sum(1 for _ in engine.process_stream(payloads, batch_size)), 3)
+        print(f"{batch_size:<22}{elapsed:>12.4f}{count / elapsed:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
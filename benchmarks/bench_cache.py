@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Benchmark: deterministic-variant cache on duplicate-heavy and duplicate-free input.
+
+The cache only pays off when payloads repeat; on unique input every lookup
+misses, which is why it is off by default (--cache-size 0).
+
+Usage: python3 benchmarks/bench_cache.py [payload_count] [unique_fraction]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import techniques  # noqa: F401  (triggers registration)
+from core.engine import ObfuscationEngine
+
+
+def run(title: str, payloads) -> None:
+    print(f"{title}: {len(payloads)} payloads, {len(set(payloads))} unique\n")
+    print(f"{'cache':<10}{'time (s)':>10}{'calls':>10}{'hits':>10}{'misses':>10}{'evictions':>11}")
+    for label, cache_bytes in (("off", 0), ("1 MB", 1 << 20), ("64 MB", 64 << 20)):
+        best = None
+        for _ in range(3):
+            engine = ObfuscationEngine(multiplier=10, cache_bytes=cache_bytes, seed=0)
+            start = time.perf_counter()
+            for _ in engine.process_stream(payloads):
+                pass
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        stats = engine.stats
+        print(f"{label:<10}{best:>10.3f}{stats['technique_calls']:>10}{stats['cache_hits']:>10}"
+              f"{stats['cache_misses']:>10}{stats['cache_evictions']:>11}")
+    print()
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    unique_fraction = float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+    rnd = random.Random(0)
+    uniques = [f"<svg onload=alert('{i}')>" * 8 for i in range(max(1, int(count * unique_fraction)))]
+    run("duplicate-heavy", [rnd.choice(uniques) for _ in range(count)])
+    run("duplicate-free", [f"<script>alert('{i}')</script>" for i in range(count)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Benchmark: compressed output, inline vs on the compressor thread.
+
+Runs the engine and a jsonl writer end to end, so obfuscation and
+compression compete for (or overlap on) the CPU as they do in poe.py.
+
+Usage: python3 benchmarks/bench_compress.py [payload_count]
+"""
+
+import bz2
+import gzip
+import lzma
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import techniques  # noqa: F401  (triggers registration)
+from core.compression import DEFAULT_LEVELS
+from core.engine import ObfuscationEngine
+from core.output_handler import open_writer
+
+INLINE = {
+    "gzip": lambda path, level: gzip.open(path, "wt", encoding="utf-8", compresslevel=level),
+    "bz2": lambda path, level: bz2.open(path, "wt", encoding="utf-8", compresslevel=level),
+    "xz": lambda path, level: lzma.open(path, "wt", encoding="utf-8", preset=level),
+}
+
+
+def run(count: int, path: str, method=None, inline=False) -> float:
+    engine = ObfuscationEngine(multiplier=10, seed=0)
+    payloads = (f"<svg/onload=alert('{i}')>" for i in range(count))
+    start = time.perf_counter()
+    if inline:
+        writer = open_writer("jsonl", path)
+        writer.fh.close()
+        writer.fh = INLINE[method](path, DEFAULT_LEVELS[method])
+    else:
+        writer = open_writer("jsonl", path, compress=method)
+    for result in engine.process_stream(payloads):
+        writer.write(result)
+    writer.close()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    fd, path = tempfile.mkstemp()
+    os.close(fd)
+    try:
+        base = run(count, path)
+        raw = os.path.getsize(path)
+        print(f"{count} payloads, {raw / 1e6:.1f} MB uncompressed jsonl\n")
+        print(f"{'output':<20}{'time (s)':>10}{'MB/s':>10}{'size (MB)':>11}{'vs raw':>9}")
+        print(f"{'uncompressed':<20}{base:>10.2f}{raw / base / 1e6:>10.1f}{raw / 1e6:>11.1f}{'':>9}")
+        for method in ("gzip", "bz2", "xz"):
+            for inline in (True, False):
+                elapsed = run(count, path, method, inline)
+                label = f"{method} {'inline' if inline else 'thread'}"
+                size = os.path.getsize(path)
+                print(f"{label:<20}{elapsed:>10.2f}{raw / elapsed / 1e6:>10.1f}"
+                      f"{size / 1e6:>11.1f}{elapsed / base:>8.2f}x")
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
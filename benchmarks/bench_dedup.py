@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Benchmark: --global-dedup cost, exact digest set vs Bloom filter.
+
+Runs the engine over a corpus where every payload appears in several case
+variants (so case mutations collide across payloads), without dedup, with
+the exact digest set and with a budget small enough to force the Bloom
+filter; reports time, dropped variants and the measured false-positive
+rate against the exact run.
+
+Usage: python3 benchmarks/bench_dedup.py [payload_count] [multiplier]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import techniques  # noqa: F401  (triggers registration)
+from core.dedup import GlobalDedup
+from core.engine import ObfuscationEngine
+
+
+def run(payloads, multiplier: int, dedup_bytes: int):
+    engine = ObfuscationEngine(multiplier=multiplier, seed=0, cache_bytes=0, dedup_bytes=dedup_bytes)
+    start = time.perf_counter()
+    kept = set()
+    count = 0
+    for results in engine.iter_results(iter(payloads)):
+        kept.update(results.variants)
+        count += len(results)
+    return time.perf_counter() - start, count, kept, engine
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    multiplier = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    base = [f"<script>alert('{i}')</script>" for i in range(count // 4)]
+    payloads = [p for b in base for p in (b, b.upper(), b.title(), b.swapcase())]
+    print(f"{len(payloads)} payloads, -m {multiplier}\n")
+    print(f"{'mode':<22}{'time (s)':>10}{'written':>10}{'dropped':>10}{'memory MB':>11}{'FP rate':>10}")
+
+    elapsed, written, _, _ = run(payloads, multiplier, 0)
+    print(f"{'off':<22}{elapsed:>10.2f}{written:>10}{0:>10}{0:>11.1f}{'-':>10}")
+    exact_kept = None
+    for label, budget in (("exact (64 MB)", 64 << 20), ("bloom (256 KB budget)", 256 << 10)):
+        elapsed, written, kept, engine = run(payloads, multiplier, budget)
+        dedup: GlobalDedup = engine.dedup
+        if exact_kept is None:
+            exact_kept, fp = kept, "-"
+        else:
+            fp = f"{len(exact_kept - kept) / len(exact_kept):.5f}"
+        print(
+            f"{label:<22}{elapsed:>10.2f}{written:>10}{engine.stats['dedup_dropped']:>10}"
+            f"{dedup.nbytes / 1e6:>11.1f}{fp:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
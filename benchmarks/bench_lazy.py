@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""Benchmark: lazy iter_variants() consumption vs. eager list building.
+
+The eager baseline materialises every generator into a list before the
+engine sees it, which is what obfuscate() used to do.
+
+Usage: python3 benchmarks/bench_lazy.py [payload_count]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import techniques  # noqa: F401  (triggers registration)
+from core.engine import ObfuscationEngine
+
+TECHNIQUES = ["random_case", "alternating_case", "string_concat"]
+
+
+def _run(engine: ObfuscationEngine, payloads, eager: bool) -> float:
+    for t in engine.techniques:
+        if eager:
+            t.iter_variants = lambda p, t=t: iter(list(type(t).iter_variants(t, p)))
+        else:
+            t.__dict__.pop("iter_variants", None)
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in engine.process_stream(payloads):
+            pass
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    payloads = [f"<script>alert('xss{i}')</script>" * 4 for i in range(count)]
+    print(f"{count} payloads, techniques: {', '.join(TECHNIQUES)}\n")
+    print(f"{'multiplier':<12}{'eager (s)':>12}{'lazy (s)':>12}{'speedup':>10}")
+    for multiplier in (1, 2, 3, 5):
+        engine = ObfuscationEngine(multiplier=multiplier, technique_names=TECHNIQUES)
+        eager = _run(engine, payloads, eager=True)
+        lazy = _run(engine, payloads, eager=False)
+        print(f"{multiplier:<12}{eager:>12.4f}{lazy:>12.4f}{eager / lazy:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Benchmark: bulk-bit / translation-table mutation vs per-character loops.
+
+Times random_case, alternating_case, homoglyph and zero_width against the
+per-character implementations they replaced, on payloads from 10 B to
+1 MB, and reports microseconds per call and the speedup.
+
+Usage: python3 benchmarks/bench_mutation.py [max_seconds_per_case]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import techniques  # noqa: F401  (triggers registration)
+from techniques.base import PayloadContext, get_technique_by_name
+
+SIZES = [10, 100, 1_000, 10_000, 100_000, 1_000_000]
+HOMOGLYPHS = get_technique_by_name("homoglyph").HOMOGLYPHS
+ZWSP = get_technique_by_name("zero_width").ZWSP
+
+
+def previous_random_case(payload, ctx):
+    out = []
+    for _ in range(3):
+        variant = "".join(c.upper() if ctx.rng.random() > 0.5 else c.lower() for c in payload)
+        if variant != payload:
+            out.append(variant)
+    return out
+
+
+def previous_alternating_case(payload, ctx):
+    v1 = "".join(c.upper() if i % 2 == 0 else c.lower() for i, c in enumerate(payload))
+    v2 = "".join(c.lower() if i % 2 == 0 else c.upper() for i, c in enumerate(payload))
+    return [v for v in (v1, v2) if v != payload]
+
+
+def previous_homoglyph(payload, ctx):
+    return ["".join(HOMOGLYPHS.get(c, c) for c in payload)]
+
+
+def previous_zero_width(payload, ctx):
+    return [ZWSP.join(list(payload))]
+
+
+PREVIOUS = {
+    "random_case": previous_random_case,
+    "alternating_case": previous_alternating_case,
+    "homoglyph": previous_homoglyph,
+    "zero_width": previous_zero_width,
+}
+
+
+def current(name):
+    technique = get_technique_by_name(name)
+
+    def run(payload, ctx):
+        return list(technique.iter_variants(payload, ctx))
+    return run
+
+
+def per_call(fn, payload, budget: float) -> float:
+    ctx = PayloadContext(payload, random.Random(0))
+    calls, start = 0, time.perf_counter()
+    while True:
+        fn(payload, ctx)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= budget:
+            return elapsed / calls * 1e6
+
+
+def main() -> None:
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else 0.2
+    base = "<script>alert(document.cookie)</script> "
+    print(f"{'technique':<18}{'size':>10}{'previous (us)':>16}{'current (us)':>16}{'speedup':>10}")
+    for name, previous in PREVIOUS.items():
+        now = current(name)
+        for size in SIZES:
+            payload = (base * (size // len(base) + 1))[:size]
+            before = per_call(previous, payload, budget)
+            after = per_call(now, payload, budget)
+            print(f"{name:<18}{size:>10,}{before:>16,.1f}{after:>16,.1f}{before / after:>9.1f}x")
+        print()
+
+
+if __name__ == "__main__":
+    main()
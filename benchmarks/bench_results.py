@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Benchmark: PayloadResults arrays vs one 4-tuple per variant.
+
+Each mode runs in its own process so peak RSS is comparable:
+  hold-tuples / hold-arrays    keep every result of the corpus in memory
+  stream-tuples / stream-arrays  process_stream() + write() per tuple vs
+                                 iter_results() + write_results() per payload
+
+Usage: python3 benchmarks/bench_results.py [payload_count] [multiplier]
+"""
+
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MODES = ("hold-tuples", "hold-arrays", "stream-tuples", "stream-arrays")
+
+
+def run(mode: str, count: int, multiplier: int) -> None:
+    import techniques  # noqa: F401  (triggers registration)
+    from core.engine import ObfuscationEngine
+    from core.output_handler import open_writer
+
+    engine = ObfuscationEngine(multiplier=multiplier, seed=0, cache_bytes=0)
+    payloads = (f"<img src=x onerror=alert('{i}')>" for i in range(count))
+    tracemalloc.start()
+    start = time.perf_counter()
+    if mode == "hold-tuples":
+        held = [list(results) for results in engine.iter_results(payloads)]
+    elif mode == "hold-arrays":
+        held = list(engine.iter_results(payloads))
+    else:
+        writer = open_writer("jsonl", os.devnull, timestamp="run")
+        if mode == "stream-tuples":
+            for result in engine.process_stream(payloads):
+                writer.write(result)
+        else:
+            for results in engine.iter_results(payloads):
+                writer.write_results(results)
+        writer.close()
+        held = None
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{mode:<16}{elapsed:>9.2f}{current / 1e6:>14.1f}{peak / 1e6:>12.1f}{rss_kb / 1024:>14.1f}")
+    del held
+
+
+def main() -> None:
+    if len(sys.argv) > 1 and sys.argv[1] in MODES:
+        run(sys.argv[1], int(sys.argv[2]), int(sys.argv[3]))
+        return
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    multiplier = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    print(f"{count} payloads, -m {multiplier}\n")
+    print(f"{'mode':<16}{'time (s)':>9}{'retained MB':>14}{'peak MB':>12}{'peak RSS MB':>14}")
+    for mode in MODES:
+        subprocess.run(
+            [sys.executable, "-X", "tracemalloc=0", __file__, mode, str(count), str(multiplier)],
+            check=True, stderr=subprocess.DEVNULL,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Benchmark: uniform round-2 retries vs. the adaptive scheduler.
+
+The uniform baseline reproduces the old behaviour: every candidate
+(deterministic or not) stays in the retry pool and is drawn with equal
+probability until max_retries.
+
+Usage: python3 benchmarks/bench_scheduler.py [payload_count]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import techniques  # noqa: F401  (triggers registration)
+import core.engine
+from core.engine import ObfuscationEngine
+from core.scheduler import AdaptiveScheduler
+
+
+class UniformScheduler(AdaptiveScheduler):
+    def retry_pool(self, candidates):
+        return list(candidates)
+
+    def pick(self, pool, rng=random):
+        return rng.choice(pool)
+
+
+# A mostly-deterministic set where round 1 cannot reach the multiplier alone
+TECHNIQUES = ["base64", "url_encode", "hex_encode", "html_entity_hex", "random_case", "string_concat"]
+
+
+def _run(multiplier: int, payloads, uniform: bool):
+    engine = ObfuscationEngine(multiplier=multiplier, technique_names=TECHNIQUES)
+    saved = core.engine.MAX_STALE_RETRIES
+    if uniform:
+        engine.scheduler = UniformScheduler()
+        core.engine.MAX_STALE_RETRIES = float("inf")
+    try:
+        start = time.perf_counter()
+        produced = sum(1 for _ in engine.process_stream(payloads))
+        elapsed = time.perf_counter() - start
+    finally:
+        core.engine.MAX_STALE_RETRIES = saved
+    return engine.stats["technique_calls"], produced, elapsed
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    random.seed(0)
+    payloads = [f"<script>alert('xss{i}')</script>" for i in range(count)]
+    print(f"{count} payloads, techniques: {', '.join(TECHNIQUES)}\n")
+    print(f"{'multiplier':<12}{'scheduler':<11}{'calls':>10}{'variants':>10}{'time (s)':>10}")
+    for multiplier in (5, 10, 20):
+        for uniform in (True, False):
+            calls, produced, elapsed = _run(multiplier, payloads, uniform)
+            label = "uniform" if uniform else "adaptive"
+            print(f"{multiplier:<12}{label:<11}{calls:>10}{produced:>10}{elapsed:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Benchmark: --store cold and warm runs against a run without the store.
+
+Seeded runs store only the deterministic output round 1 computes, so a cold
+run costs the same technique calls as no store plus the SQLite writes.
+Unseeded runs store every applicable deterministic technique up front.
+
+Usage: python3 benchmarks/bench_store.py [payload_count] [multiplier]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import techniques  # noqa: F401  (triggers registration)
+from core.engine import ObfuscationEngine
+
+
+def timed(payloads, multiplier: int, seed, store_path=None):
+    engine = ObfuscationEngine(multiplier=multiplier, seed=seed, store_path=store_path)
+    start = time.perf_counter()
+    for _ in engine.process_stream(iter(payloads)):
+        pass
+    engine.close()
+    return time.perf_counter() - start, engine.stats
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    multiplier = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    payloads = [f"<script>alert('{i}')</script>" for i in range(count)]
+    print(f"{count} payloads, -m {multiplier}\n")
+    print(f"{'run':<22}{'time (s)':>10}{'calls':>10}{'reused':>10}{'computed':>10}")
+    for seed in (1, None):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "variants.db")
+            runs = [
+                ("no store", None), ("store, cold", path), ("store, warm", path),
+            ]
+            for label, store_path in runs:
+                elapsed, stats = timed(payloads, multiplier, seed, store_path)
+                title = f"{label} ({'seeded' if seed is not None else 'unseeded'})"
+                print(f"{title:<22}{elapsed:>10.3f}{stats['technique_calls']:>10}"
+                      f"{stats['store_reused']:>10}{stats['store_computed']:>10}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
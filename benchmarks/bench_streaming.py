@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Benchmark: streamed vs in-memory encoding of very large payloads.
+
+Runs the encoders that can stream (-m 20, so every form is produced) over
+one payload of each size, writing text and JSON Lines to a temporary
+file, with and without --stream-threshold. Reports the peak memory
+allocated beyond the payload itself (tracemalloc, separate run) and the
+time per payload.
+
+Usage: python3 benchmarks/bench_streaming.py [max_megabytes]
+"""
+
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import techniques  # noqa: F401  (triggers registration)
+from core.engine import ObfuscationEngine
+from core.output_handler import open_writer
+from techniques.base import get_all_techniques
+
+STREAMABLE = [name for name, t in get_all_techniques().items() if t.is_streamable]
+
+
+def run(payload: str, fmt: str, path: str, stream_threshold: int) -> None:
+    engine = ObfuscationEngine(
+        multiplier=20, technique_names=STREAMABLE, seed=0, stream_threshold=stream_threshold,
+    )
+    writer = open_writer(fmt, path)
+    try:
+        for results in engine.iter_results(iter([payload])):
+            writer.write_results(results)
+    finally:
+        writer.close()
+
+
+def measure(payload: str, fmt: str, path: str, stream_threshold: int):
+    start = time.perf_counter()
+    run(payload, fmt, path, stream_threshold)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    run(payload, fmt, path, stream_threshold)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main() -> None:
+    max_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    # -m 20 is more than the encoders' forms, so every run would warn
+    logging.disable(logging.WARNING)
+    rng = random.Random(0)
+    alphabet = "abcdefghijklmnopqrstuvwxyz <>/='\"()é"
+    sizes = [mb for mb in (1, 4, 16, 64) if mb <= max_mb]
+    print(f"techniques: {', '.join(STREAMABLE)}\n")
+    print(f"{'format':<8}{'payload':>10}{'mode':>10}{'time (s)':>10}{'peak (MB)':>12}{'peak/payload':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "out")
+        for mb in sizes:
+            payload = "".join(rng.choices(alphabet, k=mb << 20))
+            for fmt in ("text", "jsonl"):
+                for mode, threshold in (("memory", 0), ("streamed", 1 << 20)):
+                    elapsed, peak = measure(payload, fmt, path, threshold)
+                    print(
+                        f"{fmt:<8}{mb:>8} MB{mode:>10}{elapsed:>10.2f}{peak / 1e6:>12.1f}"
+                        f"{peak / len(payload):>13.1f}x"
+                    )
+            print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Benchmark: JSON serialization, per-record json.dumps vs the buffered fast path.
+
+Usage: python3 benchmarks/bench_writers.py [record_count]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import techniques  # noqa: F401  (triggers registration)
+from core.engine import ObfuscationEngine
+from core.output_handler import open_writer
+
+
+def dumps_writer(results, path: str) -> None:
+    """The previous writer: a dict, json.dumps and a fresh timestamp per record."""
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write("[\n")
+        for i, (original, obfuscated, technique, category) in enumerate(results):
+            if i:
+                fh.write(",\n")
+            entry = {
+                "original": original,
+                "obfuscated": obfuscated,
+                "technique": technique,
+                "technique_category": category,
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+            }
+            fh.write("  " + json.dumps(entry, ensure_ascii=False))
+        fh.write("\n]\n")
+
+
+def fast_writer(fmt: str, timestamp: str):
+    def run(results, path: str) -> None:
+        writer = open_writer(fmt, path, timestamp=timestamp)
+        for result in results:
+            writer.write(result)
+        writer.close()
+    return run
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    engine = ObfuscationEngine(multiplier=10, seed=0)
+    payloads = (f"<svg/onload=alert('{i}')>" for i in range(count // 10))
+    results = list(engine.process_stream(payloads))
+    fd, path = tempfile.mkstemp()
+    os.close(fd)
+
+    print(f"{len(results)} records\n")
+    print(f"{'writer':<24}{'time (s)':>10}{'records/s':>14}")
+    try:
+        for label, write in (
+            ("json.dumps (previous)", dumps_writer),
+            ("json, batch timestamp", fast_writer("json", "batch")),
+            ("json, run timestamp", fast_writer("json", "run")),
+            ("jsonl, batch timestamp", fast_writer("jsonl", "batch")),
+        ):
+            start = time.perf_counter()
+            write(results, path)
+            elapsed = time.perf_counter() - start
+            print(f"{label:<24}{elapsed:>10.3f}{len(results) / elapsed:>14,.0f}")
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Periodic checkpoints so long runs can be resumed after being killed."""
+
+import json
+import logging
+import os
+import random
+from collections import deque
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from core.output_handler import TextWriter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_EVERY = 10000
+
+
+def checkpoint_path(output_path: str) -> str:
+    return output_path + ".ckpt"
+
+
+def load_checkpoint(output_path: str) -> Dict[str, Any]:
+    """Read the checkpoint for output_path, or raise ValueError if there is none."""
+    path = checkpoint_path(output_path)
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        raise ValueError(f"No checkpoint to resume from: {path}")
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Corrupt checkpoint {path}: {e}")
+
+
+def truncate_output(output_path: str, state: Dict[str, Any]) -> None:
+    """Cut the output back to the last consistent checkpoint."""
+    size = os.path.getsize(output_path)
+    offset = state["output_offset"]
+    if size < offset:
+        raise ValueError(
+            f"Output {output_path} is shorter ({size} bytes) than its checkpoint ({offset} bytes)"
+        )
+    with open(output_path, "r+b") as fh:
+        fh.truncate(offset)
+
+
+def restore_rng(state: Dict[str, Any]) -> None:
+    """Restore the global RNG (only relevant to unseeded runs)."""
+    version, internal, gauss_next = state["rng_state"]
+    random.setstate((version, tuple(internal), gauss_next))
+
+
+class Checkpointer:
+    """
+    Tracks input and output byte offsets at payload boundaries and writes a
+    checkpoint every `every` payloads.
+
+    track() wraps the (offset, payload) input stream; the engine calls
+    payload_done() once all of a payload's results have been handed to the
+    writer, in input order.
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        writer: TextWriter,
+        every: int = DEFAULT_CHECKPOINT_EVERY,
+        state: Optional[Dict[str, Any]] = None,
+        scheduler=None,
+    ):
+        self.path = checkpoint_path(output_path)
+        self.writer = writer
+        self.every = every
+        self.scheduler = scheduler
+        self.input_offset = state["input_offset"] if state else 0
+        self.payloads = state["payloads"] if state else 0
+        self._pending: deque = deque()
+
+    def track(self, source: Iterator[Tuple[int, str]]) -> Iterator[str]:
+        for offset, payload in source:
+            self._pending.append(offset)
+            yield payload
+
+    def payload_done(self) -> None:
+        self.input_offset = self._pending.popleft()
+        self.payloads += 1
+        if self.every and self.payloads % self.every == 0:
+            self.save()
+
+    def save(self) -> None:
+        state = {
+            "format": self.writer.format,
+            "input_offset": self.input_offset,
+            "output_offset": self.writer.tell(),
+            "payloads": self.payloads,
+            "records": self.writer.count,
+            "rng_state": random.getstate(),
+        }
+        if self.scheduler is not None:
+            state["scheduler"] = {"calls": self.scheduler.calls, "hits": self.scheduler.hits}
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(state, fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, self.path)
+        logger.debug("Checkpoint: %d payloads, %d records", self.payloads, self.writer.count)
+
+    def remove(self) -> None:
+        """Drop the checkpoint (and any half-written one) once the run has completed."""
+        for path in (self.path, self.path + ".tmp"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
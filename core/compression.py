@@ -0,0 +1,119 @@
+"""Compressed output files, compressed on a background thread."""
+
+import bz2
+import gzip
+import logging
+import lzma
+import os
+import queue
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz"}
+DEFAULT_LEVELS = {"gzip": 6, "bz2": 9, "xz": 6}
+# Blocks (one per writer buffer drain) queued between serializer and compressor
+DEFAULT_QUEUE_BLOCKS = 8
+
+
+def compression_for(path: Optional[str], method: Optional[str] = None) -> Optional[str]:
+    """An explicit method wins; otherwise infer it from the output file extension."""
+    if method or not path:
+        return method
+    return EXTENSIONS.get(os.path.splitext(path)[1].lower())
+
+
+def _open_compressed(path: str, method: str, level: int):
+    if method == "gzip":
+        return gzip.open(path, "wb", compresslevel=level)
+    if method == "bz2":
+        return bz2.open(path, "wb", compresslevel=level)
+    if method == "xz":
+        return lzma.open(path, "wb", preset=level)
+    raise ValueError(f"Unsupported compression: {method}. Use 'gzip', 'bz2' or 'xz'.")
+
+
+class CompressedOutput:
+    """
+    Text-mode file object whose writes are compressed on another thread.
+
+    write() encodes the text and puts it on a bounded queue; a compressor
+    thread takes blocks off the queue and writes them through gzip/bz2/lzma.
+    Those release the GIL while compressing, so compression overlaps with
+    obfuscation and serialization on the main thread, and the bounded queue
+    keeps memory flat when the compressor falls behind.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        method: str,
+        level: Optional[int] = None,
+        queue_blocks: int = DEFAULT_QUEUE_BLOCKS,
+    ):
+        self.path = path
+        self.method = method
+        self.level = DEFAULT_LEVELS[method] if level is None else level
+        self._fh = _open_compressed(path, method, self.level)
+        self._queue: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=queue_blocks)
+        self._error: Optional[BaseException] = None
+        self.bytes_in = 0
+        self.compress_seconds = 0.0
+        self.wait_seconds = 0.0
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="poe-compress", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        q = self._queue
+        while True:
+            data = q.get()
+            try:
+                if data is None:
+                    return
+                if self._error is None:
+                    start = time.perf_counter()
+                    self._fh.write(data)
+                    self.compress_seconds += time.perf_counter() - start
+            except BaseException as e:  # surfaced on the next write/flush/close
+                self._error = e
+            finally:
+                q.task_done()
+
+    def _check(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def write(self, text: str) -> int:
+        self._check()
+        data = text.encode("utf-8")
+        self.bytes_in += len(data)
+        start = time.perf_counter()
+        self._queue.put(data)
+        self.wait_seconds += time.perf_counter() - start
+        return len(text)
+
+    def flush(self) -> None:
+        """Wait until everything queued has gone through the compressor."""
+        self._queue.join()
+        self._check()
+        self._fh.flush()
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+        self._fh.close()
+        self._check()
+        elapsed = time.perf_counter() - self._started
+        bytes_out = os.path.getsize(self.path)
+        logger.info(
+            "Compressed output (%s, level %d): %.1f MB -> %.1f MB (%.1f%%) in %.2fs, "
+            "compressor busy %.2fs (%.1f MB/s), serializer waited %.2fs on a full queue",
+            self.method, self.level, self.bytes_in / 1e6, bytes_out / 1e6,
+            100.0 * bytes_out / self.bytes_in if self.bytes_in else 0.0, elapsed,
+            self.compress_seconds,
+            self.bytes_in / 1e6 / self.compress_seconds if self.compress_seconds else 0.0,
+            self.wait_seconds,
+        )
@@ -0,0 +1,305 @@
+"""Compact indexed binary corpus format (-f corpus) and its mmap reader.
+
+Layout (all integers little-endian):
+
+    header     b"POEC", u16 version, u16 flags
+    records    payload: u8 type=1, u32 length, UTF-8 original
+               variant: u8 type=2, u64 payload id, u16 technique id,
+                        u16 category id, u32 length, UTF-8 variant
+    names      u32 length, JSON {"techniques": [...], "categories": [...]}
+    payloads   per payload: u64 record offset, u64 first variant number,
+               then a sentinel (names offset, variant count)
+    variants   per variant: u64 record offset
+    trailer    u64 names offset, u64 payload index offset, u64 variant
+               index offset, u64 payload count, u64 variant count, b"POEC"
+
+Each payload's original is stored once, followed by its variants, which
+refer to it by number; technique and category names are interned as small integer IDs.
+The fixed-width index entries give O(1) lookup of variant N and of the
+variants of payload K without scanning the records.
+"""
+
+import json
+import logging
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from core.compression import compression_for
+from core.results import PayloadResults, StreamedVariant, variant_chunks
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"POEC"
+VERSION = 1
+PAYLOAD_RECORD = 1
+VARIANT_RECORD = 2
+
+_HEADER = struct.Struct("<4sHH")
+_PAYLOAD = struct.Struct("<BI")
+_VARIANT = struct.Struct("<BQHHI")
+_NAMES = struct.Struct("<I")
+_PAYLOAD_ENTRY = struct.Struct("<QQ")
+_VARIANT_ENTRY = struct.Struct("<Q")
+_TRAILER = struct.Struct("<QQQQQ4s")
+
+_BUFFER_BYTES = 1 << 20
+
+
+class CorpusWriter:
+    """
+    Write results in the corpus format.
+
+    Takes the same arguments as the text writers so it can be used through
+    open_writer(), --tee and sharding, but needs a real output file and
+    cannot be compressed (readers mmap it) or resumed. The index is spilled
+    to temporary files while writing and appended on close(), so memory
+    stays flat however many variants are written.
+    """
+
+    format = "corpus"
+
+    def __init__(
+        self,
+        output_path: Optional[str] = None,
+        resume_records: Optional[int] = None,
+        timestamp: str = "batch",
+        compress: Optional[str] = None,
+        compress_level: Optional[int] = None,
+    ):
+        if not output_path:
+            raise ValueError("The corpus format needs an output file (-o)")
+        if resume_records is not None:
+            raise ValueError("Corpus output cannot be resumed")
+        if compression_for(output_path, compress):
+            raise ValueError("Corpus output cannot be compressed; readers mmap it")
+        self.path = output_path
+        self.count = 0
+        self.payloads = 0
+        self._fh = open(output_path, "wb", buffering=_BUFFER_BYTES)
+        self._payload_index = tempfile.TemporaryFile(buffering=_BUFFER_BYTES)
+        self._variant_index = tempfile.TemporaryFile(buffering=_BUFFER_BYTES)
+        self._techniques: Dict[str, int] = {}
+        self._categories: Dict[str, int] = {}
+        self._last_original: Optional[str] = None
+        self._fh.write(_HEADER.pack(MAGIC, VERSION, 0))
+        self.bytes = _HEADER.size
+
+    @staticmethod
+    def _intern(names: Dict[str, int], name: str) -> int:
+        ident = names.get(name)
+        if ident is None:
+            ident = names[name] = len(names)
+        return ident
+
+    def begin_payload(self, original: str, streamed: bool = False) -> None:
+        """
+        Start the record of a new payload; the variants written after it
+        refer to it. Every payload gets its own record, even one whose
+        original equals the previous payload's or that has no variants.
+        """
+        self._last_original = original
+        self._payload_index.write(_PAYLOAD_ENTRY.pack(self.bytes, self.count))
+        if streamed:
+            self._write_pieces(_PAYLOAD, (PAYLOAD_RECORD,), variant_chunks(original))
+        else:
+            data = original.encode("utf-8")
+            self._fh.write(_PAYLOAD.pack(PAYLOAD_RECORD, len(data)))
+            self._fh.write(data)
+            self.bytes += _PAYLOAD.size + len(data)
+        self.payloads += 1
+
+    def write(self, result: Tuple[str, str, str, str], streamed: bool = False) -> None:
+        """
+        Write one result; with streamed (or a StreamedVariant) the original
+        and the variant are written piece by piece and their record lengths
+        patched in afterwards.
+
+        A result whose original is not the very object of the previous
+        result starts a new payload record (results of one payload share
+        their original); write_results() starts one explicitly instead.
+        """
+        original, obfuscated, technique, category = result
+        streamed = streamed or type(obfuscated) is StreamedVariant
+        if original is not self._last_original:
+            self.begin_payload(original, streamed)
+        self._write_variant(obfuscated, technique, category, streamed)
+
+    def _write_variant(self, obfuscated: str, technique: str, category: str, streamed: bool) -> None:
+        technique_id = self._techniques.get(technique)
+        if technique_id is None:
+            technique_id = self._intern(self._techniques, technique)
+        category_id = self._categories.get(category)
+        if category_id is None:
+            category_id = self._intern(self._categories, category)
+        self._variant_index.write(_VARIANT_ENTRY.pack(self.bytes))
+        if streamed:
+            self._write_pieces(
+                _VARIANT, (VARIANT_RECORD, self.payloads - 1, technique_id, category_id),
+                variant_chunks(obfuscated),
+            )
+        else:
+            data = obfuscated.encode("utf-8")
+            self._fh.write(_VARIANT.pack(VARIANT_RECORD, self.payloads - 1, technique_id, category_id, len(data)))
+            self._fh.write(data)
+            self.bytes += _VARIANT.size + len(data)
+        self.count += 1
+
+    def _write_pieces(self, head: struct.Struct, fields: Tuple[int, ...], pieces: Iterable[str]) -> None:
+        """Write a record whose text comes in pieces, then seek back to fill in its length."""
+        fh = self._fh
+        start = self.bytes
+        fh.write(head.pack(*fields, 0))
+        length = 0
+        for piece in pieces:
+            data = piece.encode("utf-8")
+            fh.write(data)
+            length += len(data)
+        fh.seek(start)
+        fh.write(head.pack(*fields, length))
+        fh.seek(0, os.SEEK_END)
+        self.bytes += head.size + length
+
+    def write_results(self, results: Iterable[Tuple[str, str, str, str]]) -> None:
+        """Write all results of one payload: a PayloadResults or any iterable of tuples."""
+        if not isinstance(results, PayloadResults):
+            for result in results:
+                self.write(result)
+            return
+        streamed = results.streamed
+        self.begin_payload(results.original, streamed)
+        write_variant = self._write_variant
+        for variant, (technique, category) in zip(results.variants, results.labels):
+            write_variant(variant, technique, category, streamed or type(variant) is StreamedVariant)
+
+    def flush(self) -> None:
+        self._fh.flush()
+
+    def close(self) -> None:
+        fh = self._fh
+        try:
+            names_offset = self.bytes
+            names = json.dumps(
+                {"techniques": list(self._techniques), "categories": list(self._categories)},
+                ensure_ascii=False,
+            ).encode("utf-8")
+            fh.write(_NAMES.pack(len(names)))
+            fh.write(names)
+            payload_index = names_offset + _NAMES.size + len(names)
+            self._payload_index.write(_PAYLOAD_ENTRY.pack(names_offset, self.count))
+            variant_index = payload_index + _PAYLOAD_ENTRY.size * (self.payloads + 1)
+            for index in (self._payload_index, self._variant_index):
+                index.seek(0)
+                shutil.copyfileobj(index, fh, _BUFFER_BYTES)
+            fh.write(_TRAILER.pack(
+                names_offset, payload_index, variant_index, self.payloads, self.count, MAGIC,
+            ))
+            logger.info(
+                "Wrote %d obfuscated payloads of %d originals (corpus format) to %s",
+                self.count, self.payloads, self.path,
+            )
+        finally:
+            fh.close()
+            self._payload_index.close()
+            self._variant_index.close()
+
+
+class CorpusReader:
+    """
+    Random access to a corpus file through mmap.
+
+    reader[n] decodes variant n as a result tuple (original, obfuscated,
+    technique, category). The raw_* methods return zero-copy memoryview
+    slices of the mapping instead; release them before close().
+    variants_of(k) is the range of variant numbers of payload k.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self._file.close()
+            raise ValueError(f"Not a POE corpus file: {path}")
+        self._view = memoryview(self._mm)
+        try:
+            magic, version, _ = _HEADER.unpack_from(self._mm, 0)
+            (
+                names_offset, self._payload_index, self._variant_index,
+                self.payload_count, self.variant_count, end_magic,
+            ) = _TRAILER.unpack_from(self._mm, len(self._mm) - _TRAILER.size)
+        except struct.error:
+            magic = end_magic = None
+        if magic != MAGIC or end_magic != MAGIC:
+            self.close()
+            raise ValueError(f"Not a POE corpus file: {path}")
+        if version != VERSION:
+            self.close()
+            raise ValueError(f"Unsupported corpus version {version} in {path}")
+        (length,) = _NAMES.unpack_from(self._mm, names_offset)
+        start = names_offset + _NAMES.size
+        names = json.loads(bytes(self._view[start:start + length]).decode("utf-8"))
+        self.techniques: List[str] = names["techniques"]
+        self.categories: List[str] = names["categories"]
+
+    def __len__(self) -> int:
+        return self.variant_count
+
+    def _check(self, n: int, count: int) -> int:
+        if n < 0:
+            n += count
+        if not 0 <= n < count:
+            raise IndexError(n)
+        return n
+
+    def raw_variant(self, n: int) -> Tuple[int, int, int, memoryview]:
+        """(payload number, technique id, category id, UTF-8 bytes) of variant n."""
+        n = self._check(n, self.variant_count)
+        (offset,) = _VARIANT_ENTRY.unpack_from(self._mm, self._variant_index + _VARIANT_ENTRY.size * n)
+        _, payload, technique, category, length = _VARIANT.unpack_from(self._mm, offset)
+        start = offset + _VARIANT.size
+        return payload, technique, category, self._view[start:start + length]
+
+    def raw_payload(self, k: int) -> memoryview:
+        """UTF-8 bytes of original payload k."""
+        k = self._check(k, self.payload_count)
+        offset, _ = _PAYLOAD_ENTRY.unpack_from(self._mm, self._payload_index + _PAYLOAD_ENTRY.size * k)
+        _, length = _PAYLOAD.unpack_from(self._mm, offset)
+        start = offset + _PAYLOAD.size
+        return self._view[start:start + length]
+
+    def variants_of(self, k: int) -> range:
+        k = self._check(k, self.payload_count)
+        base = self._payload_index + _PAYLOAD_ENTRY.size * k
+        _, first = _PAYLOAD_ENTRY.unpack_from(self._mm, base)
+        _, end = _PAYLOAD_ENTRY.unpack_from(self._mm, base + _PAYLOAD_ENTRY.size)
+        return range(first, end)
+
+    def payload(self, k: int) -> str:
+        return str(self.raw_payload(k), "utf-8")
+
+    def __getitem__(self, n: int) -> Tuple[str, str, str, str]:
+        payload, technique, category, data = self.raw_variant(n)
+        return (
+            self.payload(payload), str(data, "utf-8"),
+            self.techniques[technique], self.categories[category],
+        )
+
+    def __iter__(self) -> Iterator[Tuple[str, str, str, str]]:
+        for n in range(self.variant_count):
+            yield self[n]
+
+    def close(self) -> None:
+        self._view.release()
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self) -> "CorpusReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
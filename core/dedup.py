@@ -0,0 +1,197 @@
+"""Bounded-memory deduplication of variants across the whole run (--global-dedup)."""
+
+import hashlib
+import logging
+import math
+from collections import Counter
+from typing import List, Optional, Set, Union
+
+from core.results import PayloadResults, StreamedVariant
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEDUP_BYTES = 64 * 1024 * 1024
+DEFAULT_FP_RATE = 0.001
+
+_MASK64 = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15
+
+
+def digest64(variant: str) -> int:
+    """64-bit digest of a variant, stable across processes and runs."""
+    return int.from_bytes(
+        hashlib.blake2b(variant.encode("utf-8", "surrogatepass"), digest_size=8).digest(), "little",
+    )
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over 64-bit digests.
+
+    The k bit positions come from double hashing: the digest itself and a
+    multiplicative mix of it (forced odd), so entries can be moved over from
+    the exact digest set without the original strings.
+    """
+
+    def __init__(self, capacity: int, fp_rate: float):
+        self.capacity = max(capacity, 1)
+        self.fp_rate = fp_rate
+        self.bits = max(int(-self.capacity * math.log(fp_rate) / math.log(2) ** 2), 64)
+        self.hashes = max(int(round(self.bits / self.capacity * math.log(2))), 1)
+        self.count = 0
+        self._array = bytearray((self.bits + 7) // 8)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._array)
+
+    def add(self, digest: int) -> bool:
+        """Set the digest's bits; True if at least one was unset (not seen before)."""
+        array, bits = self._array, self.bits
+        step = ((digest * _GOLDEN) & _MASK64) | 1
+        position = digest
+        new = False
+        for _ in range(self.hashes):
+            bit = position % bits
+            mask = 1 << (bit & 7)
+            byte = array[bit >> 3]
+            if not byte & mask:
+                array[bit >> 3] = byte | mask
+                new = True
+            position += step
+        if new:
+            self.count += 1
+        return new
+
+    def __contains__(self, digest: int) -> bool:
+        array, bits = self._array, self.bits
+        step = ((digest * _GOLDEN) & _MASK64) | 1
+        position = digest
+        for _ in range(self.hashes):
+            bit = position % bits
+            if not array[bit >> 3] & (1 << (bit & 7)):
+                return False
+            position += step
+        return True
+
+
+class GlobalDedup:
+    """
+    Drop variants already emitted earlier in the run, within a memory budget.
+
+    Digests are kept in an exact set until it would outgrow max_bytes, then
+    moved into a Bloom filter of the same size sized for fp_rate. A full
+    filter is followed by another one twice the size at half the previous
+    false-positive rate (a scalable Bloom filter), so the overall rate stays
+    below fp_rate; only those later filters take memory beyond the budget.
+    A false positive drops a variant that was in fact new.
+
+    Checked and dropped counts go into the `stats` Counter passed in (the
+    engine's), as dedup_checked / dedup_dropped.
+    """
+
+    # Rough cost of one digest in the exact set: the int object plus its
+    # share of the hash table at the usual load factor
+    ENTRY_BYTES = 72
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_DEDUP_BYTES,
+        fp_rate: float = DEFAULT_FP_RATE,
+        stats: Optional[Counter] = None,
+    ):
+        self.max_bytes = max_bytes
+        self.fp_rate = fp_rate
+        self.stats = stats if stats is not None else Counter()
+        self._exact: Optional[Set[int]] = set()
+        self._exact_capacity = max(max_bytes // self.ENTRY_BYTES, 1)
+        self._filters: List[BloomFilter] = []
+
+    @property
+    def mode(self) -> str:
+        return "exact" if self._exact is not None else "bloom"
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the digests."""
+        if self._exact is not None:
+            return len(self._exact) * self.ENTRY_BYTES
+        return sum(f.nbytes for f in self._filters)
+
+    @property
+    def fp_estimate(self) -> float:
+        """Expected false-positive rate at the current fill (0 while exact)."""
+        return sum(
+            (1 - math.exp(-f.hashes * f.count / f.bits)) ** f.hashes for f in self._filters
+        )
+
+    def add(self, variant: Union[str, StreamedVariant]) -> bool:
+        """Record a variant; True if it was not seen before and should be kept."""
+        digest = digest64(variant) if type(variant) is str else variant.digest64()
+        exact = self._exact
+        if exact is not None:
+            if digest in exact:
+                return False
+            exact.add(digest)
+            if len(exact) >= self._exact_capacity:
+                self._to_bloom()
+            return True
+        filters = self._filters
+        for f in filters[:-1]:
+            if digest in f:
+                return False
+        last = filters[-1]
+        if last.count >= last.capacity:
+            if digest in last:
+                return False
+            last = self._grow()
+        return last.add(digest)
+
+    def _to_bloom(self) -> None:
+        first = BloomFilter(
+            int(self.max_bytes * 8 * math.log(2) ** 2 / -math.log(self.fp_rate / 2)),
+            self.fp_rate / 2,
+        )
+        for digest in self._exact:
+            first.add(digest)
+        self._filters.append(first)
+        logger.info(
+            "Global dedup: %d digests reached the %.1f MB budget, switched to a Bloom filter "
+            "(%d hashes, capacity %d at %.2g false-positive rate)",
+            len(self._exact), self.max_bytes / 1e6, first.hashes, first.capacity, first.fp_rate,
+        )
+        self._exact = None
+
+    def _grow(self) -> BloomFilter:
+        last = self._filters[-1]
+        f = BloomFilter(last.capacity * 2, last.fp_rate / 2)
+        self._filters.append(f)
+        logger.warning(
+            "Global dedup: Bloom filter full, added another (now %.1f MB, over the %.1f MB budget)",
+            self.nbytes / 1e6, self.max_bytes / 1e6,
+        )
+        return f
+
+    def filter(self, results: PayloadResults) -> PayloadResults:
+        """The results of one payload without variants seen before."""
+        variants: List[str] = []
+        labels = []
+        add = self.add
+        for variant, label in zip(results.variants, results.labels):
+            if add(variant):
+                variants.append(variant)
+                labels.append(label)
+        self.stats["dedup_checked"] += len(results.variants)
+        self.stats["dedup_dropped"] += len(results.variants) - len(variants)
+        return PayloadResults(results.original, variants, labels, results.streamed)
+
+    def summary(self) -> str:
+        checked, dropped = self.stats["dedup_checked"], self.stats["dedup_dropped"]
+        text = (
+            f"dropped {dropped} of {checked} variants "
+            f"({100.0 * dropped / checked if checked else 0.0:.2f}%), "
+            f"{self.mode} mode, {self.nbytes / 1e6:.1f} MB"
+        )
+        if self._exact is None:
+            text += f", estimated false-positive rate {self.fp_estimate:.2g}"
+        return text
@@ -1,13 +1,35 @@
 """Main obfuscation orchestrator for POE."""
 
+import hashlib
 import logging
+import os
 import random
-from typing import Iterator, List, Optional, Set, Tuple
+import sys
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
-from techniques.base import get_all_techniques, get_technique_by_name, BaseTechnique
+from core.dedup import DEFAULT_FP_RATE, GlobalDedup
+from core.results import ORIGINAL, PayloadResults, StreamedVariant, digest64_pieces
+from core.scheduler import AdaptiveScheduler
+from core.similarity import NearDuplicateFilter
+from core.store import VariantStore
+from techniques.base import (
+    STREAM_CHUNK, get_all_techniques, get_technique_by_name, text_chunks, BaseTechnique,
+    PayloadContext,
+)
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_BATCH_SIZE = 256
+# Fruitless round-2 draws a stochastic technique gets per payload before it
+# is dropped from that payload's retry pool
+MAX_STALE_RETRIES = 3
+# The variant cache is opt-in: on input without repeated payloads every
+# lookup misses, and its bookkeeping only slows the engine down
+DEFAULT_CACHE_BYTES = 0
+
 SECURITY_DISCLAIMER = """
 ===========================================================================
   DISCLAIMER: This tool generates obfuscated payloads for AUTHORIZED
@@ -18,6 +40,65 @@ SECURITY_DISCLAIMER = """
 """
 
 
+class VariantCache:
+    """
+    LRU cache of deterministic technique output keyed by (technique name,
+    payload), bounded by the approximate memory held by its strings.
+
+    Hit, miss and eviction counts are kept in the `stats` Counter passed in
+    (the engine's, so worker processes report them like any other stat).
+    """
+
+    # Rough per-entry cost of the key tuple, value list and dict slot
+    ENTRY_OVERHEAD = 128
+
+    def __init__(self, max_bytes: int, stats: Optional[Counter] = None):
+        self.max_bytes = max_bytes
+        self.stats = stats if stats is not None else Counter()
+        self.size = 0
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[List[str], int]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hits(self) -> int:
+        return self.stats["cache_hits"]
+
+    @property
+    def misses(self) -> int:
+        return self.stats["cache_misses"]
+
+    @property
+    def evictions(self) -> int:
+        return self.stats["cache_evictions"]
+
+    def get(self, name: str, payload: str) -> Optional[List[str]]:
+        key = (name, payload)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["cache_misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats["cache_hits"] += 1
+        return entry[0]
+
+    def put(self, name: str, payload: str, variants: List[str]) -> None:
+        cost = self.ENTRY_OVERHEAD + sys.getsizeof(payload) + sum(map(sys.getsizeof, variants))
+        if cost > self.max_bytes:
+            return
+        key = (name, payload)
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= old[1]
+        self._entries[key] = (variants, cost)
+        self.size += cost
+        while self.size > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.size -= evicted
+            self.stats["cache_evictions"] += 1
+
+
 class ObfuscationEngine:
     def __init__(
         self,
@@ -25,10 +106,35 @@ class ObfuscationEngine:
         technique_names: Optional[List[str]] = None,
         preserve_original: bool = False,
         verbose: bool = False,
+        cache_bytes: int = DEFAULT_CACHE_BYTES,
+        store_path: Optional[str] = None,
+        seed: Optional[int] = None,
+        dedup_bytes: int = 0,
+        dedup_fp_rate: float = DEFAULT_FP_RATE,
+        near_dup_threshold: float = 0.0,
+        enumeration: bool = False,
+        stream_threshold: int = 0,
     ):
         self.multiplier = multiplier
         self.preserve_original = preserve_original
         self.verbose = verbose
+        self.seed = seed
+        self._seed_key = (
+            hashlib.blake2b(str(seed).encode(), digest_size=16).digest() if seed is not None else b""
+        )
+        # Constructor arguments, replayed by worker processes to rebuild the engine
+        self._config: Dict[str, Any] = {
+            "multiplier": multiplier,
+            "technique_names": technique_names,
+            "preserve_original": preserve_original,
+            "verbose": verbose,
+            "cache_bytes": cache_bytes,
+            "store_path": store_path,
+            "seed": seed,
+            "near_dup_threshold": near_dup_threshold,
+            "enumeration": enumeration,
+            "stream_threshold": stream_threshold,
+        }
 
         if technique_names:
             self.techniques = [get_technique_by_name(n) for n in technique_names]
@@ -38,6 +144,49 @@ class ObfuscationEngine:
         if not self.techniques:
             raise ValueError("No techniques available")
 
+        # Enumeration mode: sample from the techniques' countable variant spaces
+        self.enumeration = enumeration
+        if enumeration:
+            self.techniques = [t for t in self.techniques if t.is_enumerable]
+            if not self.techniques:
+                raise ValueError(
+                    "Enumeration needs a technique with a countable variant space: "
+                    + ", ".join(sorted(n for n, t in get_all_techniques().items() if t.is_enumerable))
+                )
+            if near_dup_threshold > 0:
+                raise ValueError("The near-duplicate filter cannot be combined with enumeration")
+            if stream_threshold > 0:
+                raise ValueError("Streaming large payloads cannot be combined with enumeration")
+
+        # Payloads of at least this many characters only go through the
+        # techniques that can stream them (see _stream()); 0 disables
+        self.stream_threshold = stream_threshold
+        self._streamable = [t for t in self.techniques if t.is_streamable and t.applies_to(0)]
+
+        # Feature mask -> applicable techniques, filled lazily per distinct mask
+        self._candidate_index: Dict[int, Tuple[BaseTechnique, ...]] = {}
+        self.stats: Counter = Counter()
+        self.scheduler = AdaptiveScheduler()
+        # Output of deterministic techniques for repeated payloads; None disables
+        self.cache: Optional[VariantCache] = (
+            VariantCache(cache_bytes, self.stats) if cache_bytes > 0 else None
+        )
+        # Persistent deterministic output across runs; None disables
+        self.store: Optional[VariantStore] = (
+            VariantStore(store_path, seed=seed) if store_path else None
+        )
+        # Rejects variants too similar to one already accepted for the same
+        # payload; None disables
+        self.near_dup: Optional[NearDuplicateFilter] = (
+            NearDuplicateFilter(near_dup_threshold, self.stats) if near_dup_threshold > 0 else None
+        )
+        # Variants already emitted this run, checked in this process only
+        # (not passed to workers), so results from every worker share one
+        # filter; 0 disables
+        self.dedup: Optional[GlobalDedup] = (
+            GlobalDedup(dedup_bytes, dedup_fp_rate, self.stats) if dedup_bytes > 0 else None
+        )
+
         logger.info(
             "Engine initialized: multiplier=%d, techniques=%d (%s)",
             self.multiplier,
@@ -45,67 +194,569 @@ class ObfuscationEngine:
             ", ".join(t.name for t in self.techniques),
         )
 
-    def process_payload(self, payload: str) -> List[Tuple[str, str, str, str]]:
+    def close(self) -> None:
+        """Flush and release the persistent store, if any."""
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    def format_stats(self) -> str:
+        """One-line summary of self.stats for --stats reporting."""
+        return ", ".join(f"{key}={value}" for key, value in sorted(self.stats.items()))
+
+    def payload_rng(self, payload: str):
+        """
+        Random source for one payload: the global random module when unseeded,
+        otherwise a random.Random derived from (seed, payload) alone, so the
+        same input yields the same output serially, sharded or resumed.
+        """
+        if self.seed is None:
+            return random
+        h = hashlib.blake2b(digest_size=8, key=self._seed_key)
+        if len(payload) < STREAM_CHUNK:
+            h.update(payload.encode("utf-8", "surrogatepass"))
+        else:
+            # Large payloads are hashed a chunk at a time rather than copied whole
+            for text in text_chunks(payload):
+                h.update(text.encode("utf-8", "surrogatepass"))
+        return random.Random(int.from_bytes(h.digest(), "big"))
+
+    def process_payload(self, payload: str) -> PayloadResults:
         """
         Generate self.multiplier unique obfuscated variants for a single payload.
-        Returns list of (original, obfuscated, technique_name, category).
+        Returns a sequence of (original, obfuscated, technique_name, category).
+        """
+        return self.process_batch([payload])[0]
+
+    def process_batch(self, payloads: List[str]) -> List[PayloadResults]:
         """
-        seen: Set[str] = set()
-        results: List[Tuple[str, str, str, str]] = []
+        Generate variants for a chunk of payloads, one PayloadResults per payload.
+
+        Round 1 walks every payload's shuffled technique order in lockstep and
+        groups the payloads that reach the same technique at the same step, so
+        each technique sees one obfuscate_batch() call per step instead of one
+        obfuscate() call per payload. Payloads of at least stream_threshold
+        characters are taken out of the batch and handled by _stream().
+        """
+        threshold = self.stream_threshold
+        if threshold and any(len(p) >= threshold for p in payloads):
+            rest = iter(self.process_batch([p for p in payloads if len(p) < threshold]))
+            return [self._stream(p) if len(p) >= threshold else next(rest) for p in payloads]
         target = self.multiplier
+        contexts = [PayloadContext(p, self.payload_rng(p)) for p in payloads]
+        if self.enumeration:
+            self.stats["payloads"] += len(payloads)
+            return [self._enumerate(ctx) for ctx in contexts]
+        seen_sets: List[Set[str]] = []
+        result_lists: List[PayloadResults] = []
+        orders: List[List[BaseTechnique]] = []
+        near_dup = self.near_dup
+        signature_lists: List[Optional[list]] = []
 
-        if self.preserve_original:
-            results.append((payload, payload, "original", "none"))
-            seen.add(payload)
+        for ctx in contexts:
+            payload = ctx.payload
+            seen: Set[str] = set()
+            results = PayloadResults(payload)
+            signatures = near_dup.new_payload() if near_dup is not None else None
+            if self.preserve_original:
+                results.append(payload, ORIGINAL)
+                seen.add(payload)
+                if near_dup is not None:
+                    near_dup.accept(payload, signatures)
+            # Round 1: shuffle the techniques that can apply to this payload
+            technique_order = list(self._candidates(ctx.features))
+            ctx.rng.shuffle(technique_order)
+            seen_sets.append(seen)
+            signature_lists.append(signatures)
+            result_lists.append(results)
+            orders.append(technique_order)
+        self.stats["payloads"] += len(payloads)
+        # Payloads of this batch that had deterministic output computed (not
+        # served from the store)
+        store_computed: Set[str] = set()
+        stored = self._prefill_from_store(contexts, store_computed) if self.store is not None else {}
 
-        # Round 1: shuffle techniques and collect variants
-        technique_order = list(self.techniques)
-        random.shuffle(technique_order)
+        for step in range(len(self.techniques)):
+            groups: Dict[BaseTechnique, List[int]] = {}
+            for i, results in enumerate(result_lists):
+                if len(results) < target and step < len(orders[i]):
+                    groups.setdefault(orders[i][step], []).append(i)
+            if not groups:
+                break
+            for technique, indices in groups.items():
+                if technique.deterministic and (self.store is not None or self.cache is not None):
+                    batch_variants = self._cached_group(
+                        technique, [contexts[i] for i in indices], stored, store_computed,
+                    )
+                elif technique.is_lazy:
+                    # Generators are pulled only until the payload has enough
+                    self.stats["technique_calls"] += len(indices)
+                    for i in indices:
+                        produced = self._collect(
+                            contexts[i], technique, seen_sets[i], result_lists[i],
+                            signatures=signature_lists[i],
+                        )
+                        self.scheduler.record(technique, produced)
+                    continue
+                else:
+                    batch_variants = self._obfuscate_group(technique, [contexts[i] for i in indices])
+                for i, variants in zip(indices, batch_variants):
+                    produced = self._collect(
+                        contexts[i], technique, seen_sets[i], result_lists[i], variants,
+                        signatures=signature_lists[i],
+                    )
+                    self.scheduler.record(technique, produced)
+        if self.store is not None:
+            computed = len(store_computed)
+            self.stats["store_computed"] += computed
+            self.stats["store_reused"] += len(set(payloads)) - computed
+            self.store.flush()
 
-        for technique in technique_order:
+        # Round 2: retry stochastic techniques, weighted by their yield so far.
+        # Seeded runs learn weights per payload only, so output never depends
+        # on which payloads were processed before (or in which process).
+        for ctx, seen, results, candidates, signatures in zip(
+            contexts, seen_sets, result_lists, orders, signature_lists,
+        ):
             if len(results) >= target:
-                break
-            try:
-                variants = technique.obfuscate(payload)
-            except Exception as e:
-                logger.warning("Technique %s failed on payload: %s", technique.name, e)
                 continue
-            for v in variants:
-                if v not in seen:
-                    seen.add(v)
-                    results.append((payload, v, technique.name, technique.category))
+            scheduler = self.scheduler if self.seed is None else AdaptiveScheduler()
+            pool = scheduler.retry_pool(candidates)
+            misses: Counter = Counter()
+            max_retries = target * 3
+            attempt = 0
+            while len(results) < target and attempt < max_retries and pool:
+                technique = scheduler.pick(pool, ctx.rng)
+                attempt += 1
+                self.stats["technique_calls"] += 1
+                produced = self._collect(
+                    ctx, technique, seen, results, warn=False, signatures=signatures,
+                )
+                scheduler.record(technique, produced)
+                if not produced:
+                    misses[technique] += 1
+                    if misses[technique] >= MAX_STALE_RETRIES:
+                        pool.remove(technique)
+
+            if len(results) < target:
+                logger.warning(
+                    "Could only generate %d/%d unique variants for payload: %.40s...",
+                    len(results), target, ctx.payload,
+                )
+
+        return result_lists
+
+    def _stream(self, payload: str) -> PayloadResults:
+        """
+        Large-payload path: the streamable techniques, in a shuffled order as
+        in round 1, each contribute their forms as StreamedVariant objects
+        until the target is reached. Nothing is kept but the payload: each
+        variant is encoded once here, chunk by chunk, only to digest it and
+        drop repeats, and again by the writer. Other techniques, the cache,
+        the store and the near-duplicate filter are skipped.
+        """
+        target = self.multiplier
+        results = PayloadResults(payload, streamed=True)
+        seen: Set[int] = set()
+        if self.preserve_original:
+            results.append(payload, ORIGINAL)
+            seen.add(digest64_pieces(text_chunks(payload)))
+        order = list(self._streamable)
+        self.payload_rng(payload).shuffle(order)
+        for technique in order:
+            if len(results) >= target:
+                break
+            self.stats["technique_calls"] += 1
+            label = (technique.name, technique.category)
+            for form in range(technique.stream_forms(payload)):
+                variant = StreamedVariant(payload, technique.name, form)
+                digest = variant.digest64()
+                if digest not in seen:
+                    seen.add(digest)
+                    results.append(variant, label)
                     if len(results) >= target:
                         break
+        self.stats["payloads"] += 1
+        self.stats["streamed_payloads"] += 1
+        self.stats["skipped_calls"] += len(self.techniques) - len(self._streamable)
+        if len(results) < target:
+            logger.warning(
+                "Could only generate %d/%d unique variants for large payload "
+                "(%d chars, streamed encoders only): %.40s...",
+                len(results), target, len(payload), payload,
+            )
+        return results
 
-        # Round 2: retry random techniques for stochastic variety
-        max_retries = target * 3
-        attempt = 0
-        while len(results) < target and attempt < max_retries:
-            technique = random.choice(self.techniques)
-            attempt += 1
-            try:
-                variants = technique.obfuscate(payload)
-            except Exception:
+    def _enumerate(self, ctx: PayloadContext) -> PayloadResults:
+        """
+        Enumeration mode: split the target evenly over the payload's
+        enumerable techniques (a technique with a smaller variant space
+        hands its unused share to the larger ones), draw that many distinct
+        indices from each space and unrank them. The spaces exclude the
+        payload and are disjoint (the techniques change its length or
+        alphabet in different ways), so no seen set or retry loop is needed.
+        A space no larger than its share is taken whole, in rank order.
+        """
+        payload = ctx.payload
+        results = PayloadResults(payload)
+        if self.preserve_original:
+            results.append(payload, ORIGINAL)
+        spaces = []
+        for technique in self._candidates(ctx.features):
+            size = technique.variant_space(payload, ctx)
+            if size > 0:
+                spaces.append((size, technique))
+        spaces.sort(key=lambda space: space[0])
+        remaining = self.multiplier - len(results)
+        before = len(results)
+        for left, (size, technique) in zip(range(len(spaces), 0, -1), spaces):
+            share = min(size, remaining // left)
+            remaining -= share
+            label = (technique.name, technique.category)
+            for index in _sample_indices(ctx.rng, size, share):
+                results.append(technique.unrank(payload, index, ctx), label)
+        self.stats["enumerated"] += len(results) - before
+        if remaining:
+            logger.warning(
+                "Variant space holds only %d/%d variants for payload: %.40s...",
+                len(results), self.multiplier, payload,
+            )
+        return results
+
+    def _candidates(self, features: int) -> Tuple[BaseTechnique, ...]:
+        """Techniques applicable to a round-1 payload, counting the ones skipped."""
+        candidates = self._candidate_index_for(features)
+        self.stats["skipped_calls"] += len(self.techniques) - len(candidates)
+        return candidates
+
+    def _candidate_index_for(self, features: int) -> Tuple[BaseTechnique, ...]:
+        """Techniques applicable to payloads with these feature bits (memoized per mask)."""
+        candidates = self._candidate_index.get(features)
+        if candidates is None:
+            candidates = tuple(t for t in self.techniques if t.applies_to(features))
+            self._candidate_index[features] = candidates
+        return candidates
+
+    def _cached_group(
+        self, technique: BaseTechnique, contexts: List[PayloadContext],
+        stored: Dict[Tuple[str, str], List[str]], store_computed: Set[str],
+    ) -> List[List[str]]:
+        """
+        _obfuscate_group() for a deterministic technique, served from the
+        batch's store prefill and then the LRU cache before anything is
+        computed. Computed output is added to the store, if any, and its
+        payloads to store_computed.
+        """
+        cache, store = self.cache, self.store
+        name = technique.name
+        batch_variants: List[Optional[List[str]]] = [None] * len(contexts)
+        # Payload -> group positions waiting on it; duplicates inside the
+        # group are computed once and count as hits
+        missing: Dict[str, List[int]] = {}
+        for i, ctx in enumerate(contexts):
+            variants = stored.get((name, ctx.payload))
+            if variants is not None:
+                batch_variants[i] = variants
                 continue
+            waiting = missing.get(ctx.payload)
+            if waiting is not None:
+                waiting.append(i)
+                if cache is not None:
+                    self.stats["cache_hits"] += 1
+                continue
+            variants = cache.get(name, ctx.payload) if cache is not None else None
+            if variants is None:
+                missing[ctx.payload] = [i]
+            else:
+                batch_variants[i] = variants
+
+        if missing:
+            firsts = [indices[0] for indices in missing.values()]
+            computed = self._obfuscate_group(technique, [contexts[i] for i in firsts])
+            for (payload, indices), variants in zip(missing.items(), computed):
+                if cache is not None:
+                    cache.put(name, payload, variants)
+                if store is not None:
+                    store.put(name, technique.version, store.payload_hash(payload), variants)
+                    store_computed.add(payload)
+                for i in indices:
+                    batch_variants[i] = variants
+        return batch_variants
+
+    def _prefill_from_store(
+        self, contexts: List[PayloadContext], store_computed: Set[str],
+    ) -> Dict[Tuple[str, str], List[str]]:
+        """
+        Load the batch's stored deterministic output from the persistent
+        store, keyed by (technique name, payload).
+
+        Seeded runs pick the same round-1 techniques for a payload every
+        time, so only what round 1 computes is stored (by _cached_group()).
+        Unseeded runs shuffle differently on each run: payloads missing any
+        applicable deterministic technique have the whole set computed and
+        stored here, so that the next run can reuse them regardless of
+        technique order. Computed payloads are added to store_computed.
+        """
+        store = self.store
+        unique: Dict[str, PayloadContext] = {}
+        for ctx in contexts:
+            unique.setdefault(ctx.payload, ctx)
+        hashes = {payload: store.payload_hash(payload) for payload in unique}
+        rows = store.fetch(list(hashes.values()))
+
+        prefilled: Dict[Tuple[str, str], List[str]] = {}
+        todo: Dict[BaseTechnique, List[PayloadContext]] = {}
+        for payload, ctx in unique.items():
+            payload_rows = rows.get(hashes[payload], {})
+            for technique in self._candidate_index_for(ctx.features):
+                if not technique.deterministic:
+                    continue
+                variants = payload_rows.get((technique.name, technique.version))
+                if variants is not None:
+                    prefilled[(technique.name, payload)] = variants
+                elif self.seed is None:
+                    todo.setdefault(technique, []).append(ctx)
+                    store_computed.add(payload)
+
+        for technique, group in todo.items():
+            for ctx, variants in zip(group, self._obfuscate_group(technique, group)):
+                prefilled[(technique.name, ctx.payload)] = variants
+                store.put(technique.name, technique.version, hashes[ctx.payload], variants)
+        return prefilled
+
+    def _obfuscate_group(
+        self, technique: BaseTechnique, contexts: List[PayloadContext],
+    ) -> List[List[str]]:
+        """Run one technique over a group; a failing batch is retried per payload."""
+        self.stats["technique_calls"] += len(contexts)
+        try:
+            return technique.obfuscate_batch([ctx.payload for ctx in contexts], contexts)
+        except Exception:
+            pass
+        batch_variants: List[List[str]] = []
+        for ctx in contexts:
+            try:
+                batch_variants.append(technique.obfuscate(ctx.payload))
+            except Exception as e:
+                logger.warning("Technique %s failed on payload: %s", technique.name, e)
+                batch_variants.append([])
+        return batch_variants
+
+    def _collect(
+        self,
+        ctx: PayloadContext,
+        technique: BaseTechnique,
+        seen: Set[str],
+        results: PayloadResults,
+        variants: Optional[Iterable[str]] = None,
+        warn: bool = True,
+        signatures: Optional[list] = None,
+    ) -> int:
+        """
+        Append unseen variants until the target is reached and return how
+        many were added. When variants is None they are pulled lazily from
+        technique.iter_variants(). With signatures (the payload's accepted
+        near-duplicate signatures), near duplicates are skipped like repeats.
+        """
+        target = self.multiplier
+        before = len(results)
+        label = (technique.name, technique.category)
+        near_dup = self.near_dup if signatures is not None else None
+        try:
+            if variants is None:
+                variants = technique.iter_variants(ctx.payload, ctx)
             for v in variants:
                 if v not in seen:
                     seen.add(v)
-                    results.append((payload, v, technique.name, technique.category))
+                    if near_dup is not None and not near_dup.accept(v, signatures):
+                        continue
+                    results.append(v, label)
                     if len(results) >= target:
                         break
+        except Exception as e:
+            if warn:
+                logger.warning("Technique %s failed on payload: %s", technique.name, e)
+        return len(results) - before
 
-        if len(results) < target:
-            logger.warning(
-                "Could only generate %d/%d unique variants for payload: %.40s...",
-                len(results), target, payload,
-            )
+    def process_stream(
+        self,
+        payloads: Iterator[str],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        on_payload_done: Optional[Callable[[], None]] = None,
+    ) -> Iterator[Tuple[str, str, str, str]]:
+        """
+        Process an iterator of payloads in chunks, yielding result tuples.
 
-        return results
+        on_payload_done, if given, is called once per payload in input order,
+        after the consumer has taken all of that payload's results.
+        """
+        for results in self.iter_results(payloads, batch_size=batch_size):
+            yield from results
+            if on_payload_done is not None:
+                on_payload_done()
 
-    def process_stream(
-        self, payloads: Iterator[str]
+    def process_stream_parallel(
+        self,
+        payloads: Iterator[str],
+        workers: int,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_inflight: Optional[int] = None,
+        on_payload_done: Optional[Callable[[], None]] = None,
     ) -> Iterator[Tuple[str, str, str, str]]:
-        """Process an iterator of payloads, yielding result tuples."""
-        for payload in payloads:
-            for result in self.process_payload(payload):
-                yield result
+        """
+        Process payloads across a pool of worker processes.
+
+        Payloads are sent in batches of batch_size; results are yielded in
+        input order. See process_batches() for max_inflight, worker logs and
+        stats. on_payload_done behaves as in process_stream().
+        """
+        for results in self.iter_results(payloads, workers, batch_size, max_inflight):
+            yield from results
+            if on_payload_done is not None:
+                on_payload_done()
+
+    def iter_results(
+        self,
+        payloads: Iterator[str],
+        workers: int = 1,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_inflight: Optional[int] = None,
+    ) -> Iterator[PayloadResults]:
+        """
+        Like process_stream() / process_stream_parallel(), but yield one
+        PayloadResults per payload instead of flattening them into tuples;
+        hand these to writer.write_results().
+        """
+        for batch_results in self.process_batches(batched(payloads, batch_size), workers, max_inflight):
+            yield from batch_results
+
+    def process_batches(
+        self,
+        batches: Iterator[List[str]],
+        workers: int = 1,
+        max_inflight: Optional[int] = None,
+    ) -> Iterator[List[PayloadResults]]:
+        """
+        Yield process_batch() results for each batch, in order.
+
+        With workers > 1 the batches go to a pool of worker processes; at
+        most max_inflight batches (default: 2 per worker) are outstanding at
+        any time, so memory stays bounded. Log records emitted inside the
+        workers are replayed through the parent's loggers, and worker stats
+        are merged into self.stats.
+
+        With global dedup enabled, variants emitted by an earlier payload
+        are dropped here, in input order, so the output is the same for
+        any number of workers.
+        """
+        batches = iter(batches)
+        dedup = self.dedup
+        if workers <= 1:
+            for batch in batches:
+                batch_results = self.process_batch(batch)
+                yield [dedup.filter(r) for r in batch_results] if dedup is not None else batch_results
+            return
+        if max_inflight is None:
+            max_inflight = workers * 2
+
+        log_level = logging.getLogger().getEffectiveLevel()
+        pending: deque = deque()
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(self._config, log_level),
+        ) as pool:
+            while True:
+                for batch in islice(batches, max_inflight - len(pending)):
+                    pending.append(pool.submit(_process_batch, batch))
+                if not pending:
+                    break
+                batch_results, records, stats = pending.popleft().result()
+                for record in records:
+                    logging.getLogger(record["name"]).handle(logging.makeLogRecord(record))
+                self.stats.update(stats)
+                if dedup is not None:
+                    batch_results = [dedup.filter(r) for r in batch_results]
+                yield batch_results
+
+
+def _sample_indices(rng, size: int, count: int) -> Iterable[int]:
+    """count distinct indices below size, drawn with rng (all of them, in order, if count >= size)."""
+    if count >= size:
+        return range(size)
+    if size <= sys.maxsize:
+        return rng.sample(range(size), count)
+    # range() is too long for sample() here; in a space this large a repeated
+    # draw is rare, so rejecting repeats costs next to nothing
+    drawn: Set[int] = set()
+    indices = []
+    while len(indices) < count:
+        index = rng.randrange(size)
+        if index not in drawn:
+            drawn.add(index)
+            indices.append(index)
+    return indices
+
+
+def batched(items: Iterator[str], size: int) -> Iterator[List[str]]:
+    """Group an iterator into lists of up to size items."""
+    items = iter(items)
+    while True:
+        batch = list(islice(items, size))
+        if not batch:
+            return
+        yield batch
+
+
+# ---------------------------------------------------------------------------
+# Worker-process side of process_stream_parallel
+# ---------------------------------------------------------------------------
+
+_WORKER_ENGINE: Optional[ObfuscationEngine] = None
+_WORKER_LOG: List[Dict[str, Any]] = []
+
+
+class _CaptureHandler(logging.Handler):
+    """Buffer log records as picklable dicts so the parent can replay them."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        _WORKER_LOG.append({
+            "name": record.name,
+            "levelno": record.levelno,
+            "levelname": record.levelname,
+            "msg": record.getMessage(),
+            "args": None,
+            "process": record.process,
+            "processName": record.processName,
+        })
+
+
+def _init_worker(config: Dict[str, Any], log_level: int) -> None:
+    global _WORKER_ENGINE
+    import techniques  # noqa: F401  (populate the registry under spawn)
+
+    # Drop any handlers inherited through fork; everything goes via the parent
+    for existing in logging.Logger.manager.loggerDict.values():
+        if isinstance(existing, logging.Logger):
+            existing.handlers.clear()
+            existing.propagate = True
+    root = logging.getLogger()
+    root.handlers.clear()
+    root.setLevel(log_level)
+    # Build the engine before capturing so its init banner isn't repeated per worker
+    root.addHandler(logging.NullHandler())
+    _WORKER_ENGINE = ObfuscationEngine(**config)
+    root.addHandler(_CaptureHandler(level=log_level))
+    logger.debug("Worker %d ready", os.getpid())
+
+
+def _process_batch(
+    batch: List[str],
+) -> Tuple[List[PayloadResults], List[Dict[str, Any]], Dict[str, int]]:
+    results = _WORKER_ENGINE.process_batch(batch)
+    records = list(_WORKER_LOG)
+    _WORKER_LOG.clear()
+    stats = dict(_WORKER_ENGINE.stats)
+    _WORKER_ENGINE.stats.clear()
+    return results, records, stats
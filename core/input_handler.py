@@ -1,20 +1,235 @@
-"""Streaming input file reader for POE."""
+"""Streaming input file reader for POE.
 
+Regular files are memory-mapped and split into newline-aligned byte ranges
+that can be scanned by several worker processes at once. Comments and blank
+lines are recognised on the raw bytes; only the lines that are kept are
+decoded. stdin ("-") and gzip files (".gz") cannot be mapped and are read
+as a byte stream instead.
+"""
+
+import gzip
 import logging
-from typing import Iterator
+import mmap
+import os
+import re
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Iterator, List, Optional, Tuple
 
 from utils.validators import validate_file_readable
 
 logger = logging.getLogger(__name__)
 
+STDIN = "-"
+DEFAULT_CHUNK_BYTES = 32 * 1024 * 1024
+
+# First bytes a blank or comment line can start with: "#", CR, LF, or the
+# first byte of anything str.lstrip() removes (no whitespace above U+3000).
+_LEAD = bytes(sorted(
+    {ord("#"), ord("\r"), ord("\n")}
+    | {chr(cp).encode("utf-8")[0] for cp in range(0x3001) if chr(cp).isspace()}
+))
+# Lines starting with a lead byte, matched from the newline before them. The
+# literal "\n" plus a one-byte lookahead lets the regex engine skip through
+# ordinary lines at C speed; only these (rare) candidates are checked in Python.
+_CANDIDATE = re.compile(b"\n(?=[" + re.escape(_LEAD) + b"])[^\n]*")
+# One line and its terminator, with universal newlines: CRLF, lone CR or LF
+_LINE = re.compile(b"([^\r\n]*)(?:\r\n|\r|\n|\Z)")
+
+
+def _dropped(line: bytes) -> bool:
+    """Whether a line (newline removed) starting with a lead byte is blank or a comment."""
+    line = line.rstrip(b"\r")
+    if not line or line[0] == 35:  # "#"
+        return True
+    return line.decode("utf-8").lstrip().startswith("#")
+
+
+def _decode_kept(line: bytes) -> Optional[str]:
+    """
+    Decode one raw line or return None if it is blank or a comment, with the
+    same rules as the text reader: trailing CR/LF are stripped and "#" after
+    leading whitespace marks a comment.
+    """
+    line = line.rstrip(b"\r\n")
+    if not line or (line[0] in _LEAD and _dropped(line)):
+        return None
+    return line.decode("utf-8")
+
+
+def _filter(data: bytes) -> bytes:
+    """Drop comment and blank lines from a block of whole lines, on raw bytes."""
+    if b"\r" in data:
+        # Universal newlines, as in the text-mode reader: CRLF and lone CR end lines too
+        data = data.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+    work = b"\n" + data  # so the first line has a newline before it too
+    pieces = []
+    pos = 0
+    for m in _CANDIDATE.finditer(work):
+        if _dropped(m.group()[1:]):
+            pieces.append(work[pos:m.start()])
+            pos = m.end()
+    pieces.append(work[pos:])
+    return b"".join(pieces)[1:].rstrip(b"\n")
+
+
+def _split(kept: bytes) -> List[str]:
+    """Decode a filtered block in one call and split it into payloads."""
+    return kept.decode("utf-8").split("\n") if kept else []
+
+
+def _scan(data: bytes) -> List[str]:
+    """Kept payloads of a block of whole lines."""
+    return _split(_filter(data))
+
+
+def _scan_with_offsets(data: bytes, base: int) -> List[Tuple[int, str]]:
+    """Like _scan(), pairing each payload with the absolute offset just past its line."""
+    pairs = []
+    append = pairs.append
+    if b"\r" in data:
+        # CRLF and lone CR end lines too, so match line by line
+        for m in _LINE.finditer(data):
+            payload = _decode_kept(m.group(1))
+            if payload is not None:
+                append((base + m.end(), payload))
+        return pairs
+    lead = _LEAD
+    offset = base
+    for line in data.split(b"\n"):
+        offset += len(line) + 1
+        if line and line[0] not in lead:  # common case: plain line
+            append((offset, line.decode("utf-8")))
+            continue
+        payload = _decode_kept(line)
+        if payload is not None:
+            append((offset, payload))
+    # The last piece has no newline after it
+    if pairs and pairs[-1][0] > base + len(data):
+        pairs[-1] = (base + len(data), pairs[-1][1])
+    return pairs
+
+
+def chunk_ranges(
+    buf, chunk_bytes: int = DEFAULT_CHUNK_BYTES, start: int = 0,
+) -> List[Tuple[int, int]]:
+    """Split buf[start:] into [start, end) ranges of about chunk_bytes, each ending after a newline."""
+    size = len(buf)
+    ranges = []
+    while start < size:
+        end = start + chunk_bytes
+        if end >= size:
+            end = size
+        else:
+            nl = buf.find(b"\n", end - 1)
+            end = size if nl == -1 else nl + 1
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def _filter_range(filepath: str, start: int, end: int) -> bytes:
+    """Worker task: map the file and filter one byte range."""
+    with open(filepath, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return _filter(mm[start:end])
+
+
+def _open_stream(filepath: str) -> BinaryIO:
+    if filepath == STDIN:
+        return sys.stdin.buffer
+    filepath = validate_file_readable(filepath)
+    if filepath.endswith(".gz"):
+        return gzip.open(filepath, "rb")
+    return open(filepath, "rb")
+
+
+def _read_stream(filepath: str, chunk_bytes: int) -> Iterator[str]:
+    """Streaming fallback for stdin and gzip: scan whole-line blocks of the byte stream."""
+    fh = _open_stream(filepath)
+    try:
+        tail = b""
+        while True:
+            block = fh.read(chunk_bytes)
+            if not block:
+                break
+            block = tail + block
+            cut = block.rfind(b"\n") + 1
+            tail = block[cut:]
+            yield from _scan(block[:cut])
+        if tail:
+            yield from _scan(tail)
+    finally:
+        if fh is not sys.stdin.buffer:
+            fh.close()
+
+
+def _read_mapped(filepath: str, workers: int, chunk_bytes: int) -> Iterator[str]:
+    filepath = validate_file_readable(filepath)
+    with open(filepath, "rb") as fh:
+        if os.fstat(fh.fileno()).st_size == 0:
+            return
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            ranges = chunk_ranges(mm, chunk_bytes)
+            logger.debug("Reading %s in %d chunks with %d worker(s)", filepath, len(ranges), workers)
+            if workers <= 1 or len(ranges) == 1:
+                for start, end in ranges:
+                    yield from _scan(mm[start:end])
+                return
+
+    # Each worker maps the file itself and sends back only the kept bytes,
+    # which are cheaper to pickle than lists of str. At most two chunks per
+    # worker are in flight to bound memory.
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        todo = iter(ranges)
+        for start, end in todo:
+            pending.append(pool.submit(_filter_range, filepath, start, end))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            kept = pending.popleft().result()
+            for start, end in todo:
+                pending.append(pool.submit(_filter_range, filepath, start, end))
+                break
+            yield from _split(kept)
+
+
+def read_payloads(
+    filepath: str, workers: int = 1, chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+) -> Iterator[str]:
+    """
+    Yield non-empty, non-comment lines from a UTF-8 text file, in order.
+
+    workers > 1 scans newline-aligned chunks of a regular file in that many
+    processes. "-" reads stdin and ".gz" files are decompressed on the fly;
+    both are read sequentially.
+    """
+    if filepath == STDIN or filepath.endswith(".gz"):
+        return _read_stream(filepath, chunk_bytes)
+    return _read_mapped(filepath, workers, chunk_bytes)
+
+
+def read_payloads_with_offsets(filepath: str, start_offset: int = 0) -> Iterator[Tuple[int, str]]:
+    """
+    Like read_payloads(), starting at byte start_offset (a line boundary) and
+    yielding (offset just past the payload's line, payload) pairs, so a run
+    can later resume right after any payload. For ".gz" input the offsets
+    are positions in the decompressed stream.
+    """
+    if filepath.endswith(".gz"):
+        with _open_stream(filepath) as fh:
+            fh.seek(start_offset)
+            offset = start_offset
+            for raw_line in fh:
+                yield from _scan_with_offsets(raw_line, offset)
+                offset += len(raw_line)
+        return
 
-def read_payloads(filepath: str) -> Iterator[str]:
-    """Yield non-empty, non-comment lines from a UTF-8 text file."""
     filepath = validate_file_readable(filepath)
-    with open(filepath, "r", encoding="utf-8") as fh:
-        for line_num, raw_line in enumerate(fh, 1):
-            line = raw_line.rstrip("\n\r")
-            if not line or line.lstrip().startswith("#"):
-                logger.debug("Skipping line %d (empty or comment)", line_num)
-                continue
-            yield line
+    with open(filepath, "rb") as fh:
+        if os.fstat(fh.fileno()).st_size == 0:
+            return
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for start, end in chunk_ranges(mm, DEFAULT_CHUNK_BYTES, start_offset):
+                yield from _scan_with_offsets(mm[start:end], start)
@@ -1,56 +1,570 @@
-"""Output writers for POE (text and JSON formats)."""
+"""Output writers for POE (text, JSON and JSON Lines formats)."""
 
 import json
 import logging
+import os
 import sys
 from datetime import datetime, timezone
-from typing import Iterator, Optional, Tuple
+from json.encoder import encode_basestring
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from core.corpus import CorpusWriter
+from core.results import PayloadResults, StreamedVariant, variant_chunks
+from techniques.base import text_chunks
+from core.compression import EXTENSIONS as COMPRESSED_EXTENSIONS, CompressedOutput, compression_for
 
 logger = logging.getLogger(__name__)
 
 
+WRITE_BUFFER_RECORDS = 4096
+TIMESTAMP_MODES = ("run", "batch")
+
+
+def _utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class TextWriter:
+    """
+    Write one obfuscated payload per line.
+
+    Records are collected in a list and written as one block every
+    WRITE_BUFFER_RECORDS records, so the file object sees a few large writes
+    instead of several small ones per record. Records of streamed results
+    (PayloadResults.streamed) are instead written piece by piece as they are
+    encoded, so no record of a large payload is ever held whole.
+    """
+
+    format = "text"
+
+    def __init__(
+        self,
+        output_path: Optional[str] = None,
+        resume_records: Optional[int] = None,
+        timestamp: str = "batch",
+        compress: Optional[str] = None,
+        compress_level: Optional[int] = None,
+    ):
+        """
+        resume_records is None for a fresh file. Otherwise the file already
+        holds that many records (already truncated to a checkpoint) and is
+        appended to.
+
+        compress is "gzip", "bz2" or "xz", or None to infer it from the
+        output path's extension; compressed files cannot be resumed.
+        """
+        self.path = output_path
+        method = compression_for(output_path, compress)
+        if not output_path:
+            self.fh = sys.stdout
+        elif method:
+            if resume_records is not None:
+                raise ValueError("Compressed output cannot be resumed")
+            self.fh = CompressedOutput(output_path, method, compress_level)
+        else:
+            mode = "w" if resume_records is None else "a"
+            self.fh = open(output_path, mode, encoding="utf-8")
+        self.count = resume_records or 0
+        # UTF-8 bytes written by this writer (not counting a resumed prefix)
+        self.bytes = 0
+        self._started = resume_records is not None
+        self._buf: List[str] = []
+        self._start()
+
+    def _start(self) -> None:
+        pass
+
+    def write(self, result: Tuple[str, str, str, str]) -> None:
+        if type(result[1]) is StreamedVariant:
+            self._stream(self._pieces(*result))
+            return
+        self._append(result[1] + "\n")
+
+    def begin_payload(self, original: str, streamed: bool = False) -> None:
+        """Mark where one payload's results start; only the corpus format records it."""
+
+    def write_results(self, results: Iterable[Tuple[str, str, str, str]]) -> None:
+        """Write all results of one payload: a PayloadResults or any iterable of tuples."""
+        if not isinstance(results, PayloadResults):
+            for result in results:
+                self.write(result)
+            return
+        if results.streamed:
+            for result in results:
+                self._stream(self._pieces(*result))
+            return
+        for variant in results.variants:
+            self._append(variant + "\n")
+
+    def _pieces(self, original: str, obfuscated, technique: str, category: str) -> Iterator[str]:
+        """One record as a sequence of pieces, encoded chunk by chunk."""
+        yield from variant_chunks(obfuscated)
+        yield "\n"
+
+    def _append(self, text: str) -> None:
+        """Buffer one serialized record."""
+        self._buf.append(text)
+        # isascii() is O(1); only non-ASCII records pay for an encode
+        self.bytes += len(text) if text.isascii() else len(text.encode("utf-8"))
+        self.count += 1
+        if len(self._buf) >= WRITE_BUFFER_RECORDS:
+            self._drain()
+
+    def _stream(self, pieces: Iterable[str]) -> None:
+        """Write one record straight to the file object, one piece at a time."""
+        self._drain()
+        fh = self.fh
+        for piece in pieces:
+            fh.write(piece)
+            self.bytes += len(piece) if piece.isascii() else len(piece.encode("utf-8"))
+        self.count += 1
+
+    def _raw(self, text: str) -> None:
+        """Write framing (not a record) straight through."""
+        self.fh.write(text)
+        self.bytes += len(text)
+
+    def _drain(self) -> None:
+        """Hand buffered records to the file object as one write."""
+        if self._buf:
+            self.fh.write("".join(self._buf))
+            self._buf.clear()
+
+    def flush(self) -> None:
+        self._drain()
+        self.fh.flush()
+
+    def tell(self) -> int:
+        """Byte offset of everything written so far (flushes first)."""
+        self.flush()
+        return self.fh.tell()
+
+    def _finish(self) -> None:
+        pass
+
+    def close(self) -> None:
+        try:
+            self._drain()
+            self._finish()
+            logger.info(
+                "Wrote %d obfuscated payloads (%s format) to %s",
+                self.count, self.format, self.path or "stdout",
+            )
+        finally:
+            if self.fh is not sys.stdout:
+                self.fh.close()
+            else:
+                self.fh.flush()
+
+
+class JsonLinesWriter(TextWriter):
+    """
+    Write one JSON object per line.
+
+    Produces the same text as json.dumps(entry, ensure_ascii=False) without
+    building a dict per record: the fixed keys are precomputed and only the
+    payload strings are escaped. Technique and category names come from a
+    small set, so their escaped forms are memoized, as is the original
+    payload (each one is repeated for all of its variants). The timestamp is
+    taken once per run, or once per written block with timestamp="batch".
+    """
+
+    format = "jsonl"
+
+    def __init__(
+        self,
+        output_path: Optional[str] = None,
+        resume_records: Optional[int] = None,
+        timestamp: str = "batch",
+        compress: Optional[str] = None,
+        compress_level: Optional[int] = None,
+    ):
+        if timestamp not in TIMESTAMP_MODES:
+            raise ValueError(f"Unsupported timestamp mode: {timestamp}. Use 'run' or 'batch'.")
+        self._per_batch = timestamp == "batch"
+        self._names: Dict[str, str] = {}
+        self._last_original: Optional[str] = None
+        self._original_prefix = ""
+        super().__init__(output_path, resume_records, timestamp, compress, compress_level)
+        self._stamp()
+
+    def _stamp(self) -> None:
+        self._suffix = ', "timestamp": ' + encode_basestring(_utc_now()) + "}"
+
+    def _name(self, name: str) -> str:
+        escaped = self._names.get(name)
+        if escaped is None:
+            escaped = self._names[name] = encode_basestring(name)
+        return escaped
+
+    def _record(self, original: str, obfuscated: str, technique: str, category: str) -> str:
+        if original is not self._last_original:
+            self._last_original = original
+            self._original_prefix = '{"original": ' + encode_basestring(original) + ', "obfuscated": '
+        return (
+            self._original_prefix + encode_basestring(obfuscated)
+            + ', "technique": ' + self._name(technique)
+            + ', "technique_category": ' + self._name(category)
+            + self._suffix
+        )
+
+    def _line(self, record: str) -> str:
+        return record + "\n"
+
+    def _frame(self) -> Tuple[str, str]:
+        """What _line() puts before and after a record."""
+        return "", "\n"
+
+    def _pieces(self, original: str, obfuscated, technique: str, category: str) -> Iterator[str]:
+        before, after = self._frame()
+        yield before + '{"original": "'
+        for text in text_chunks(original):
+            yield encode_basestring(text)[1:-1]
+        yield '", "obfuscated": "'
+        for text in variant_chunks(obfuscated):
+            yield encode_basestring(text)[1:-1]
+        yield (
+            '", "technique": ' + self._name(technique)
+            + ', "technique_category": ' + self._name(category)
+            + self._suffix + after
+        )
+
+    def write(self, result: Tuple[str, str, str, str]) -> None:
+        if type(result[1]) is StreamedVariant:
+            self._stream(self._pieces(*result))
+            return
+        self._append(self._line(self._record(*result)))
+
+    def write_results(self, results: Iterable[Tuple[str, str, str, str]]) -> None:
+        if not isinstance(results, PayloadResults) or results.streamed:
+            super().write_results(results)
+            return
+        original, record, line, append = results.original, self._record, self._line, self._append
+        for variant, (technique, category) in zip(results.variants, results.labels):
+            append(line(record(original, variant, technique, category)))
+
+    def _drain(self) -> None:
+        super()._drain()
+        if self._per_batch:
+            self._stamp()
+
+
+class JsonWriter(JsonLinesWriter):
+    """
+    Write a JSON array with metadata, streaming one object at a time.
+
+    Records are separated by writing ",\n" before every record but the
+    first, so the file is a valid prefix up to the end of any record and a
+    resumed run only has to append.
+    """
+
+    format = "json"
+
+    def _start(self) -> None:
+        if not self._started:
+            self._raw("[\n")
+
+    def _line(self, record: str) -> str:
+        return (",\n  " if self.count else "  ") + record
+
+    def _frame(self) -> Tuple[str, str]:
+        return (",\n  " if self.count else "  "), ""
+
+    def _finish(self) -> None:
+        self._raw("\n]\n")
+
+
+class TeeWriter:
+    """
+    Feed every result to several writers, so one engine pass produces
+    several outputs (e.g. text for a fuzzer and JSON for reporting) with
+    exactly the same variants. Each result tuple is shared, not copied.
+    """
+
+    format = "tee"
+
+    def __init__(self, writers: List[TextWriter]):
+        self.writers = list(writers)
+        self._writes = [w.write for w in self.writers]
+
+    @property
+    def count(self) -> int:
+        return self.writers[0].count
+
+    def write(self, result: Tuple[str, str, str, str]) -> None:
+        for write in self._writes:
+            write(result)
+
+    def write_results(self, results: Iterable[Tuple[str, str, str, str]]) -> None:
+        for w in self.writers:
+            w.write_results(results)
+
+    def flush(self) -> None:
+        for w in self.writers:
+            w.flush()
+
+    def close(self) -> None:
+        """Close every writer, even if one of them fails; re-raise the first error."""
+        error = None
+        for w in self.writers:
+            try:
+                w.close()
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+
+
+SHARD_KEYS = ("technique", "category")
+
+
+def _split_ext(output_path: str) -> Tuple[str, str]:
+    """out.jsonl.gz -> ("out", ".jsonl.gz")"""
+    root, ext = os.path.splitext(output_path)
+    if ext.lower() in COMPRESSED_EXTENSIONS:
+        root, inner = os.path.splitext(root)
+        ext = inner + ext
+    return root, ext
+
+
+def shard_path(output_path: str, key: Optional[str], index: Optional[int]) -> str:
+    """
+    out.jsonl.gz -> out.base64-00002.jsonl.gz: the routing key and/or shard
+    number go before the (possibly compressed) format extension.
+    """
+    root, ext = _split_ext(output_path)
+    if key is not None:
+        root += "." + "".join(c if c.isalnum() or c in "-_" else "_" for c in key)
+    if index is not None:
+        root += f"-{index:05d}"
+    return root + ext
+
+
+def manifest_path(output_path: str) -> str:
+    return _split_ext(output_path)[0] + ".manifest.json"
+
+
+class _Shard:
+    """One key's stream of shard files: the open writer plus running totals."""
+
+    __slots__ = ("writer", "index", "records", "bytes")
+
+    def __init__(self):
+        self.writer: Optional[TextWriter] = None
+        self.index = 0
+        self.records = 0
+        self.bytes = 0
+
+
+class ShardedWriter:
+    """
+    Split output over several files in the same format.
+
+    max_records / max_bytes roll to a new file once the current one has
+    reached that many records or bytes (a shard may overshoot max_bytes by
+    its last record). shard_by routes each record to a per-technique or
+    per-category stream of files; both can be combined. Every open shard
+    keeps its own buffered file handle until it is rolled or closed.
+
+    close() writes a manifest (manifest_path(output_path)) listing each
+    shard's path (relative to the manifest), key, record count and
+    record/byte range within its key's stream, so shards can be distributed
+    or concatenated back.
+    """
+
+    format = "sharded"
+
+    def __init__(
+        self,
+        fmt: str,
+        output_path: str,
+        max_records: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        shard_by: Optional[str] = None,
+        timestamp: str = "batch",
+        compress: Optional[str] = None,
+        compress_level: Optional[int] = None,
+    ):
+        if shard_by is not None and shard_by not in SHARD_KEYS:
+            raise ValueError(f"Unsupported shard key: {shard_by}. Use 'technique' or 'category'.")
+        self.shard_format = fmt
+        self.path = output_path
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.shard_by = shard_by
+        self._field = {None: None, "technique": 2, "category": 3}[shard_by]
+        self._rolling = bool(max_records or max_bytes)
+        self._options = (timestamp, compress, compress_level)
+        self._streams: Dict[Optional[str], _Shard] = {}
+        self.shards: List[Dict[str, object]] = []
+        self.count = 0
+
+    def _open(self, key: Optional[str], stream: _Shard) -> TextWriter:
+        path = shard_path(self.path, key, stream.index if self._rolling else None)
+        timestamp, compress, compress_level = self._options
+        stream.writer = open_writer(self.shard_format, path, None, timestamp, compress, compress_level)
+        return stream.writer
+
+    def _seal(self, key: Optional[str], stream: _Shard) -> None:
+        """Close the stream's current shard and add it to the manifest."""
+        writer = stream.writer
+        stream.writer = None
+        writer.close()
+        self.shards.append({
+            "path": os.path.relpath(writer.path, os.path.dirname(manifest_path(self.path)) or "."),
+            "key": key,
+            "index": stream.index,
+            "records": writer.count,
+            "record_range": [stream.records, stream.records + writer.count],
+            "bytes": writer.bytes,
+            "byte_range": [stream.bytes, stream.bytes + writer.bytes],
+        })
+        stream.index += 1
+        stream.records += writer.count
+        stream.bytes += writer.bytes
+
+    def write(self, result: Tuple[str, str, str, str]) -> None:
+        key = None if self._field is None else result[self._field]
+        stream = self._stream(key)
+        writer = stream.writer or self._open(key, stream)
+        writer.write(result)
+        self.count += 1
+        if (self.max_records and writer.count >= self.max_records) or (
+            self.max_bytes and writer.bytes >= self.max_bytes
+        ):
+            # Roll lazily: the next record for this key opens the next shard
+            self._seal(key, stream)
+
+    def _stream(self, key: Optional[str]) -> _Shard:
+        stream = self._streams.get(key)
+        if stream is None:
+            stream = self._streams[key] = _Shard()
+        return stream
+
+    def write_results(self, results: Iterable[Tuple[str, str, str, str]]) -> None:
+        """
+        Write all results of one payload. A PayloadResults reaches each
+        shard it touches as one payload (begin_payload() before its first
+        record there), so the corpus format keeps one payload record per
+        input payload; without shard_by a payload with no variants still
+        gets its record. Unrolled shards take whole per-key PayloadResults.
+        """
+        if not isinstance(results, PayloadResults):
+            for result in results:
+                self.write(result)
+            return
+        field = self._field
+        if not self._rolling:
+            if field is None:
+                groups = {None: results}
+            else:
+                groups = {}
+                for variant, label in zip(results.variants, results.labels):
+                    key = label[field - 2]
+                    group = groups.get(key)
+                    if group is None:
+                        group = groups[key] = PayloadResults(results.original, streamed=results.streamed)
+                    group.append(variant, label)
+            for key, group in groups.items():
+                stream = self._stream(key)
+                (stream.writer or self._open(key, stream)).write_results(group)
+            self.count += len(results)
+            return
+        original, streamed = results.original, results.streamed
+        if field is None and not results.variants:
+            stream = self._stream(None)
+            (stream.writer or self._open(None, stream)).begin_payload(original, streamed)
+            return
+        # Keys whose current shard has seen this payload's begin_payload()
+        started = set()
+        for variant, label in zip(results.variants, results.labels):
+            key = None if field is None else label[field - 2]
+            stream = self._stream(key)
+            writer = stream.writer or self._open(key, stream)
+            if key not in started:
+                writer.begin_payload(original, streamed)
+                started.add(key)
+            writer.write((original, variant) + label)
+            self.count += 1
+            if (self.max_records and writer.count >= self.max_records) or (
+                self.max_bytes and writer.bytes >= self.max_bytes
+            ):
+                self._seal(key, stream)
+                started.discard(key)
+
+    def flush(self) -> None:
+        for stream in self._streams.values():
+            if stream.writer is not None:
+                stream.writer.flush()
+
+    def close(self) -> None:
+        for key, stream in self._streams.items():
+            if stream.writer is not None:
+                self._seal(key, stream)
+        manifest = {
+            "format": self.shard_format,
+            "shard_by": self.shard_by,
+            "max_records": self.max_records,
+            "max_bytes": self.max_bytes,
+            "records": self.count,
+            "shards": self.shards,
+        }
+        path = manifest_path(self.path)
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(manifest, fh, indent=2, ensure_ascii=False)
+            fh.write("\n")
+        logger.info("Wrote %d records in %d shards; manifest: %s", self.count, len(self.shards), path)
+
+
+WRITERS = {
+    "text": TextWriter, "json": JsonWriter, "jsonl": JsonLinesWriter, "corpus": CorpusWriter,
+}
+
+
+def open_writer(
+    fmt: str,
+    output_path: Optional[str] = None,
+    resume_records: Optional[int] = None,
+    timestamp: str = "batch",
+    compress: Optional[str] = None,
+    compress_level: Optional[int] = None,
+) -> TextWriter:
+    return WRITERS[fmt](output_path, resume_records, timestamp, compress, compress_level)
+
+
 def write_text(
     results: Iterator[Tuple[str, str, str, str]],
     output_path: Optional[str] = None,
+    compress: Optional[str] = None,
+    compress_level: Optional[int] = None,
 ) -> None:
     """Write one obfuscated payload per line."""
-    fh = open(output_path, "w", encoding="utf-8") if output_path else sys.stdout
-    try:
-        count = 0
-        for _, obfuscated, _, _ in results:
-            fh.write(obfuscated + "\n")
-            count += 1
-        logger.info("Wrote %d obfuscated payloads (text format)", count)
-    finally:
-        if fh is not sys.stdout:
-            fh.close()
+    _write_all(TextWriter(output_path, compress=compress, compress_level=compress_level), results)
 
 
 def write_json(
     results: Iterator[Tuple[str, str, str, str]],
     output_path: Optional[str] = None,
+    compress: Optional[str] = None,
+    compress_level: Optional[int] = None,
 ) -> None:
     """Write JSON array with metadata, streaming one object at a time."""
-    fh = open(output_path, "w", encoding="utf-8") if output_path else sys.stdout
+    _write_all(JsonWriter(output_path, compress=compress, compress_level=compress_level), results)
+
+
+def write_jsonl(
+    results: Iterator[Tuple[str, str, str, str]],
+    output_path: Optional[str] = None,
+    compress: Optional[str] = None,
+    compress_level: Optional[int] = None,
+) -> None:
+    """Write one JSON object per line."""
+    _write_all(JsonLinesWriter(output_path, compress=compress, compress_level=compress_level), results)
+
+
+def _write_all(writer: TextWriter, results: Iterator[Tuple[str, str, str, str]]) -> None:
     try:
-        fh.write("[\n")
-        first = True
-        count = 0
-        for original, obfuscated, technique, category in results:
-            if not first:
-                fh.write(",\n")
-            entry = {
-                "original": original,
-                "obfuscated": obfuscated,
-                "technique": technique,
-                "technique_category": category,
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-            }
-            fh.write("  " + json.dumps(entry, ensure_ascii=False))
-            first = False
-            count += 1
-        fh.write("\n]\n")
-        logger.info("Wrote %d obfuscated payloads (JSON format)", count)
+        for result in results:
+            writer.write(result)
     finally:
-        if fh is not sys.stdout:
-            fh.close()
+        writer.close()
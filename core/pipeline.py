@@ -0,0 +1,290 @@
+"""Staged read -> obfuscate -> serialize -> write pipeline over bounded queues.
+
+The default path in poe.py is one synchronous generator chain, so reading,
+obfuscation and writing never overlap. run_pipeline() runs each stage on its
+own thread (obfuscation optionally in worker processes) and passes batches
+over bounded queues, so a slow stage applies backpressure instead of letting
+memory grow. Results are identical to the synchronous path: batches are
+formed the same way and every stage preserves order.
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from core.engine import DEFAULT_BATCH_SIZE, ObfuscationEngine, batched
+from core.output_handler import TextWriter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_BATCHES = 4
+STAGES = ("read", "obfuscate", "serialize", "write")
+
+_DONE = object()
+
+
+class StageTiming:
+    """Seconds a stage spent working and blocked on its input/output queues."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.busy = 0.0
+        self.wait_in = 0.0
+        self.wait_out = 0.0
+        self.items = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.name}: busy {self.busy:.2f}s, waited {self.wait_in:.2f}s in / "
+            f"{self.wait_out:.2f}s out, {self.items} items"
+        )
+
+
+class _Failed:
+    """Carries an exception from a stage thread to the stage consuming its queue."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class _Channel:
+    """
+    Bounded queue between two stages that records how long each side waited
+    and lets either side give up once the pipeline is stopping.
+    """
+
+    def __init__(self, maxsize: int, stop: threading.Event):
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._stop = stop
+
+    def put(self, item: Any, timing: Optional[StageTiming] = None) -> bool:
+        start = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                try:
+                    self._queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        finally:
+            if timing is not None:
+                timing.wait_out += time.perf_counter() - start
+
+    def get(self, timing: StageTiming) -> Any:
+        start = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                try:
+                    item = self._queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if isinstance(item, _Failed):
+                    raise item.error
+                return item
+            return _DONE
+        finally:
+            timing.wait_in += time.perf_counter() - start
+
+    def drain(self, timing: StageTiming) -> Iterator[Any]:
+        while True:
+            item = self.get(timing)
+            if item is _DONE:
+                return
+            yield item
+
+    def fail(self, error: BaseException) -> None:
+        self.put(_Failed(error))
+
+
+class _QueuedOutput:
+    """
+    Write stage: a file-object stand-in whose blocks are written to the real
+    file object on a separate thread. flush() and tell() first wait for the
+    queue to drain, so checkpoint offsets stay exact.
+    """
+
+    def __init__(self, fh, maxsize: int, stop: threading.Event, timing: StageTiming):
+        self._fh = fh
+        self._channel = _Channel(maxsize, stop)
+        self.timing = timing
+        self._serializer = StageTiming("serialize-out")
+        self._error: Optional[BaseException] = None
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="poe-write", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        timing = self.timing
+        for block in self._channel.drain(timing):
+            start = time.perf_counter()
+            try:
+                if self._error is None:
+                    self._fh.write(block)
+                    timing.items += 1
+            except BaseException as e:  # surfaced on the next write/flush/close
+                self._error = e
+            timing.busy += time.perf_counter() - start
+            with self._cond:
+                self._pending -= 1
+                self._cond.notify_all()
+
+    def _check(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def write(self, text: str) -> int:
+        self._check()
+        with self._cond:
+            self._pending += 1
+        self._channel.put(text, self._serializer)
+        return len(text)
+
+    def _wait(self) -> None:
+        with self._cond:
+            while self._pending and self._thread.is_alive():
+                self._cond.wait(0.1)
+        self._check()
+
+    def flush(self) -> None:
+        self._wait()
+        self._fh.flush()
+
+    def tell(self) -> int:
+        self._wait()
+        return self._fh.tell()
+
+    def close(self) -> None:
+        """
+        Wait for the write thread to finish once the pipeline is stopping;
+        the caller still owns (and closes) the real file object.
+        """
+        self._thread.join()
+
+    @property
+    def wait_out(self) -> float:
+        """Time the serializer spent blocked on a full write queue."""
+        return self._serializer.wait_out
+
+
+def run_pipeline(
+    engine: ObfuscationEngine,
+    payloads: Iterator[str],
+    writer: TextWriter,
+    workers: int = 1,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    queue_batches: int = DEFAULT_QUEUE_BATCHES,
+    on_payload_done: Optional[Callable[[], None]] = None,
+) -> Dict[str, StageTiming]:
+    """
+    Feed payloads through the engine into writer with one thread per stage.
+
+    read: pull batch_size payloads off the input iterator.
+    obfuscate: engine.process_batches(), in worker processes if workers > 1.
+    serialize: writer.write_results() per payload on the calling thread, then
+        on_payload_done() per payload, as in engine.process_stream().
+    write: hand the writer's blocks to its file object; a TeeWriter gets
+        one write thread per output, and the timing is summed over them.
+
+    Every queue holds at most queue_batches items. The writer is flushed
+    but not closed. Returns per-stage timings, which are also logged.
+    """
+    timings = {name: StageTiming(name) for name in STAGES}
+    stop = threading.Event()
+    to_obfuscate = _Channel(queue_batches, stop)
+    to_serialize = _Channel(queue_batches, stop)
+
+    def read() -> None:
+        timing = timings["read"]
+        try:
+            source = batched(payloads, batch_size)
+            while True:
+                start = time.perf_counter()
+                batch = next(source, None)
+                timing.busy += time.perf_counter() - start
+                if batch is None:
+                    break
+                timing.items += 1
+                if not to_obfuscate.put(batch, timing):
+                    return
+            to_obfuscate.put(_DONE, timing)
+        except BaseException as e:
+            to_obfuscate.fail(e)
+
+    def obfuscate() -> None:
+        timing = timings["obfuscate"]
+        try:
+            results = engine.process_batches(to_obfuscate.drain(timing), workers)
+            while True:
+                start = time.perf_counter()
+                # Includes time blocked on the read queue (wait_in), taken off below
+                batch_results = next(results, None)
+                timing.busy += time.perf_counter() - start
+                if batch_results is None:
+                    break
+                timing.items += 1
+                if not to_serialize.put(batch_results, timing):
+                    results.close()
+                    return
+            to_serialize.put(_DONE, timing)
+        except BaseException as e:
+            to_serialize.fail(e)
+
+    # Every output file (several with a TeeWriter) gets its own write thread
+    # (a ShardedWriter opens files as it goes, so it writes on the serializer thread)
+    leaves = [w for w in getattr(writer, "writers", [writer]) if hasattr(w, "fh")]
+    outputs = []
+    for leaf in leaves:
+        output = _QueuedOutput(leaf.fh, queue_batches, stop, StageTiming("write"))
+        outputs.append((leaf, leaf.fh, output))
+        leaf.fh = output
+    threads = [
+        threading.Thread(target=read, name="poe-read", daemon=True),
+        threading.Thread(target=obfuscate, name="poe-obfuscate", daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    # flush() drains the write queue before stop is set; after that the
+    # stage threads see stop and exit, also when the serializer has failed
+    serialize = timings["serialize"]
+    try:
+        for batch_results in to_serialize.drain(serialize):
+            start = time.perf_counter()
+            for results in batch_results:
+                writer.write_results(results)
+                if on_payload_done is not None:
+                    on_payload_done()
+            serialize.busy += time.perf_counter() - start
+            serialize.items += 1
+        writer.flush()
+    finally:
+        stop.set()
+        for leaf, fh, output in outputs:
+            try:
+                output.close()
+            finally:
+                leaf.fh = fh
+        for thread in threads:
+            thread.join()
+
+    # Blocks waiting on the write queue happen inside writer.write()
+    write = timings["write"]
+    for _, _, output in outputs:
+        write.busy += output.timing.busy
+        write.wait_in += output.timing.wait_in
+        write.items += output.timing.items
+        serialize.wait_out += output.wait_out
+    serialize.busy -= serialize.wait_out
+    timings["obfuscate"].busy -= timings["obfuscate"].wait_in
+    _log_timings(timings)
+    return timings
+
+
+def _log_timings(timings: Dict[str, StageTiming]) -> None:
+    bottleneck = max(timings.values(), key=lambda t: t.busy)
+    logger.info("Pipeline stages: %s", "; ".join(repr(t) for t in timings.values()))
+    logger.info("Pipeline bottleneck: %s (busy %.2fs)", bottleneck.name, bottleneck.busy)
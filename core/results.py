@@ -0,0 +1,136 @@
+"""Compact per-payload result storage."""
+
+import hashlib
+from collections.abc import Sequence
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+from techniques.base import get_technique_by_name, text_chunks
+
+# (technique, category) label of the preserved original (-p)
+ORIGINAL = ("original", "none")
+
+
+class StreamedVariant:
+    """
+    A variant of a payload above the streaming threshold, never held as a
+    string: chunks() encodes it from the payload piece by piece each time
+    it is read, and writers hand the pieces straight to their file object.
+
+    It refers to the technique by name, so it pickles (to and from worker
+    processes) as the payload plus a few fields. str() joins the pieces.
+    """
+
+    __slots__ = ("payload", "technique", "form", "_digest")
+
+    def __init__(self, payload: str, technique: str, form: int = 0):
+        self.payload = payload
+        self.technique = technique
+        self.form = form
+        self._digest: Optional[int] = None
+
+    def chunks(self) -> Iterator[str]:
+        return get_technique_by_name(self.technique).stream_chunks(self.payload, self.form)
+
+    def digest64(self) -> int:
+        """The core.dedup.digest64() of the joined variant, from one pass over the pieces."""
+        if self._digest is None:
+            self._digest = digest64_pieces(self.chunks())
+        return self._digest
+
+    def __str__(self) -> str:
+        return "".join(self.chunks())
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, StreamedVariant):
+            return NotImplemented
+        return (
+            self.technique == other.technique and self.form == other.form
+            and self.payload == other.payload
+        )
+
+    def __hash__(self) -> int:
+        return hash((self.technique, self.form, len(self.payload)))
+
+    def __repr__(self) -> str:
+        return f"StreamedVariant({self.technique!r}, form {self.form}, {len(self.payload)} chars)"
+
+
+def digest64_pieces(pieces: Iterable[str]) -> int:
+    """core.dedup.digest64() of "".join(pieces), without joining them."""
+    h = hashlib.blake2b(digest_size=8)
+    for piece in pieces:
+        h.update(piece.encode("utf-8", "surrogatepass"))
+    return int.from_bytes(h.digest(), "little")
+
+
+def variant_chunks(variant: Union[str, StreamedVariant]) -> Iterator[str]:
+    """A variant in pieces: a StreamedVariant's chunks, or slices of a string."""
+    if isinstance(variant, StreamedVariant):
+        return variant.chunks()
+    return text_chunks(variant)
+
+
+class PayloadResults(Sequence):
+    """
+    All results of one payload as parallel arrays: the original string once,
+    the variant strings, and per variant a (technique, category) label that
+    is shared by every variant the same technique call produced.
+
+    Compared with a list of (original, obfuscated, technique, category)
+    tuples this saves one tuple object per variant. Indexing and iteration
+    still produce those tuples (built on demand), so code that expects a
+    list of tuples keeps working; writers read the arrays directly through
+    write_results().
+
+    `streamed` marks the results of a payload above the streaming
+    threshold, whose variants are StreamedVariant objects (apart from a
+    preserved original); writers then write every record piece by piece.
+    """
+
+    __slots__ = ("original", "variants", "labels", "streamed")
+
+    def __init__(
+        self,
+        original: str,
+        variants: Optional[List[str]] = None,
+        labels: Optional[List[Tuple[str, str]]] = None,
+        streamed: bool = False,
+    ):
+        self.original = original
+        self.variants = variants if variants is not None else []
+        self.labels = labels if labels is not None else []
+        self.streamed = streamed
+
+    def append(self, variant: str, label: Tuple[str, str]) -> None:
+        self.variants.append(variant)
+        self.labels.append(label)
+
+    def __len__(self) -> int:
+        return len(self.variants)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self.variants)))]
+        technique, category = self.labels[index]
+        return (self.original, self.variants[index], technique, category)
+
+    def __iter__(self) -> Iterator[Tuple[str, str, str, str]]:
+        original = self.original
+        for variant, (technique, category) in zip(self.variants, self.labels):
+            yield (original, variant, technique, category)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, PayloadResults):
+            return (
+                self.original == other.original
+                and self.variants == other.variants
+                and self.labels == other.labels
+            )
+        if isinstance(other, (list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None  # mutable
+
+    def __repr__(self) -> str:
+        return f"PayloadResults({self.original!r}, {len(self.variants)} variants)"
@@ -0,0 +1,41 @@
+"""Adaptive technique scheduling for the engine's round-2 retries."""
+
+import random
+from collections import Counter
+from typing import List, Sequence
+
+from techniques.base import BaseTechnique
+
+
+class AdaptiveScheduler:
+    """
+    Picks round-2 retry techniques in proportion to how often each one has
+    produced a new unique variant so far in the run.
+
+    Deterministic techniques never make the retry pool: by the time round 2
+    starts the engine has already called every candidate once, and calling
+    a deterministic technique again cannot yield anything new.
+    """
+
+    def __init__(self) -> None:
+        self.calls: Counter = Counter()
+        self.hits: Counter = Counter()
+
+    def retry_pool(self, candidates: Sequence[BaseTechnique]) -> List[BaseTechnique]:
+        """Techniques still worth retrying once round 1 has run."""
+        return [t for t in candidates if not t.deterministic]
+
+    def record(self, technique: BaseTechnique, produced: int) -> None:
+        """Record one call that added `produced` unique variants."""
+        self.calls[technique.name] += 1
+        if produced:
+            self.hits[technique.name] += 1
+
+    def weight(self, technique: BaseTechnique) -> float:
+        # Laplace-smoothed hit rate, so unseen techniques start at 0.5
+        return (self.hits[technique.name] + 1) / (self.calls[technique.name] + 2)
+
+    def pick(self, pool: Sequence[BaseTechnique], rng=random) -> BaseTechnique:
+        if len(pool) == 1:
+            return pool[0]
+        return rng.choices(pool, weights=[self.weight(t) for t in pool])[0]
@@ -0,0 +1,122 @@
+"""Near-duplicate variant suppression with shingle MinHash signatures."""
+
+import sys
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from typing import FrozenSet, List, Optional, Set, Tuple
+
+# Distinct shingles kept exactly; longer variants get a bottom-k MinHash of this size
+SIGNATURE_SIZE = 256
+
+# Shingles are 4-byte windows of the UTF-8 text, read as 32-bit integers
+SHINGLE = 4
+_MULTIPLIER = 0x9E3779B1  # odd, so multiplying permutes the 32-bit values
+_MASK32 = 0xFFFFFFFF
+_INF = float("inf")
+
+
+def _shingles(data: bytes) -> Set[int]:
+    """Every 4-byte window of data as an integer, read with one array() per alignment."""
+    if len(data) < SHINGLE:
+        return {int.from_bytes(data, "little")}
+    words: Set[int] = set()
+    for offset in range(SHINGLE):
+        count = (len(data) - offset) // SHINGLE
+        if count:
+            aligned = array("I", data[offset:offset + count * SHINGLE])
+            if sys.byteorder == "big":
+                aligned.byteswap()
+            words.update(aligned)
+    return words
+
+
+def _bottom_k(words: Set[int], size: int) -> Tuple[FrozenSet[int], List[int], float]:
+    """The size smallest permuted shingle values, their sorted list and the cutoff."""
+    ordered = sorted({(w * _MULTIPLIER) & _MASK32 for w in words})
+    cutoff = _INF
+    if len(ordered) > size:
+        del ordered[size:]
+        cutoff = ordered[-1]
+    return frozenset(ordered), ordered, cutoff
+
+
+class Signature:
+    """
+    Shingle signature of one variant.
+
+    Variants with up to SIGNATURE_SIZE distinct shingles keep the exact
+    shingle set, which is built and compared in C and so is cheaper than a
+    MinHash in CPython. Longer ones keep a bottom-k MinHash instead: the
+    SIGNATURE_SIZE smallest permuted shingle values, where every permuted
+    value up to the cutoff is present, which is what makes two signatures
+    comparable. A short variant compared against a long one gets its
+    MinHash form computed on demand.
+    """
+
+    __slots__ = ("words", "shingles", "_bottom")
+
+    def __init__(self, text: str):
+        words = _shingles(text.encode("utf-8", "surrogatepass"))
+        self.shingles = len(words)
+        if len(words) <= SIGNATURE_SIZE:
+            self.words: Optional[Set[int]] = words
+            self._bottom = None
+        else:
+            self.words = None
+            self._bottom = _bottom_k(words, SIGNATURE_SIZE)
+
+    def bottom(self) -> Tuple[FrozenSet[int], List[int], float]:
+        if self._bottom is None:
+            self._bottom = _bottom_k(self.words, SIGNATURE_SIZE)
+        return self._bottom
+
+    def similarity(self, other: "Signature") -> float:
+        """
+        Jaccard similarity of the two shingle sets: exact between two short
+        variants, otherwise estimated from the hashes both signatures hold
+        up to the lower of their cutoffs.
+        """
+        if self.words is not None and other.words is not None:
+            both = len(self.words & other.words)
+            return both / (self.shingles + other.shingles - both)
+        hashes, ordered, cutoff = self.bottom()
+        other_hashes, other_ordered, other_cutoff = other.bottom()
+        both = len(hashes & other_hashes)
+        cutoff = min(cutoff, other_cutoff)
+        union = bisect_right(ordered, cutoff) + bisect_right(other_ordered, cutoff) - both
+        return both / union
+
+
+class NearDuplicateFilter:
+    """
+    Reject variants too similar to one already accepted for the same payload.
+
+    Each payload gets a list of accepted signatures (new_payload()); accept()
+    compares a candidate against them. Pairs whose shingle counts alone rule
+    out reaching the threshold (Jaccard <= smaller / larger set) are skipped
+    without a comparison, which avoids most of them because variants from
+    different techniques differ widely in length. Rejected candidates and
+    their UTF-8 bytes are counted in the `stats` Counter passed in (the
+    engine's) as near_dup_rejected / near_dup_bytes.
+    """
+
+    def __init__(self, threshold: float, stats: Optional[Counter] = None):
+        self.threshold = threshold
+        self.stats = stats if stats is not None else Counter()
+
+    def new_payload(self) -> List[Signature]:
+        return []
+
+    def accept(self, variant: str, accepted: List[Signature]) -> bool:
+        """Record variant in accepted and return True unless it is a near duplicate."""
+        sig = Signature(variant)
+        threshold = self.threshold
+        low, high = sig.shingles * threshold, sig.shingles / threshold
+        for other in accepted:
+            if low <= other.shingles <= high and sig.similarity(other) >= threshold:
+                self.stats["near_dup_rejected"] += 1
+                self.stats["near_dup_bytes"] += len(variant.encode("utf-8", "surrogatepass"))
+                return False
+        accepted.append(sig)
+        return True
@@ -0,0 +1,85 @@
+"""Persistent SQLite store of deterministic technique output for incremental re-runs."""
+
+import hashlib
+import json
+import logging
+import sqlite3
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# SQLite's default host-parameter limit is 999; leave room for the fixed ones
+_LOOKUP_CHUNK = 900
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS variants (
+    payload_hash BLOB NOT NULL,
+    technique TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    seed TEXT NOT NULL,
+    variants TEXT NOT NULL,
+    PRIMARY KEY (payload_hash, technique, version, seed)
+) WITHOUT ROWID
+"""
+
+
+class VariantStore:
+    """
+    Variants keyed by (payload hash, technique name, technique version, seed).
+
+    Writes are buffered and committed in batches of batch_size rows; the
+    database runs in WAL mode so worker processes can read while another
+    commits.
+    """
+
+    def __init__(self, path: str, seed: Optional[int] = None, batch_size: int = 1000):
+        self.path = path
+        self.seed = "" if seed is None else str(seed)
+        self.batch_size = batch_size
+        self._pending: List[Tuple[bytes, str, int, str, str]] = []
+        self._conn = sqlite3.connect(path, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    @staticmethod
+    def payload_hash(payload: str) -> bytes:
+        return hashlib.blake2b(payload.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+    def fetch(self, hashes: Sequence[bytes]) -> Dict[bytes, Dict[Tuple[str, int], List[str]]]:
+        """Return {payload hash: {(technique, version): variants}} for stored hashes."""
+        found: Dict[bytes, Dict[Tuple[str, int], List[str]]] = {}
+        for start in range(0, len(hashes), _LOOKUP_CHUNK):
+            chunk = hashes[start:start + _LOOKUP_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                "SELECT payload_hash, technique, version, variants FROM variants"
+                f" WHERE seed = ? AND payload_hash IN ({placeholders})",
+                (self.seed, *chunk),
+            )
+            for payload_hash, technique, version, variants in rows:
+                found.setdefault(payload_hash, {})[(technique, version)] = json.loads(variants)
+        return found
+
+    def put(self, technique: str, version: int, payload_hash: bytes, variants: List[str]) -> None:
+        self._pending.append(
+            (payload_hash, technique, version, self.seed, json.dumps(variants))
+        )
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Commit buffered rows in a single transaction."""
+        if not self._pending:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO variants VALUES (?, ?, ?, ?, ?)", self._pending,
+            )
+        logger.debug("Committed %d rows to variant store %s", len(self._pending), self.path)
+        self._pending.clear()
+
+    def close(self) -> None:
+        self.flush()
+        self._conn.close()
@@ -15,10 +15,22 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from core.engine import ObfuscationEngine, SECURITY_DISCLAIMER
-from core.input_handler import read_payloads
-from core.output_handler import write_text, write_json
+from core.dedup import DEFAULT_DEDUP_BYTES, DEFAULT_FP_RATE
+from core.compression import DEFAULT_LEVELS, compression_for
+from core.checkpoint import (
+    DEFAULT_CHECKPOINT_EVERY, Checkpointer, load_checkpoint, restore_rng, truncate_output,
+)
+from core.input_handler import STDIN, read_payloads, read_payloads_with_offsets
+from core.output_handler import (
+    SHARD_KEYS, TIMESTAMP_MODES, ShardedWriter, TeeWriter, open_writer,
+)
+from core.pipeline import run_pipeline
 from techniques import get_all_techniques
-from utils.validators import validate_multiplier, validate_format
+from utils.validators import (
+    validate_multiplier, validate_format, validate_workers, validate_cache_size,
+    validate_checkpoint_every, validate_compress_level, validate_tee, validate_size,
+    validate_shard_records, validate_fp_rate, validate_similarity,
+)
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -32,7 +44,7 @@ def build_parser() -> argparse.ArgumentParser:
     )
     parser.add_argument(
         "-i", "--input", required=True,
-        help="Input file path (one payload per line)",
+        help="Input file path, one payload per line (.gz is decompressed, - reads stdin)",
     )
     parser.add_argument(
         "-o", "--output", default=None,
@@ -40,20 +52,126 @@ def build_parser() -> argparse.ArgumentParser:
     )
     parser.add_argument(
         "-m", "--multiplier", type=int, default=5,
-        help="Variants per payload, 1-20 (default: 5)",
+        help="Variants per payload, 1-20, no upper limit with --enumerate (default: 5)",
     )
     parser.add_argument(
-        "-f", "--format", default="text", choices=["text", "json"],
+        "-f", "--format", default="text", choices=["text", "json", "jsonl", "corpus"],
         help="Output format (default: text)",
     )
+    parser.add_argument(
+        "--tee", action="append", default=[], metavar="FORMAT:PATH",
+        help="Also write the same results to PATH in FORMAT (text, json, jsonl, corpus); "
+             "repeatable, one engine pass feeds all outputs",
+    )
+    parser.add_argument(
+        "--shard-records", type=int, default=None, metavar="N",
+        help="Roll -o to a new shard file every N records",
+    )
+    parser.add_argument(
+        "--shard-bytes", default=None, metavar="SIZE",
+        help="Roll -o to a new shard file once it reaches SIZE bytes (e.g. 500M)",
+    )
+    parser.add_argument(
+        "--shard-by", default=None, choices=SHARD_KEYS,
+        help="Route records to one file (stream of shards) per technique or category",
+    )
+    parser.add_argument(
+        "--timestamp", default="batch", choices=TIMESTAMP_MODES,
+        help="JSON formats: take the timestamp once per run or once per written "
+             "block of records (default: batch)",
+    )
+    parser.add_argument(
+        "--compress", default=None, choices=sorted(DEFAULT_LEVELS),
+        help="Compress the output file (default: by extension: .gz, .bz2, .xz)",
+    )
+    parser.add_argument(
+        "--compress-level", type=int, default=None, metavar="N",
+        help="Compression level (default: gzip 6, bz2 9, xz 6)",
+    )
     parser.add_argument(
         "-t", "--techniques", nargs="+", default=None,
-        help=f"Techniques to use (default: all). Available: {technique_names}",
+        help=f"Techniques to use (default: all). Available: {technique_names}; "
+             "'a|b' composes techniques",
+    )
+    parser.add_argument(
+        "--chain", action="append", default=[], metavar="A|B[|C...]",
+        help="Add a composed technique that feeds every variant of A through B "
+             "(e.g. 'homoglyph|url_encode'); repeatable, added to -t or to all techniques",
     )
     parser.add_argument(
         "-p", "--preserve", action="store_true",
         help="Include original payload in output",
     )
+    parser.add_argument(
+        "-w", "--workers", type=int, default=1,
+        help="Worker processes for obfuscation (default: 1, no pool)",
+    )
+    parser.add_argument(
+        "--pipeline", action="store_true",
+        help="Run read, obfuscate, serialize and write as concurrent stages over "
+             "bounded queues and log per-stage timing",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=None,
+        help="Seed for reproducible output; each payload gets its own RNG "
+             "derived from (seed, payload), independent of order and --workers",
+    )
+    parser.add_argument(
+        "--cache-size", type=int, default=0, metavar="MB",
+        help="Memory budget of the deterministic-variant cache in MB; worth enabling "
+             "(e.g. 64) when the input repeats payloads (default: 0, off)",
+    )
+    parser.add_argument(
+        "--store", default=None, metavar="PATH",
+        help="SQLite file of deterministic variants reused across runs. Seeded runs store "
+             "only what they compute; unseeded runs pick techniques anew each run, so they "
+             "compute and store every applicable deterministic technique (default: off)",
+    )
+    parser.add_argument(
+        "--enumerate", action="store_true",
+        help="Sample -m distinct variants per payload from the countable variant spaces of "
+             "random_case, homoglyph, zero_width and string_concat (all of them when the "
+             "spaces are smaller), without retries",
+    )
+    parser.add_argument(
+        "--near-dup", type=float, default=None, metavar="THRESHOLD",
+        help="Skip variants whose estimated shingle similarity to a variant already kept "
+             "for the same payload is at least THRESHOLD (0-1, e.g. 0.8) and keep drawing",
+    )
+    parser.add_argument(
+        "--stream-threshold", default=None, metavar="SIZE",
+        help="Payloads of at least SIZE characters (e.g. 1M) only go through the encoders that "
+             "can stream them (base64, url_encode, html_entity_*, unicode_escape, hex_encode, "
+             "encoding_chain), encoded and written in fixed-size chunks (default: off)",
+    )
+    parser.add_argument(
+        "--global-dedup", action="store_true",
+        help="Drop variants already emitted for an earlier payload anywhere in the run",
+    )
+    parser.add_argument(
+        "--dedup-memory", default=None, metavar="SIZE",
+        help="Memory budget of --global-dedup's exact digest set before it switches "
+             f"to a Bloom filter (default: {DEFAULT_DEDUP_BYTES >> 20}M)",
+    )
+    parser.add_argument(
+        "--dedup-fp-rate", type=float, default=DEFAULT_FP_RATE, metavar="P",
+        help="False-positive rate of the Bloom filter: the share of new variants "
+             f"it may wrongly drop (default: {DEFAULT_FP_RATE})",
+    )
+    parser.add_argument(
+        "--checkpoint-every", type=int, default=0, metavar="N",
+        help="With -o, checkpoint progress to OUTPUT.ckpt every N payloads (e.g. "
+             f"{DEFAULT_CHECKPOINT_EVERY}) so the run can be resumed; a resumed run keeps "
+             f"checkpointing every {DEFAULT_CHECKPOINT_EVERY} unless given (default: 0, off)",
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="Resume an interrupted run from OUTPUT.ckpt (requires -o)",
+    )
+    parser.add_argument(
+        "--stats", action="store_true",
+        help="Log engine statistics (technique calls, skipped calls, cache hits, ...) when done",
+    )
     parser.add_argument(
         "-v", "--verbose", action="store_true",
         help="Enable verbose logging",
@@ -78,34 +196,176 @@ def main() -> None:
 
     # Validate arguments
     try:
-        validate_multiplier(args.multiplier)
+        validate_multiplier(args.multiplier, enumeration=args.enumerate)
         validate_format(args.format)
+        validate_workers(args.workers)
+        validate_cache_size(args.cache_size)
+        validate_checkpoint_every(args.checkpoint_every)
+        if args.resume and not args.output:
+            raise ValueError("--resume requires -o/--output")
+        if args.resume and args.input == STDIN:
+            raise ValueError("--resume cannot re-read stdin; pass the input as a file")
+        compress = compression_for(args.output, args.compress)
+        if compress and not args.output:
+            raise ValueError("--compress requires -o/--output")
+        if compress and args.compress_level is not None:
+            validate_compress_level(compress, args.compress_level)
+        if compress and args.resume:
+            raise ValueError("Compressed output cannot be resumed")
+        tees = [validate_tee(spec) for spec in args.tee]
+        if tees and args.resume:
+            raise ValueError("--resume is not supported with --tee")
+        if args.shard_records is not None:
+            validate_shard_records(args.shard_records)
+        shard_bytes = validate_size(args.shard_bytes) if args.shard_bytes is not None else None
+        sharded = bool(args.shard_records or shard_bytes or args.shard_by)
+        if sharded and not args.output:
+            raise ValueError("Sharded output requires -o/--output")
+        if sharded and args.resume:
+            raise ValueError("--resume is not supported with sharded output")
+        if args.format == "corpus" and (args.resume or not args.output):
+            raise ValueError("-f corpus needs -o/--output and cannot be resumed")
+        dedup_bytes = (
+            validate_size(args.dedup_memory) if args.dedup_memory is not None else DEFAULT_DEDUP_BYTES
+        )
+        validate_fp_rate(args.dedup_fp_rate)
+        if args.near_dup is not None:
+            validate_similarity(args.near_dup)
+        stream_threshold = (
+            validate_size(args.stream_threshold) if args.stream_threshold is not None else 0
+        )
+        if args.global_dedup and args.resume:
+            raise ValueError("--resume is not supported with --global-dedup")
+        if args.checkpoint_every:
+            # Checkpoints need a seekable input and a single output that can be
+            # truncated (and no dedup filter, whose contents they do not record)
+            if not args.output:
+                raise ValueError("--checkpoint-every requires -o/--output")
+            for option, used in (
+                ("stdin input", args.input == STDIN),
+                ("compressed output", compress),
+                ("--tee", tees),
+                ("sharded output", sharded),
+                ("-f corpus", args.format == "corpus"),
+                ("--global-dedup", args.global_dedup),
+            ):
+                if used:
+                    raise ValueError(f"--checkpoint-every is not supported with {option}")
     except ValueError as e:
         parser.error(str(e))
 
     # Build engine
+    technique_names = args.techniques
+    if args.chain:
+        technique_names = (technique_names or sorted(get_all_techniques())) + args.chain
     try:
         engine = ObfuscationEngine(
             multiplier=args.multiplier,
-            technique_names=args.techniques,
+            technique_names=technique_names,
             preserve_original=args.preserve,
             verbose=args.verbose,
+            cache_bytes=args.cache_size * 1024 * 1024,
+            store_path=args.store,
+            seed=args.seed,
+            dedup_bytes=dedup_bytes if args.global_dedup else 0,
+            dedup_fp_rate=args.dedup_fp_rate,
+            near_dup_threshold=args.near_dup or 0.0,
+            enumeration=args.enumerate,
+            stream_threshold=stream_threshold,
         )
     except (KeyError, ValueError) as e:
         parser.error(str(e))
 
+    log = logging.getLogger("poe")
+
+    # Resume: cut the output back to the last checkpoint and continue from there
+    state = None
+    if args.resume:
+        try:
+            state = load_checkpoint(args.output)
+            if state["format"] != args.format:
+                raise ValueError(
+                    f"Checkpoint was written with -f {state['format']}, not -f {args.format}"
+                )
+            truncate_output(args.output, state)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        restore_rng(state)
+        if "scheduler" in state:
+            engine.scheduler.calls.update(state["scheduler"]["calls"])
+            engine.scheduler.hits.update(state["scheduler"]["hits"])
+        log.info(
+            "Resuming after %d payloads (%d records already written)",
+            state["payloads"], state["records"],
+        )
+
     # Process pipeline
     start = time.monotonic()
-    payloads = read_payloads(args.input)
-    results = engine.process_stream(payloads)
-
-    if args.format == "json":
-        write_json(results, args.output)
+    if sharded:
+        writer = ShardedWriter(
+            args.format, args.output, args.shard_records, shard_bytes, args.shard_by,
+            args.timestamp, compress, args.compress_level,
+        )
     else:
-        write_text(results, args.output)
+        writer = open_writer(
+            args.format, args.output, state["records"] if state else None, args.timestamp,
+            compress, args.compress_level,
+        )
+    if tees:
+        writer = TeeWriter([writer] + [
+            open_writer(fmt, path, None, args.timestamp, None, args.compress_level)
+            for fmt, path in tees
+        ])
+    checkpointer = None
+    # Checkpointing is opt-in: it reads the input line by line to track offsets,
+    # which is slower than the chunked (and parallel) reader
+    checkpoint_every = args.checkpoint_every or (DEFAULT_CHECKPOINT_EVERY if args.resume else 0)
+    # The options checkpoints cannot work with were rejected above, for
+    # --checkpoint-every as for --resume
+    if checkpoint_every:
+        checkpointer = Checkpointer(
+            args.output, writer, checkpoint_every, state, engine.scheduler,
+        )
+        start_offset = state["input_offset"] if state else 0
+        payloads = checkpointer.track(read_payloads_with_offsets(args.input, start_offset))
+        on_payload_done = checkpointer.payload_done
+    else:
+        payloads = read_payloads(args.input, workers=args.workers)
+        on_payload_done = None
+
+    try:
+        if args.pipeline:
+            run_pipeline(
+                engine, payloads, writer, workers=args.workers, on_payload_done=on_payload_done,
+            )
+        else:
+            for results in engine.iter_results(payloads, workers=args.workers):
+                writer.write_results(results)
+                if on_payload_done is not None:
+                    on_payload_done()
+    finally:
+        writer.close()
+        engine.close()
+    if checkpointer is not None:
+        checkpointer.remove()
 
     elapsed = time.monotonic() - start
-    logging.getLogger("poe").info("Completed in %.2f seconds", elapsed)
+    log.info("Completed in %.2f seconds", elapsed)
+    if args.store:
+        log.info(
+            "Variant store: %d payloads reused, %d computed",
+            engine.stats["store_reused"], engine.stats["store_computed"],
+        )
+    if engine.near_dup is not None:
+        log.info(
+            "Near-duplicate filter: skipped %d candidate variants (%.1f KB) at similarity >= %.2f",
+            engine.stats["near_dup_rejected"], engine.stats["near_dup_bytes"] / 1024,
+            engine.near_dup.threshold,
+        )
+    if engine.dedup is not None:
+        log.info("Global dedup: %s", engine.dedup.summary())
+    if args.stats:
+        log.info("Engine stats: %s", engine.format_stats())
 
 
 if __name__ == "__main__":
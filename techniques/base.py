@@ -1,10 +1,177 @@
 """Base technique class and registry for POE."""
 
 import abc
-from typing import Dict, List, Type
+import binascii
+import random
+import re
+from functools import cached_property
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Type
 
 # Module-level registry
 _REGISTRY: Dict[str, "BaseTechnique"] = {}
+# Composed techniques built on demand by get_technique_by_name("a|b"), not registered
+_CHAINS: Dict[str, "ChainTechnique"] = {}
+
+CHAIN_SEPARATOR = "|"
+
+# Characters of payload per chunk for streamed encoding; a multiple of 3,
+# so chunks of ASCII text base64-encode without carrying bytes over
+STREAM_CHUNK = 48 * 1024
+
+# Opening or closing tag name, e.g. "<script" or "</script"
+TAG_PATTERN = re.compile(r'<(/?)(\w+)')
+
+# Payload feature probes: (bit, predicate) pairs evaluated once per payload
+_FEATURE_PROBES: List[Tuple[int, Callable[["PayloadContext"], bool]]] = []
+
+
+class PayloadContext:
+    """
+    Per-payload analysis shared by every technique that sees the payload.
+
+    The engine builds one context per payload; each property is computed on
+    first access and memoized, so techniques asking the same question of the
+    same payload only pay for it once.
+
+    `rng` is the random source stochastic techniques must draw from: a
+    per-payload random.Random in seeded runs, the global random module
+    otherwise.
+    """
+
+    def __init__(self, payload: str, rng=None):
+        self.payload = payload
+        self.rng = rng if rng is not None else random
+
+    @cached_property
+    def raw(self) -> bytes:
+        """UTF-8 encoding of the payload."""
+        return self.payload.encode()
+
+    @cached_property
+    def b64(self) -> str:
+        """Standard base64 of the UTF-8 bytes."""
+        return binascii.b2a_base64(self.raw, newline=False).decode("ascii")
+
+    @cached_property
+    def tokens(self) -> List[str]:
+        """Whitespace-separated tokens, as str.split() returns them."""
+        return self.payload.split()
+
+    @cached_property
+    def tag_matches(self) -> List["re.Match"]:
+        """TAG_PATTERN matches, in order; group(1) is "/" for closing tags."""
+        return list(TAG_PATTERN.finditer(self.payload)) if "<" in self.payload else []
+
+    @cached_property
+    def memo(self) -> Dict[Any, Any]:
+        """Per-payload scratch space, e.g. chain prefixes shared by composed techniques."""
+        return {}
+
+    @cached_property
+    def is_ascii(self) -> bool:
+        return self.payload.isascii()
+
+    @cached_property
+    def has_lt(self) -> bool:
+        return "<" in self.payload
+
+    @cached_property
+    def has_single_quote(self) -> bool:
+        return "'" in self.payload
+
+    @cached_property
+    def has_double_quote(self) -> bool:
+        return '"' in self.payload
+
+    @cached_property
+    def has_slash(self) -> bool:
+        return "/" in self.payload
+
+    @cached_property
+    def features(self) -> int:
+        """Bitmask of every registered feature probe that holds for the payload."""
+        mask = 0
+        for bit, probe in _FEATURE_PROBES:
+            if probe(self):
+                mask |= bit
+        return mask
+
+    def rewrite_tags(self, replace, closing: bool = True) -> str:
+        """
+        Rebuild the payload with each tag match replaced by replace(match).
+        With closing=False only opening tags ("<name") are rewritten.
+        """
+        payload = self.payload
+        parts = []
+        pos = 0
+        for m in self.tag_matches:
+            if not closing and m.group(1):
+                continue
+            parts.append(payload[pos:m.start()])
+            parts.append(replace(m))
+            pos = m.end()
+        parts.append(payload[pos:])
+        return "".join(parts)
+
+
+def register_feature(probe: Callable[[PayloadContext], bool]) -> int:
+    """Register a cheap payload predicate and return the feature bit it sets."""
+    bit = 1 << len(_FEATURE_PROBES)
+    _FEATURE_PROBES.append((bit, probe))
+    return bit
+
+
+FEATURE_MULTI_CHAR = register_feature(lambda ctx: len(ctx.payload) >= 2)
+FEATURE_MULTI_TOKEN = register_feature(lambda ctx: len(ctx.tokens) >= 2)
+FEATURE_TAG = register_feature(lambda ctx: ctx.has_lt)
+FEATURE_QUOTE = register_feature(lambda ctx: ctx.has_single_quote or ctx.has_double_quote)
+FEATURE_CASED = register_feature(lambda ctx: ctx.payload.upper() != ctx.payload.lower())
+
+
+def split_at_gaps(payload: str, mask: int) -> List[str]:
+    """Split payload at the gaps (between characters i and i+1) whose bit i is set in mask."""
+    parts = []
+    start = 0
+    gap = 0
+    while mask:
+        if mask & 1:
+            parts.append(payload[start:gap + 1])
+            start = gap + 1
+        mask >>= 1
+        gap += 1
+    parts.append(payload[start:])
+    return parts
+
+
+def text_chunks(payload: str, size: int = STREAM_CHUNK) -> Iterator[str]:
+    """payload in slices of size characters."""
+    for start in range(0, len(payload), size):
+        yield payload[start:start + size]
+
+
+def byte_chunks(payload: str, size: int = STREAM_CHUNK, align: int = 1) -> Iterator[bytes]:
+    """
+    UTF-8 bytes of payload, encoded size characters at a time and re-cut so
+    every piece but the last is a multiple of align bytes (3 for base64).
+    """
+    carry = b""
+    for text in text_chunks(payload, size):
+        data = carry + text.encode()
+        cut = len(data) - len(data) % align
+        carry = data[cut:]
+        if cut:
+            yield data[:cut]
+    if carry:
+        yield carry
+
+
+def contexts_for(
+    payloads: List[str], contexts: Optional[List[PayloadContext]] = None,
+) -> List[PayloadContext]:
+    """Return the engine-supplied contexts, or fresh ones for direct callers."""
+    if contexts is None:
+        return [PayloadContext(p) for p in payloads]
+    return contexts
 
 
 def register(cls: Type["BaseTechnique"]) -> Type["BaseTechnique"]:
@@ -26,6 +193,9 @@ def get_techniques_by_category(category: str) -> List["BaseTechnique"]:
 
 
 def get_technique_by_name(name: str) -> "BaseTechnique":
+    """Look up a technique; "a|b|c" returns the composition of registered techniques."""
+    if CHAIN_SEPARATOR in name:
+        return compose(name)
     if name not in _REGISTRY:
         raise KeyError(f"Unknown technique: {name}. Available: {sorted(_REGISTRY.keys())}")
     return _REGISTRY[name]
@@ -37,8 +207,45 @@ class BaseTechnique(abc.ABC):
       - name: str          unique identifier
       - category: str      grouping (encoding, mutation, structural, context)
       - obfuscate(payload: str) -> List[str]
+
+    Techniques may also override obfuscate_batch() when they can amortise
+    work across many payloads; the default simply loops over obfuscate().
+    Techniques whose variants are costly or random should override
+    iter_variants() with a generator so the engine can stop pulling as soon
+    as it has enough; the default wraps the obfuscate() list.
+
+    The engine passes a PayloadContext alongside each payload to both
+    methods; techniques should read shared analysis (bytes, tokens, tag
+    matches) from it rather than recomputing it.
+
+    Techniques that return no variants for some payloads declare the
+    feature bits they need: all of `requires`, and at least one of
+    `requires_any` when it is non-zero. The engine never calls a technique
+    on a payload whose PayloadContext.features don't satisfy them.
+
+    Set `deterministic = True` when the same payload always produces the
+    same variants; the engine then never retries the technique on a payload
+    it has already seen it run on, and may serve its output from a cache or
+    the persistent variant store. Bump `version` whenever a deterministic
+    technique's output changes so stored variants are not reused.
+
+    Techniques with a countable variant space (case masks, split points,
+    ...) may override variant_space() and unrank() for the engine's
+    enumeration mode: unrank() must map 0..variant_space()-1 to distinct
+    variants, none equal to the payload.
+
+    Techniques that can encode a payload piece by piece may override
+    stream_forms() and stream_chunks() for payloads above the engine's
+    streaming threshold, which are never held as whole variant strings.
+    Those payloads get no feature probes, so only techniques without
+    `requires` / `requires_any` are streamed.
     """
 
+    requires: int = 0
+    requires_any: int = 0
+    deterministic: bool = False
+    version: int = 1
+
     @property
     @abc.abstractmethod
     def name(self) -> str:
@@ -54,5 +261,181 @@ class BaseTechnique(abc.ABC):
         """Return one or more obfuscated variants of the payload."""
         ...
 
+    def obfuscate_batch(
+        self, payloads: List[str], contexts: Optional[List[PayloadContext]] = None,
+    ) -> List[List[str]]:
+        """Return obfuscate() results for each payload, in input order."""
+        obfuscate = self.obfuscate
+        return [obfuscate(p) for p in payloads]
+
+    def iter_variants(self, payload: str, ctx: Optional[PayloadContext] = None) -> Iterator[str]:
+        """Yield variants lazily; compatibility shim over obfuscate()."""
+        return iter(self.obfuscate(payload))
+
+    def variant_space(self, payload: str, ctx: Optional[PayloadContext] = None) -> int:
+        """Number of distinct variants unrank() produces for payload; 0 when not enumerable."""
+        return 0
+
+    def unrank(self, payload: str, index: int, ctx: Optional[PayloadContext] = None) -> str:
+        """Variant number index (0 <= index < variant_space()) of payload."""
+        raise NotImplementedError(f"{self.name} has no enumerable variant space")
+
+    @property
+    def is_enumerable(self) -> bool:
+        """True when the technique implements variant_space() / unrank()."""
+        return type(self).variant_space is not BaseTechnique.variant_space
+
+    def stream_forms(self, payload: str) -> int:
+        """
+        Number of forms stream_chunks() produces for payload. Forms that
+        obfuscate() leaves out when they equal another one (URL-safe base64
+        without "+" or "/") are still counted; the engine drops the repeats.
+        """
+        return 0
+
+    def stream_chunks(self, payload: str, form: int = 0, size: int = STREAM_CHUNK) -> Iterator[str]:
+        """
+        Variant number form of payload, in pieces encoded from size-character
+        chunks; joined, they equal the matching obfuscate() variant.
+        """
+        raise NotImplementedError(f"{self.name} cannot stream its variants")
+
+    @property
+    def is_streamable(self) -> bool:
+        """True when the technique implements stream_forms() / stream_chunks()."""
+        return type(self).stream_chunks is not BaseTechnique.stream_chunks
+
+    def applies_to(self, features: int) -> bool:
+        """True if a payload with these feature bits can yield variants."""
+        if features & self.requires != self.requires:
+            return False
+        return not self.requires_any or bool(features & self.requires_any)
+
+    @property
+    def is_lazy(self) -> bool:
+        """True when the technique produces variants through its own generator."""
+        return type(self).iter_variants is not BaseTechnique.iter_variants
+
     def __repr__(self) -> str:
         return f"<Technique:{self.name} category={self.category}>"
+
+
+def compose(spec: str) -> "ChainTechnique":
+    """The chain technique for a spec such as "homoglyph|url_encode" (memoized)."""
+    chain = _CHAINS.get(spec)
+    if chain is None:
+        names = [n.strip() for n in spec.split(CHAIN_SEPARATOR)]
+        if len(names) < 2 or not all(names):
+            raise ValueError(f"Invalid technique chain: {spec!r}. Use e.g. 'homoglyph|url_encode'.")
+        chain = _CHAINS[spec] = ChainTechnique([get_technique_by_name(n) for n in names])
+    return chain
+
+
+class _ChainNode:
+    """
+    Outputs of one chain prefix for one payload, produced on demand.
+
+    Every chain sharing the prefix reads the same node, so the prefix is
+    computed once per payload however many chains extend it; outputs are
+    only pulled from the source as far as some consumer has asked for.
+    """
+
+    __slots__ = ("outputs", "_source")
+
+    def __init__(self, source: Iterator[str]):
+        self.outputs: List[str] = []
+        self._source: Optional[Iterator[str]] = source
+
+    def __iter__(self) -> Iterator[str]:
+        outputs = self.outputs
+        i = 0
+        while True:
+            if i < len(outputs):
+                yield outputs[i]
+                i += 1
+            elif self._source is None:
+                return
+            else:
+                v = next(self._source, None)
+                if v is None:
+                    self._source = None
+                else:
+                    outputs.append(v)
+
+
+class ChainTechnique(BaseTechnique):
+    """
+    Technique composition: every variant of the first step is fed to the
+    second, and so on, e.g. homoglyph|url_encode.
+
+    The product of the steps' variants is expanded lazily, depth first, so
+    the engine only computes as many as it takes. Each prefix of the chain
+    is a node in PayloadContext.memo (a DAG across chains), with repeats
+    dropped at every level. When a chain is run again on the same payload
+    (a round-2 retry), memoized prefixes containing a stochastic step are
+    dropped first so the retry draws fresh variants.
+
+    A chain is filed under its last step's category, the form its output
+    ends up in (homoglyph|url_encode is an encoding).
+    """
+
+    def __init__(self, steps: List[BaseTechnique]):
+        self.steps = steps
+        self._name = CHAIN_SEPARATOR.join(step.name for step in steps)
+        self.deterministic = all(step.deterministic for step in steps)
+        # Unique for step versions below 1000
+        self.version = sum(step.version * 1000 ** i for i, step in enumerate(steps))
+        # Later steps are checked against each intermediate variant instead
+        self.requires = steps[0].requires
+        self.requires_any = steps[0].requires_any
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def category(self) -> str:
+        return self.steps[-1].category
+
+    def obfuscate(self, payload: str) -> List[str]:
+        return list(self.iter_variants(payload))
+
+    def obfuscate_batch(
+        self, payloads: List[str], contexts: Optional[List[PayloadContext]] = None,
+    ) -> List[List[str]]:
+        return [list(self.iter_variants(ctx.payload, ctx)) for ctx in contexts_for(payloads, contexts)]
+
+    def iter_variants(self, payload: str, ctx: Optional[PayloadContext] = None) -> Iterator[str]:
+        if ctx is None:
+            ctx = PayloadContext(payload)
+        memo = ctx.memo
+        key = ("chain", tuple(step.name for step in self.steps))
+        if key in memo:
+            for depth in range(1, len(self.steps) + 1):
+                if not all(step.deterministic for step in self.steps[:depth]):
+                    memo.pop(("chain", key[1][:depth]), None)
+        return iter(self._node(ctx, len(self.steps)))
+
+    def _node(self, ctx: PayloadContext, depth: int) -> _ChainNode:
+        key = ("chain", tuple(step.name for step in self.steps[:depth]))
+        node = ctx.memo.get(key)
+        if node is None:
+            step = self.steps[depth - 1]
+            inputs = iter((ctx.payload,)) if depth == 1 else iter(self._node(ctx, depth - 1))
+            node = ctx.memo[key] = _ChainNode(self._expand(step, inputs, ctx))
+        return node
+
+    @staticmethod
+    def _expand(step: BaseTechnique, inputs: Iterator[str], ctx: PayloadContext) -> Iterator[str]:
+        seen = set()
+        for text in inputs:
+            sub = ctx if text is ctx.payload else PayloadContext(text, ctx.rng)
+            if not step.applies_to(sub.features):
+                continue
+            try:
+                for v in step.iter_variants(text, sub):
+                    if v not in seen:
+                        seen.add(v)
+                        yield v
+            except Exception:
+                continue
@@ -1,50 +1,84 @@
 """Context-aware obfuscation techniques (JS, SQL, HTML)."""
 
-import re
-from typing import List
+from typing import List, Optional
 
-from techniques.base import BaseTechnique, register
+from techniques.base import (
+    FEATURE_MULTI_TOKEN, FEATURE_QUOTE, FEATURE_TAG,
+    BaseTechnique, PayloadContext, contexts_for, register,
+)
+from techniques.tables import CodepointTable
 
 
 @register
 class JsTemplateLiteral(BaseTechnique):
     name = "js_template_literal"
     category = "context"
+    deterministic = True
 
     def obfuscate(self, payload: str) -> List[str]:
         escaped = payload.replace("`", "\\`").replace("${", "\\${")
         return [f"`{escaped}`"]
 
+    def obfuscate_batch(
+        self, payloads: List[str], contexts: Optional[List[PayloadContext]] = None,
+    ) -> List[List[str]]:
+        return [
+            ["`" + p.replace("`", "\\`").replace("${", "\\${") + "`"]
+            for p in payloads
+        ]
+
 
 @register
 class JsEvalWrap(BaseTechnique):
     name = "js_eval_wrap"
     category = "context"
+    deterministic = True
+
+    # Each code point maps to "NN,"; the trailing comma is sliced off
+    CHAR_CODES = CodepointTable(lambda cp: f"{cp},")
 
     def obfuscate(self, payload: str) -> List[str]:
-        char_codes = ",".join(str(ord(c)) for c in payload)
-        return [
-            f'eval("{payload}")',
-            f"eval(String.fromCharCode({char_codes}))",
-        ]
+        return self.obfuscate_batch([payload])[0]
+
+    def obfuscate_batch(
+        self, payloads: List[str], contexts: Optional[List[PayloadContext]] = None,
+    ) -> List[List[str]]:
+        encode = self.CHAR_CODES.encode
+        batch = []
+        for payload in payloads:
+            char_codes = encode(payload)[:-1]
+            batch.append([
+                f'eval("{payload}")',
+                f"eval(String.fromCharCode({char_codes}))",
+            ])
+        return batch
 
 
 @register
 class SqlCommentInject(BaseTechnique):
     name = "sql_comment_inject"
     category = "context"
+    deterministic = True
+    requires = FEATURE_MULTI_TOKEN
 
     def obfuscate(self, payload: str) -> List[str]:
-        words = payload.split()
-        if len(words) < 2:
-            return []
-        return ["/**/".join(words)]
+        return self.obfuscate_batch([payload])[0]
+
+    def obfuscate_batch(
+        self, payloads: List[str], contexts: Optional[List[PayloadContext]] = None,
+    ) -> List[List[str]]:
+        batch = []
+        for ctx in contexts_for(payloads, contexts):
+            words = ctx.tokens
+            batch.append(["/**/".join(words)] if len(words) > 1 else [])
+        return batch
 
 
 @register
 class SqlKeywordSplit(BaseTechnique):
     name = "sql_keyword_split"
     category = "context"
+    deterministic = True
 
     SQL_KEYWORDS = {
         "SELECT", "FROM", "WHERE", "AND", "OR", "UNION",
@@ -52,47 +86,77 @@ class SqlKeywordSplit(BaseTechnique):
     }
 
     def obfuscate(self, payload: str) -> List[str]:
-        words = payload.split()
-        result = []
-        for w in words:
-            if w.upper() in self.SQL_KEYWORDS and len(w) > 2:
-                mid = len(w) // 2
-                result.append(f"{w[:mid]}/**/{w[mid:]}")
-            else:
-                result.append(w)
-        joined = " ".join(result)
-        return [joined] if joined != payload else []
+        return self.obfuscate_batch([payload])[0]
+
+    def obfuscate_batch(
+        self, payloads: List[str], contexts: Optional[List[PayloadContext]] = None,
+    ) -> List[List[str]]:
+        keywords = self.SQL_KEYWORDS
+        batch = []
+        for payload, ctx in zip(payloads, contexts_for(payloads, contexts)):
+            result = []
+            for w in ctx.tokens:
+                if len(w) > 2 and w.upper() in keywords:
+                    mid = len(w) // 2
+                    result.append(f"{w[:mid]}/**/{w[mid:]}")
+                else:
+                    result.append(w)
+            joined = " ".join(result)
+            batch.append([joined] if joined != payload else [])
+        return batch
 
 
 @register
 class HtmlAttributeVariation(BaseTechnique):
     name = "html_attr_variation"
     category = "context"
+    deterministic = True
+    requires_any = FEATURE_QUOTE | FEATURE_TAG
+
+    @staticmethod
+    def _upper_tag(m) -> str:
+        return f"<{m.group(1)}{m.group(2).upper()}"
 
     def obfuscate(self, payload: str) -> List[str]:
-        results = []
-        if "'" in payload:
-            results.append(payload.replace("'", '"'))
-        if '"' in payload:
-            results.append(payload.replace('"', "'"))
-        if "<" in payload:
-            results.append(re.sub(
-                r'<(/?)(\w+)',
-                lambda m: f"<{m.group(1)}{m.group(2).upper()}",
-                payload,
-            ))
-        return results
+        return self.obfuscate_batch([payload])[0]
+
+    def obfuscate_batch(
+        self, payloads: List[str], contexts: Optional[List[PayloadContext]] = None,
+    ) -> List[List[str]]:
+        upper_tag = self._upper_tag
+        batch = []
+        for payload, ctx in zip(payloads, contexts_for(payloads, contexts)):
+            results = []
+            if ctx.has_single_quote:
+                results.append(payload.replace("'", '"'))
+            if ctx.has_double_quote:
+                results.append(payload.replace('"', "'"))
+            if ctx.has_lt:
+                results.append(ctx.rewrite_tags(upper_tag))
+            batch.append(results)
+        return batch
 
 
 @register
 class HtmlTagMutation(BaseTechnique):
     name = "html_tag_mutation"
     category = "context"
+    deterministic = True
+    requires = FEATURE_TAG
 
     def obfuscate(self, payload: str) -> List[str]:
-        if "<" not in payload:
-            return []
-        results = []
-        results.append(re.sub(r'<(\w+)', r'< \1', payload))
-        results.append(re.sub(r'<(\w+)', r'<\1/', payload))
-        return results
+        return self.obfuscate_batch([payload])[0]
+
+    def obfuscate_batch(
+        self, payloads: List[str], contexts: Optional[List[PayloadContext]] = None,
+    ) -> List[List[str]]:
+        batch = []
+        for ctx in contexts_for(payloads, contexts):
+            if not ctx.has_lt:
+                batch.append([])
+            else:
+                batch.append([
+                    ctx.rewrite_tags(lambda m: f"< {m.group(2)}", closing=False),
+                    ctx.rewrite_tags(lambda m: f"<{m.group(2)}/", closing=False),
+                ])
+        return batch
@@ -1,74 +1,189 @@
 """Encoding-based obfuscation techniques."""
 
-import base64
+import binascii
 import urllib.parse
-from typing import List
+from typing import Iterator, List, Optional
 
-from techniques.base import BaseTechnique, register
+from techniques.base import (
+    STREAM_CHUNK, BaseTechnique, PayloadContext, byte_chunks, contexts_for, register, text_chunks,
+)
+from techniques.tables import CodepointTable
 
 
 @register
 class Base64Encode(BaseTechnique):
     name = "base64"
     category = "encoding"
+    deterministic = True
+
+    # The URL-safe alphabet only differs in these two symbols
+    _URLSAFE = str.maketrans("+/", "-_")
 
     def obfuscate(self, payload: str) -> List[str]:
-        standard = base64.b64encode(payload.encode()).decode()
-        urlsafe = base64.urlsafe_b64encode(payload.encode()).decode()
-        results = [standard]
-        if urlsafe != standard:
-            results.append(urlsafe)
-        return results
+        return self.obfuscate_batch([payload])[0]
+
+    def obfuscate_batch(
+        self, payloads: List[str], contexts: Optional[List[PayloadContext]] = None,
+    ) -> List[List[str]]:
+        urlsafe_table = self._URLSAFE
+        batch = []
+        for ctx in contexts_for(payloads, contexts):
+            standard = ctx.b64
+            urlsafe = standard.translate(urlsafe_table)
+            batch.append([standard, urlsafe] if urlsafe != standard else [standard])
+        return batch
+
+    def stream_forms(self, payload: str) -> int:
+        return 2
+
+    def stream_chunks(self, payload: str, form: int = 0, size: int = STREAM_CHUNK) -> Iterator[str]:
+        for data in byte_chunks(payload, size, align=3):
+            standard = binascii.b2a_base64(data, newline=False).decode("ascii")
+            yield standard.translate(self._URLSAFE) if form else standard
 
 
 @register
 class UrlEncode(BaseTechnique):
     name = "url_encode"
     category = "encoding"
+    deterministic = True
 
     def obfuscate(self, payload: str) -> List[str]:
-        full = urllib.parse.quote(payload, safe="")
-        partial = urllib.parse.quote(payload)
-        results = [full]
-        if partial != full:
-            results.append(partial)
-        return results
+        return self.obfuscate_batch([payload])[0]
+
+    def obfuscate_batch(
+        self, payloads: List[str], contexts: Optional[List[PayloadContext]] = None,
+    ) -> List[List[str]]:
+        quote = urllib.parse.quote_from_bytes
+        batch = []
+        for ctx in contexts_for(payloads, contexts):
+            full = quote(ctx.raw, safe="")
+            # quote() with the default safe="/" only differs by leaving "/" alone,
+            # and "%2F" can only appear in the full form as an escaped "/"
+            if ctx.has_slash:
+                batch.append([full, full.replace("%2F", "/")])
+            else:
+                batch.append([full])
+        return batch
+
+    def stream_forms(self, payload: str) -> int:
+        return 2 if "/" in payload else 1
+
+    def stream_chunks(self, payload: str, form: int = 0, size: int = STREAM_CHUNK) -> Iterator[str]:
+        quote = urllib.parse.quote_from_bytes
+        for data in byte_chunks(payload, size):
+            full = quote(data, safe="")
+            yield full.replace("%2F", "/") if form else full
 
 
 @register
 class HtmlEntityDecimal(BaseTechnique):
     name = "html_entity_decimal"
     category = "encoding"
+    deterministic = True
+
+    TABLE = CodepointTable(lambda cp: f"&#{cp};")
 
     def obfuscate(self, payload: str) -> List[str]:
-        return ["".join(f"&#{ord(c)};" for c in payload)]
+        return [self.TABLE.encode(payload)]
+
+    def obfuscate_batch(
+        self, payloads: List[str], contexts: Optional[List[PayloadContext]] = None,
+    ) -> List[List[str]]:
+        encode = self.TABLE.encode
+        return [[encode(p)] for p in payloads]
+
+    def stream_forms(self, payload: str) -> int:
+        return 1
+
+    def stream_chunks(self, payload: str, form: int = 0, size: int = STREAM_CHUNK) -> Iterator[str]:
+        encode = self.TABLE.encode
+        for text in text_chunks(payload, size):
+            yield encode(text)
 
 
 @register
 class HtmlEntityHex(BaseTechnique):
     name = "html_entity_hex"
     category = "encoding"
+    deterministic = True
+
+    TABLE = CodepointTable(lambda cp: f"&#x{cp:x};")
 
     def obfuscate(self, payload: str) -> List[str]:
-        return ["".join(f"&#x{ord(c):x};" for c in payload)]
+        return [self.TABLE.encode(payload)]
+
+    def obfuscate_batch(
+        self, payloads: List[str], contexts: Optional[List[PayloadContext]] = None,
+    ) -> List[List[str]]:
+        encode = self.TABLE.encode
+        return [[encode(p)] for p in payloads]
+
+    def stream_forms(self, payload: str) -> int:
+        return 1
+
+    def stream_chunks(self, payload: str, form: int = 0, size: int = STREAM_CHUNK) -> Iterator[str]:
+        encode = self.TABLE.encode
+        for text in text_chunks(payload, size):
+            yield encode(text)
 
 
 @register
 class UnicodeEscape(BaseTechnique):
     name = "unicode_escape"
     category = "encoding"
+    deterministic = True
+
+    TABLE = CodepointTable(lambda cp: f"\\u{cp:04x}")
 
     def obfuscate(self, payload: str) -> List[str]:
-        short = "".join(f"\\u{ord(c):04x}" for c in payload)
-        return [short]
+        return [self.TABLE.encode(payload)]
+
+    def obfuscate_batch(
+        self, payloads: List[str], contexts: Optional[List[PayloadContext]] = None,
+    ) -> List[List[str]]:
+        encode = self.TABLE.encode
+        return [[encode(p)] for p in payloads]
+
+    def stream_forms(self, payload: str) -> int:
+        return 1
+
+    def stream_chunks(self, payload: str, form: int = 0, size: int = STREAM_CHUNK) -> Iterator[str]:
+        encode = self.TABLE.encode
+        for text in text_chunks(payload, size):
+            yield encode(text)
 
 
 @register
 class HexEncode(BaseTechnique):
     name = "hex_encode"
     category = "encoding"
+    deterministic = True
 
     def obfuscate(self, payload: str) -> List[str]:
-        plain = payload.encode().hex()
-        prefixed = "".join(f"\\x{b:02x}" for b in payload.encode())
-        return [plain, prefixed]
+        return self.obfuscate_batch([payload])[0]
+
+    def obfuscate_batch(
+        self, payloads: List[str], contexts: Optional[List[PayloadContext]] = None,
+    ) -> List[List[str]]:
+        raws = [ctx.raw for ctx in contexts_for(payloads, contexts)]
+        # One hex() call over the whole chunk, then slice each payload back out
+        joined = b"".join(raws).hex()
+        batch = []
+        pos = 0
+        for raw in raws:
+            end = pos + 2 * len(raw)
+            plain = joined[pos:end]
+            # bytes.hex() only takes a one-character separator, so split with a
+            # space and widen it to the \x prefix afterwards
+            prefixed = "\\x" + raw.hex(" ").replace(" ", "\\x") if raw else ""
+            batch.append([plain, prefixed])
+            pos = end
+        return batch
+
+    def stream_forms(self, payload: str) -> int:
+        return 2
+
+    def stream_chunks(self, payload: str, form: int = 0, size: int = STREAM_CHUNK) -> Iterator[str]:
+        for data in byte_chunks(payload, size):
+            yield "\\x" + data.hex(" ").replace(" ", "\\x") if form else data.hex()
@@ -1,48 +1,140 @@
 """Character mutation obfuscation techniques."""
 
 import random
-from typing import List
+import sys
+from array import array
+from typing import Iterator, List, Optional, Tuple
 
-from techniques.base import BaseTechnique, register
+from techniques.base import (
+    FEATURE_CASED, BaseTechnique, PayloadContext, register, register_feature, split_at_gaps,
+)
 
 
 @register
 class RandomCase(BaseTechnique):
     name = "random_case"
     category = "mutation"
+    requires = FEATURE_CASED
 
     def obfuscate(self, payload: str) -> List[str]:
-        results = []
+        return list(self.iter_variants(payload))
+
+    # Lowercase ASCII letter -> 0x20, the bit that flips its case; else 0
+    _CASE_BITS = bytes(0x20 if 0x61 <= b <= 0x7A else 0 for b in range(256))
+
+    def iter_variants(self, payload: str, ctx: Optional[PayloadContext] = None) -> Iterator[str]:
+        if not payload:
+            return
+        rng = ctx.rng if ctx is not None else random
+        n = len(payload)
+        if payload.isascii():
+            # Whole-payload integer arithmetic: XOR the lowercase bytes with
+            # random bits masked to each letter's case bit
+            lower = payload.lower().encode("ascii")
+            base = int.from_bytes(lower, "little")
+            letters = int.from_bytes(lower.translate(self._CASE_BITS), "little")
+            for _ in range(3):
+                flips = rng.getrandbits(8 * n) & letters
+                variant = (base ^ flips).to_bytes(n, "little").decode("ascii")
+                if variant != payload:
+                    yield variant
+            return
+        # One random bit per character, picking from the upper/lower forms
+        upper, lower = payload.upper(), payload.lower()
+        if len(upper) != n or len(lower) != n:  # a character changes length
+            upper = [c.upper() for c in payload]
+            lower = [c.lower() for c in payload]
         for _ in range(3):
-            variant = "".join(
-                c.upper() if random.random() > 0.5 else c.lower()
-                for c in payload
-            )
+            bits = format(rng.getrandbits(n), f"0{n}b")
+            variant = "".join(u if b == "1" else l for u, l, b in zip(upper, lower, bits))
             if variant != payload:
-                results.append(variant)
-        return results
+                yield variant
+
+    def _case_positions(
+        self, payload: str, ctx: Optional[PayloadContext],
+    ) -> Tuple[List[int], Optional[int]]:
+        """
+        Positions whose character has distinct one-character upper and lower
+        forms, and the case mask that reproduces the payload (None if the
+        payload has a titlecase letter no mask gives back).
+        """
+        memo = ctx.memo if ctx is not None else {}
+        cached = memo.get("random_case")
+        if cached is None:
+            positions: List[int] = []
+            identity: Optional[int] = 0
+            for i, c in enumerate(payload):
+                upper, lower = c.upper(), c.lower()
+                if upper == lower or len(upper) != 1 or len(lower) != 1:
+                    continue
+                if identity is not None:
+                    if c == upper:
+                        identity |= 1 << len(positions)
+                    elif c != lower:
+                        identity = None
+                positions.append(i)
+            cached = memo["random_case"] = (positions, identity)
+        return cached
+
+    def variant_space(self, payload: str, ctx: Optional[PayloadContext] = None) -> int:
+        # Every case mask over the cased positions but the payload's own
+        positions, identity = self._case_positions(payload, ctx)
+        if not positions:
+            return 0
+        return (1 << len(positions)) - (identity is not None)
+
+    def unrank(self, payload: str, index: int, ctx: Optional[PayloadContext] = None) -> str:
+        positions, identity = self._case_positions(payload, ctx)
+        mask = index + 1 if identity is not None and index >= identity else index
+        chars = list(payload)
+        for p in positions:
+            chars[p] = chars[p].upper() if mask & 1 else chars[p].lower()
+            mask >>= 1
+        return "".join(chars)
 
 
 @register
 class AlternatingCase(BaseTechnique):
     name = "alternating_case"
     category = "mutation"
+    deterministic = True
+    requires = FEATURE_CASED
 
     def obfuscate(self, payload: str) -> List[str]:
-        v1 = "".join(c.upper() if i % 2 == 0 else c.lower() for i, c in enumerate(payload))
-        v2 = "".join(c.lower() if i % 2 == 0 else c.upper() for i, c in enumerate(payload))
-        results = []
+        return list(self.iter_variants(payload))
+
+    def iter_variants(self, payload: str, ctx: Optional[PayloadContext] = None) -> Iterator[str]:
+        upper, lower = payload.upper(), payload.lower()
+        if payload.isascii():
+            # Interleave the upper- and lowercase bytes by slice assignment
+            v1b, v2b = bytearray(lower.encode("ascii")), bytearray(upper.encode("ascii"))
+            v1b[0::2], v2b[0::2] = v2b[0::2], v1b[0::2]
+            v1, v2 = v1b.decode("ascii"), v2b.decode("ascii")
+        else:
+            if len(upper) != len(payload) or len(lower) != len(payload):
+                upper = [c.upper() for c in payload]
+                lower = [c.lower() for c in payload]
+            v1, v2 = list(lower), list(upper)
+            v1[0::2], v2[0::2] = upper[0::2], lower[0::2]
+            v1, v2 = "".join(v1), "".join(v2)
         if v1 != payload:
-            results.append(v1)
+            yield v1
         if v2 != payload and v2 != v1:
-            results.append(v2)
-        return results
+            yield v2
+
+
+# Payload contains at least one letter HomoglyphSubstitution can replace
+FEATURE_HOMOGLYPH = register_feature(
+    lambda ctx: not HomoglyphSubstitution.HOMOGLYPHS.keys().isdisjoint(ctx.payload)
+)
 
 
 @register
 class HomoglyphSubstitution(BaseTechnique):
     name = "homoglyph"
     category = "mutation"
+    deterministic = True
+    requires = FEATURE_HOMOGLYPH
 
     HOMOGLYPHS = {
         'a': '\u0430', 'e': '\u0435', 'o': '\u043e', 'p': '\u0440',
@@ -53,18 +145,68 @@ class HomoglyphSubstitution(BaseTechnique):
     }
 
     def obfuscate(self, payload: str) -> List[str]:
-        full = "".join(self.HOMOGLYPHS.get(c, c) for c in payload)
+        # One C-level replace() per letter present: str.translate() with
+        # non-ASCII replacements goes through a per-character lookup and is
+        # more than ten times slower on long payloads
+        full = payload
+        for c, glyph in self.HOMOGLYPHS.items():
+            if c in full:
+                full = full.replace(c, glyph)
         if full == payload:
             return []
         return [full]
 
+    def _positions(self, payload: str, ctx: Optional[PayloadContext]) -> List[int]:
+        memo = ctx.memo if ctx is not None else {}
+        positions = memo.get("homoglyph")
+        if positions is None:
+            homoglyphs = self.HOMOGLYPHS
+            positions = memo["homoglyph"] = [i for i, c in enumerate(payload) if c in homoglyphs]
+        return positions
+
+    def variant_space(self, payload: str, ctx: Optional[PayloadContext] = None) -> int:
+        # Every non-empty subset of the substitutable positions
+        return (1 << len(self._positions(payload, ctx))) - 1
+
+    def unrank(self, payload: str, index: int, ctx: Optional[PayloadContext] = None) -> str:
+        mask = index + 1
+        chars = list(payload)
+        homoglyphs = self.HOMOGLYPHS
+        for p in self._positions(payload, ctx):
+            if mask & 1:
+                chars[p] = homoglyphs[chars[p]]
+            mask >>= 1
+        return "".join(chars)
+
 
 @register
 class ZeroWidthInsertion(BaseTechnique):
     name = "zero_width"
     category = "mutation"
+    deterministic = True
 
     ZWSP = '\u200b'
+    _UTF16 = "utf-16-le" if sys.byteorder == "little" else "utf-16-be"
+    _ARRAY_MIN = 256  # below this, str.join() is faster than building arrays
 
     def obfuscate(self, payload: str) -> List[str]:
+        n = len(payload)
+        if n >= self._ARRAY_MIN:
+            units = array("H", payload.encode(self._UTF16, "surrogatepass"))
+            if len(units) == n:  # no characters outside the BMP
+                # Fill with ZWSP and drop the payload into every other slot,
+                # instead of str.join() splitting it into one-character strings
+                out = array("H", [ord(self.ZWSP)]) * (2 * n - 1)
+                out[0::2] = units
+                return [out.tobytes().decode(self._UTF16, "surrogatepass")]
         return [self.ZWSP.join(payload)]
+
+    def variant_space(self, payload: str, ctx: Optional[PayloadContext] = None) -> int:
+        # Every non-empty subset of the gaps between characters; a payload
+        # that already has zero-width spaces could repeat variants
+        if len(payload) < 2 or self.ZWSP in payload:
+            return 0
+        return (1 << (len(payload) - 1)) - 1
+
+    def unrank(self, payload: str, index: int, ctx: Optional[PayloadContext] = None) -> str:
+        return self.ZWSP.join(split_at_gaps(payload, index + 1))
@@ -1,35 +1,52 @@
 """Structural obfuscation techniques."""
 
-import base64
+import binascii
 import random
-import urllib.parse
-from typing import List
+from typing import Iterator, List, Optional
 
-from techniques.base import BaseTechnique, register
+from techniques.base import (
+    FEATURE_MULTI_CHAR, STREAM_CHUNK, BaseTechnique, PayloadContext, byte_chunks, contexts_for,
+    register, split_at_gaps,
+)
 
 
 @register
 class StringConcatenation(BaseTechnique):
     name = "string_concat"
     category = "structural"
+    requires = FEATURE_MULTI_CHAR
 
     def obfuscate(self, payload: str) -> List[str]:
+        return list(self.iter_variants(payload))
+
+    def iter_variants(self, payload: str, ctx: Optional[PayloadContext] = None) -> Iterator[str]:
         if len(payload) < 2:
-            return []
-        results = []
+            return
+        rng = ctx.rng if ctx is not None else random
         for _ in range(2):
-            split = random.randint(1, len(payload) - 1)
-            results.append(f'"{payload[:split]}" + "{payload[split:]}"')
+            split = rng.randint(1, len(payload) - 1)
+            yield f'"{payload[:split]}" + "{payload[split:]}"'
         # Multi-split variant
         parts = [payload[i:i + 3] for i in range(0, len(payload), 3)]
-        results.append(" + ".join(f'"{p}"' for p in parts))
-        return results
+        yield " + ".join(f'"{p}"' for p in parts)
+
+    def variant_space(self, payload: str, ctx: Optional[PayloadContext] = None) -> int:
+        # Every non-empty set of split points; with a quote in the payload
+        # two split sets could render the same
+        if len(payload) < 2 or '"' in payload:
+            return 0
+        return (1 << (len(payload) - 1)) - 1
+
+    def unrank(self, payload: str, index: int, ctx: Optional[PayloadContext] = None) -> str:
+        return '"' + '" + "'.join(split_at_gaps(payload, index + 1)) + '"'
 
 
 @register
 class CommentInjection(BaseTechnique):
     name = "comment_inject"
     category = "structural"
+    deterministic = True
+    requires = FEATURE_MULTI_CHAR
 
     def obfuscate(self, payload: str) -> List[str]:
         if len(payload) < 2:
@@ -40,14 +57,43 @@ class CommentInjection(BaseTechnique):
             f"{payload[:mid]}<!-- -->{payload[mid:]}",
         ]
 
+    def obfuscate_batch(
+        self, payloads: List[str], contexts: Optional[List[PayloadContext]] = None,
+    ) -> List[List[str]]:
+        batch = []
+        for payload in payloads:
+            if len(payload) < 2:
+                batch.append([])
+                continue
+            mid = len(payload) // 2
+            head, tail = payload[:mid], payload[mid:]
+            batch.append([f"{head}/**/{tail}", f"{head}<!-- -->{tail}"])
+        return batch
+
 
 @register
 class EncodingChain(BaseTechnique):
     name = "encoding_chain"
     category = "structural"
+    deterministic = True
+
+    # quote(b64, safe="") only ever escapes these three base64 symbols
+    _B64_QUOTE = str.maketrans({"+": "%2B", "/": "%2F", "=": "%3D"})
 
     def obfuscate(self, payload: str) -> List[str]:
+        return self.obfuscate_batch([payload])[0]
+
+    def obfuscate_batch(
+        self, payloads: List[str], contexts: Optional[List[PayloadContext]] = None,
+    ) -> List[List[str]]:
         # base64 then URL-encode
-        b64 = base64.b64encode(payload.encode()).decode()
-        chained = urllib.parse.quote(b64, safe="")
-        return [chained]
+        table = self._B64_QUOTE
+        return [[ctx.b64.translate(table)] for ctx in contexts_for(payloads, contexts)]
+
+    def stream_forms(self, payload: str) -> int:
+        return 1
+
+    def stream_chunks(self, payload: str, form: int = 0, size: int = STREAM_CHUNK) -> Iterator[str]:
+        table = self._B64_QUOTE
+        for data in byte_chunks(payload, size, align=3):
+            yield binascii.b2a_base64(data, newline=False).decode("ascii").translate(table)
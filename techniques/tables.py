@@ -0,0 +1,32 @@
+"""Precomputed str.translate() tables shared by the per-character encoders."""
+
+from typing import Callable, Dict
+
+
+class CodepointTable(dict):
+    """
+    str.translate() mapping from code point to its encoded form.
+
+    Code points below `size` are precomputed. Anything outside is formatted on
+    first use and memoized (up to MAX_CACHED entries, after which it is just
+    formatted), so astral-plane input never changes the output, only the speed.
+    """
+
+    MAX_CACHED = 65536
+
+    def __init__(self, fmt: Callable[[int], str], size: int = 256):
+        super().__init__((cp, fmt(cp)) for cp in range(size))
+        self._fmt = fmt
+        # Plain dict for ASCII-only input: str.translate avoids the
+        # subclass __getitem__ dispatch on this path
+        self._ascii: Dict[int, str] = {cp: self[cp] for cp in range(128)}
+
+    def __missing__(self, cp: int) -> str:
+        value = self._fmt(cp)
+        if len(self) < self.MAX_CACHED:
+            self[cp] = value
+        return value
+
+    def encode(self, text: str) -> str:
+        """Translate every character of text through the table."""
+        return text.translate(self._ascii if text.isascii() else self)
@@ -10,12 +10,23 @@ import unittest
 # Ensure imports work
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.validators import validate_multiplier, validate_format, validate_file_readable
+from utils.validators import (
+    validate_multiplier, validate_format, validate_file_readable, validate_workers,
+    validate_compress_level, validate_tee, validate_size, validate_fp_rate, validate_similarity,
+)
 from techniques.base import get_all_techniques, get_technique_by_name, get_techniques_by_category
 import techniques  # triggers registration
-from core.engine import ObfuscationEngine
-from core.input_handler import read_payloads
-from core.output_handler import write_text, write_json
+from core.engine import ObfuscationEngine, VariantCache
+from core.dedup import GlobalDedup
+from core.results import PayloadResults, StreamedVariant
+from core.similarity import NearDuplicateFilter, Signature
+from core.checkpoint import Checkpointer, load_checkpoint, truncate_output
+from core.input_handler import chunk_ranges, read_payloads, read_payloads_with_offsets
+from core.output_handler import (
+    ShardedWriter, TeeWriter, manifest_path, open_writer, write_text, write_json, write_jsonl,
+)
+from core.corpus import CorpusReader
+from core.pipeline import STAGES, run_pipeline
 
 
 class TestValidators(unittest.TestCase):
@@ -36,6 +47,30 @@ class TestValidators(unittest.TestCase):
         self.assertEqual(validate_format("text"), "text")
         self.assertEqual(validate_format("json"), "json")
         self.assertEqual(validate_format("JSON"), "json")
+        self.assertEqual(validate_format("jsonl"), "jsonl")
+
+    def test_compress_level(self):
+        self.assertEqual(validate_compress_level("xz", 0), 0)
+        self.assertEqual(validate_compress_level("gzip", 9), 9)
+        with self.assertRaises(ValueError):
+            validate_compress_level("gzip", 0)
+        with self.assertRaises(ValueError):
+            validate_compress_level("bz2", 10)
+
+    def test_size(self):
+        self.assertEqual(validate_size("500000"), 500000)
+        self.assertEqual(validate_size("64k"), 64 * 1024)
+        self.assertEqual(validate_size("100MB"), 100 * 1024 * 1024)
+        for value in ("0", "-1M", "1T", "M"):
+            with self.assertRaises(ValueError):
+                validate_size(value)
+
+    def test_tee_spec(self):
+        self.assertEqual(validate_tee("JSON:out.json"), ("json", "out.json"))
+        self.assertEqual(validate_tee("text:C:/out.txt"), ("text", "C:/out.txt"))
+        for spec in ("out.json", "json:", "xml:out.xml"):
+            with self.assertRaises(ValueError):
+                validate_tee(spec)
 
     def test_invalid_format(self):
         with self.assertRaises(ValueError):
@@ -45,6 +80,17 @@ class TestValidators(unittest.TestCase):
         with self.assertRaises(ValueError):
             validate_file_readable("/nonexistent/file.txt")
 
+    def test_cache_size(self):
+        from utils.validators import validate_cache_size
+        self.assertEqual(validate_cache_size(0), 0)
+        with self.assertRaises(ValueError):
+            validate_cache_size(-1)
+
+    def test_workers(self):
+        self.assertEqual(validate_workers(4), 4)
+        with self.assertRaises(ValueError):
+            validate_workers(0)
+
 
 class TestTechniqueRegistry(unittest.TestCase):
     def test_all_techniques_registered(self):
@@ -108,6 +154,18 @@ class TestEncodingTechniques(unittest.TestCase):
         t = get_technique_by_name("hex_encode")
         results = t.obfuscate("AB")
         self.assertIn("4142", results)
+        self.assertIn("\\x41\\x42", results)
+
+    def test_table_encoders_outside_table(self):
+        payload = "a\u00e9\u6f22\U0001F600"
+        self.assertEqual(get_technique_by_name("html_entity_decimal").obfuscate(payload),
+                         ["&#97;&#233;&#28450;&#128512;"])
+        self.assertEqual(get_technique_by_name("html_entity_hex").obfuscate(payload),
+                         ["&#x61;&#xe9;&#x6f22;&#x1f600;"])
+        self.assertEqual(get_technique_by_name("unicode_escape").obfuscate(payload),
+                         ["\\u0061\\u00e9\\u6f22\\u1f600"])
+        self.assertEqual(get_technique_by_name("hex_encode").obfuscate(payload)[1],
+                         "".join(f"\\x{b:02x}" for b in payload.encode()))
 
 
 class TestMutationTechniques(unittest.TestCase):
@@ -124,6 +182,21 @@ class TestMutationTechniques(unittest.TestCase):
         t = get_technique_by_name("alternating_case")
         results = t.obfuscate(self.PAYLOAD)
         self.assertGreaterEqual(len(results), 1)
+        self.assertEqual(results, ["<sCrIpT>AlErT(1)</ScRiPt>", "<ScRiPt>aLeRt(1)</sCrIpT>"])
+        self.assertEqual(t.obfuscate("straße"), ["StRaSSe", "sTrAßE"])
+
+    def test_random_case_non_ascii(self):
+        import random
+        from techniques.base import PayloadContext
+
+        t = get_technique_by_name("random_case")
+        for payload in ("ärger <b>", "Straße"):
+            variants = list(t.iter_variants(payload, PayloadContext(payload, random.Random(0))))
+            self.assertTrue(variants)
+            for v in variants:
+                self.assertNotEqual(v, payload)
+                self.assertEqual(v.casefold(), payload.casefold())
+        self.assertEqual(t.obfuscate(""), [])
 
     def test_homoglyph(self):
         t = get_technique_by_name("homoglyph")
@@ -137,6 +210,13 @@ class TestMutationTechniques(unittest.TestCase):
         results = t.obfuscate("abc")
         self.assertEqual(len(results), 1)
         self.assertIn('\u200b', results[0])
+        for payload in ("ab" * 200, "é\ud800x" * 100, "\U0001f600a" * 200):
+            self.assertEqual(t.obfuscate(payload), ['\u200b'.join(payload)])
+
+    def test_homoglyph_matches_per_character_mapping(self):
+        t = get_technique_by_name("homoglyph")
+        payload = "<SCRIPT>alert('x')</script> ÄBC"
+        self.assertEqual(t.obfuscate(payload), ["".join(t.HOMOGLYPHS.get(c, c) for c in payload)])
 
 
 class TestStructuralTechniques(unittest.TestCase):
@@ -174,6 +254,7 @@ class TestContextTechniques(unittest.TestCase):
         results = t.obfuscate("alert(1)")
         self.assertEqual(len(results), 2)
         self.assertTrue(results[0].startswith("eval("))
+        self.assertEqual(results[1], "eval(String.fromCharCode(97,108,101,114,116,40,49,41))")
 
     def test_sql_comment_inject(self):
         t = get_technique_by_name("sql_comment_inject")
@@ -202,6 +283,272 @@ class TestContextTechniques(unittest.TestCase):
         self.assertEqual(t.obfuscate("no tags here"), [])
 
 
+class TestBatchProtocol(unittest.TestCase):
+    PAYLOADS = ["", "a", "a/b", "<script>alert('x')</script>", "SELECT * FROM users", "caf\u00e9"]
+    STOCHASTIC = {"random_case", "string_concat"}
+
+    def test_batch_matches_single(self):
+        for name, t in get_all_techniques().items():
+            if name in self.STOCHASTIC:
+                continue
+            with self.subTest(technique=name):
+                self.assertEqual(
+                    t.obfuscate_batch(self.PAYLOADS),
+                    [t.obfuscate(p) for p in self.PAYLOADS],
+                )
+
+    def test_engine_process_batch(self):
+        engine = ObfuscationEngine(multiplier=3)
+        batches = engine.process_batch(["payload1", "payload2", "payload3"])
+        self.assertEqual(len(batches), 3)
+        for payload, results in zip(["payload1", "payload2", "payload3"], batches):
+            self.assertEqual(len(results), 3)
+            self.assertTrue(all(r[0] == payload for r in results))
+
+
+class TestPayloadContext(unittest.TestCase):
+    def test_properties_memoized(self):
+        from techniques.base import PayloadContext
+        ctx = PayloadContext("SELECT * FROM <b>x</b>")
+        self.assertIs(ctx.raw, ctx.raw)
+        self.assertIs(ctx.tokens, ctx.tokens)
+        self.assertEqual(ctx.tokens, ["SELECT", "*", "FROM", "<b>x</b>"])
+        self.assertTrue(ctx.has_lt)
+        self.assertFalse(ctx.has_single_quote)
+        self.assertEqual(len(ctx.tag_matches), 2)
+
+    def test_features(self):
+        from techniques.base import PayloadContext, FEATURE_MULTI_TOKEN, FEATURE_TAG
+        self.assertTrue(PayloadContext("<b> x").features & FEATURE_TAG)
+        self.assertTrue(PayloadContext("<b> x").features & FEATURE_MULTI_TOKEN)
+        self.assertFalse(PayloadContext("123").features & (FEATURE_TAG | FEATURE_MULTI_TOKEN))
+
+    def test_rewrite_tags(self):
+        from techniques.base import PayloadContext
+        ctx = PayloadContext("<a>x</a><b>")
+        self.assertEqual(ctx.rewrite_tags(lambda m: m.group(0).upper()), "<A>x</A><B>")
+        self.assertEqual(ctx.rewrite_tags(lambda m: "<_", closing=False), "<_>x</a><_>")
+
+
+class TestLazyVariants(unittest.TestCase):
+    def test_list_techniques_get_iterator_shim(self):
+        t = get_technique_by_name("base64")
+        self.assertFalse(t.is_lazy)
+        self.assertEqual(list(t.iter_variants("test")), t.obfuscate("test"))
+
+    def test_engine_stops_pulling_at_target(self):
+        from techniques.base import BaseTechnique
+
+        pulled = []
+
+        class Counting(BaseTechnique):
+            name = "counting"
+            category = "mutation"
+
+            def obfuscate(self, payload):
+                return list(self.iter_variants(payload))
+
+            def iter_variants(self, payload, ctx=None):
+                for i in range(10):
+                    pulled.append(i)
+                    yield f"{payload}{i}"
+
+        engine = ObfuscationEngine(multiplier=2, technique_names=["base64"])
+        engine.techniques = [Counting()]
+        results = engine.process_payload("x")
+        self.assertEqual([r[1] for r in results], ["x0", "x1"])
+        self.assertEqual(pulled, [0, 1])
+
+
+class TestTechniqueChains(unittest.TestCase):
+    def test_chain_feeds_each_variant_through_the_next_step(self):
+        chain = get_technique_by_name("base64|url_encode")
+        self.assertIs(chain, get_technique_by_name("base64|url_encode"))
+        self.assertTrue(chain.deterministic)
+        payload = "<script>alert('x')</script>"
+        self.assertEqual(chain.obfuscate(payload)[0], get_technique_by_name("encoding_chain").obfuscate(payload)[0])
+        self.assertFalse(get_technique_by_name("random_case|url_encode").deterministic)
+
+    def test_invalid_chains(self):
+        with self.assertRaises(KeyError):
+            get_technique_by_name("base64|nope")
+        with self.assertRaises(ValueError):
+            get_technique_by_name("base64|")
+
+    def test_shared_prefix_computed_once_per_payload(self):
+        from techniques.base import PayloadContext
+
+        homoglyph = get_technique_by_name("homoglyph")
+        calls = []
+        original = homoglyph.iter_variants
+
+        def counting(payload, ctx=None):
+            calls.append(payload)
+            return original(payload, ctx)
+
+        homoglyph.iter_variants = counting
+        try:
+            ctx = PayloadContext("<b>alert</b>")
+            url = list(get_technique_by_name("homoglyph|url_encode").iter_variants(ctx.payload, ctx))
+            hexed = list(get_technique_by_name("homoglyph|html_entity_hex").iter_variants(ctx.payload, ctx))
+        finally:
+            del homoglyph.iter_variants
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(url and hexed)
+
+    def test_product_is_lazy(self):
+        from techniques.base import PayloadContext
+
+        ctx = PayloadContext("<script>alert(1)</script>")
+        variants = get_technique_by_name("random_case|url_encode").iter_variants(ctx.payload, ctx)
+        next(variants)
+        node = ctx.memo[("chain", ("random_case",))]
+        self.assertEqual(len(node.outputs), 1)
+
+    def test_retry_redraws_stochastic_prefix(self):
+        import random
+        from techniques.base import PayloadContext
+
+        ctx = PayloadContext("<script>alert(document.cookie)</script>", random.Random(7))
+        chain = get_technique_by_name("random_case|url_encode")
+        first = list(chain.iter_variants(ctx.payload, ctx))
+        self.assertNotEqual(list(chain.iter_variants(ctx.payload, ctx)), first)
+
+    def test_engine_with_chains(self):
+        names = ["homoglyph|url_encode", "random_case|html_entity_hex"]
+        engine = ObfuscationEngine(multiplier=10, technique_names=names, seed=1)
+        results = engine.process_payload("<script>alert(1)</script>")
+        self.assertEqual(len(results), 10)
+        self.assertEqual({r[2] for r in results}, set(names))
+        # A chain takes its last step's category
+        self.assertEqual({r[3] for r in results}, {"encoding"})
+        self.assertEqual(get_technique_by_name("random_case|homoglyph").category, "mutation")
+        self.assertEqual(
+            list(ObfuscationEngine(multiplier=10, technique_names=names, seed=1).process_stream_parallel(
+                iter(["<script>alert(1)</script>"] * 3), workers=2, batch_size=1,
+            )),
+            list(results) * 3,
+        )
+
+
+class TestEnumeration(unittest.TestCase):
+    ENUMERABLE = ("random_case", "homoglyph", "zero_width", "string_concat")
+
+    def test_unrank_is_a_bijection_without_the_payload(self):
+        from techniques.base import PayloadContext
+
+        for name in self.ENUMERABLE:
+            t = get_technique_by_name(name)
+            self.assertTrue(t.is_enumerable)
+            for payload in ("aB<c>x", "se"):
+                ctx = PayloadContext(payload)
+                size = t.variant_space(payload, ctx)
+                variants = [t.unrank(payload, i, ctx) for i in range(size)]
+                self.assertEqual(len(set(variants)), size, name)
+                self.assertNotIn(payload, variants)
+        self.assertEqual(get_technique_by_name("random_case").variant_space("aB<c>x"), 2 ** 4 - 1)
+        self.assertEqual(get_technique_by_name("string_concat").variant_space('a"b'), 0)
+        self.assertFalse(get_technique_by_name("base64").is_enumerable)
+
+    def test_samples_distinct_variants_beyond_20(self):
+        engine = ObfuscationEngine(multiplier=500, seed=1, enumeration=True)
+        payload = "<script>alert(1)</script>"
+        results = engine.process_payload(payload)
+        self.assertEqual(len(results), 500)
+        self.assertEqual(len(set(results.variants)), 500)
+        self.assertEqual({r[2] for r in results}, set(self.ENUMERABLE))
+        again = ObfuscationEngine(multiplier=500, seed=1, enumeration=True).process_payload(payload)
+        self.assertEqual(results, again)
+
+    def test_small_space_is_streamed_whole(self):
+        engine = ObfuscationEngine(multiplier=100, seed=1, enumeration=True, preserve_original=True)
+        results = engine.process_payload("ab")
+        # original + 3 case masks + 1 homoglyph + 1 gap each for zero_width and string_concat
+        self.assertEqual(len(results), 7)
+        self.assertEqual(len(set(results.variants)), 7)
+
+    def test_huge_space_uses_rejection_sampling(self):
+        engine = ObfuscationEngine(multiplier=40, seed=2, enumeration=True, technique_names=["zero_width"])
+        results = engine.process_payload("x" * 100)
+        self.assertEqual(len(set(results.variants)), 40)
+
+    def test_validation(self):
+        self.assertEqual(validate_multiplier(1000, enumeration=True), 1000)
+        with self.assertRaises(ValueError):
+            validate_multiplier(21)
+        with self.assertRaises(ValueError):
+            ObfuscationEngine(enumeration=True, technique_names=["base64"])
+
+
+class TestStreaming(unittest.TestCase):
+    PAYLOADS = ["<b>x</b>", "<svg/onload=alert('é\U0001f600')>" * 40, "ab/c"]
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.streamable = sorted(n for n, t in get_all_techniques().items() if t.is_streamable)
+
+    def tearDown(self):
+        for name in os.listdir(self.tmp):
+            os.unlink(os.path.join(self.tmp, name))
+        os.rmdir(self.tmp)
+
+    def _engine(self, stream_threshold, **options):
+        return ObfuscationEngine(
+            multiplier=20, technique_names=self.streamable, preserve_original=True, seed=3,
+            stream_threshold=stream_threshold, **options,
+        )
+
+    def _write(self, fmt, stream_threshold):
+        path = os.path.join(self.tmp, f"{stream_threshold}.{fmt}")
+        writer = open_writer(fmt, path, timestamp="run")
+        for results in self._engine(stream_threshold).iter_results(iter(self.PAYLOADS)):
+            writer.write_results(results)
+        writer.close()
+        if fmt == "corpus":
+            return [tuple(r) for r in CorpusReader(path)]
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        if fmt == "text":
+            return text
+        records = json.loads(text) if fmt == "json" else [json.loads(line) for line in text.splitlines()]
+        for record in records:
+            del record["timestamp"]
+        return records
+
+    def test_chunks_join_to_obfuscate_output(self):
+        for name in self.streamable:
+            t = get_technique_by_name(name)
+            for payload in self.PAYLOADS:
+                for size in (1, 2, 5, 64):
+                    forms = {"".join(t.stream_chunks(payload, f, size)) for f in range(t.stream_forms(payload))}
+                    self.assertEqual(forms, set(t.obfuscate(payload)), (name, payload, size))
+        self.assertFalse(get_technique_by_name("random_case").is_streamable)
+
+    def test_large_payloads_are_streamed(self):
+        results = self._engine(100).process_batch(self.PAYLOADS)
+        self.assertEqual([r.streamed for r in results], [False, True, False])
+        self.assertEqual(results[1][0][1], self.PAYLOADS[1])
+        self.assertTrue(all(isinstance(v, StreamedVariant) for v in results[1].variants[1:]))
+        in_memory = self._engine(0).process_payload(self.PAYLOADS[1])
+        self.assertEqual([str(v) for v in results[1].variants], in_memory.variants)
+
+    def test_writers_match_in_memory_output(self):
+        for fmt in ("text", "jsonl", "json", "corpus"):
+            self.assertEqual(self._write(fmt, 100), self._write(fmt, 0), fmt)
+
+    def test_global_dedup_and_workers(self):
+        payloads = [self.PAYLOADS[1]] * 2
+        engine = self._engine(100, dedup_bytes=1 << 20)
+        results = [r for batch in engine.process_batches(iter([payloads]), workers=2) for r in batch]
+        self.assertEqual(len(results[0]), 11)
+        self.assertEqual(len(results[1]), 0)
+        self.assertTrue(results[0].streamed)
+
+    def test_not_with_enumeration(self):
+        with self.assertRaises(ValueError):
+            ObfuscationEngine(enumeration=True, stream_threshold=100)
+
+
 class TestEngine(unittest.TestCase):
     def test_multiplier_met(self):
         engine = ObfuscationEngine(multiplier=5)
@@ -232,12 +579,243 @@ class TestEngine(unittest.TestCase):
         results = engine.process_payload("a")
         self.assertGreater(len(results), 0)
 
+    def test_inapplicable_techniques_skipped(self):
+        names = ["homoglyph", "html_tag_mutation", "sql_comment_inject", "hex_encode"]
+        for name in names[:3]:
+            t = get_technique_by_name(name)
+            self.assertEqual(t.obfuscate("123"), [])
+        engine = ObfuscationEngine(multiplier=5, technique_names=names)
+        results = engine.process_payload("123")
+        self.assertEqual({r[2] for r in results}, {"hex_encode"})
+        self.assertEqual(engine.stats["skipped_calls"], 3)
+        # hex_encode is deterministic, so round 2 never retries it
+        self.assertEqual(engine.stats["technique_calls"], 1)
+
+    def test_scheduler_prefers_productive_techniques(self):
+        from core.scheduler import AdaptiveScheduler
+        scheduler = AdaptiveScheduler()
+        rc, sc = get_technique_by_name("random_case"), get_technique_by_name("string_concat")
+        for _ in range(20):
+            scheduler.record(rc, 1)
+            scheduler.record(sc, 0)
+        self.assertGreater(scheduler.weight(rc), scheduler.weight(sc))
+        self.assertEqual(scheduler.retry_pool([rc, sc, get_technique_by_name("base64")]), [rc, sc])
+
+    def test_variant_cache_on_duplicates(self):
+        engine = ObfuscationEngine(multiplier=3, technique_names=["base64", "hex_encode"], cache_bytes=1 << 20)
+        results = list(engine.process_stream(iter(["dup", "dup", "dup"])))
+        self.assertEqual(len(results), 9)
+        self.assertEqual(engine.stats["technique_calls"], 2)
+        self.assertEqual(engine.cache.misses, 2)
+        self.assertEqual(engine.cache.hits, 4)
+
+    def test_variant_cache_disabled(self):
+        engine = ObfuscationEngine(multiplier=3, technique_names=["base64"])
+        self.assertIsNone(engine.cache)
+        self.assertEqual(len(list(engine.process_stream(iter(["dup", "dup"])))), 2)
+
+    def test_variant_cache_evicts_by_size(self):
+        cache = VariantCache(max_bytes=1000)
+        for i in range(20):
+            cache.put("t", f"payload{i}", ["x" * 50])
+        self.assertLessEqual(cache.size, 1000)
+        self.assertGreater(cache.evictions, 0)
+        self.assertIsNone(cache.get("t", "payload0"))
+        self.assertEqual(cache.get("t", "payload19"), ["x" * 50])
+
+    def test_seeded_output_independent_of_order_and_sharding(self):
+        payloads = [f"<script>alert({i})</script>" for i in range(30)]
+        serial = list(ObfuscationEngine(multiplier=10, seed=42).process_stream(iter(payloads), batch_size=1))
+        batched = list(ObfuscationEngine(multiplier=10, seed=42).process_stream(iter(payloads), batch_size=7))
+        parallel = list(ObfuscationEngine(multiplier=10, seed=42).process_stream_parallel(
+            iter(payloads), workers=2, batch_size=4))
+        self.assertEqual(serial, batched)
+        self.assertEqual(serial, parallel)
+        # A payload's variants don't depend on what came before it
+        tail = list(ObfuscationEngine(multiplier=10, seed=42).process_stream(iter(payloads[20:])))
+        self.assertEqual(serial[200:], tail)
+
+    def test_different_seeds_differ(self):
+        a = ObfuscationEngine(multiplier=10, seed=1).process_payload("<script>alert(1)</script>")
+        b = ObfuscationEngine(multiplier=10, seed=2).process_payload("<script>alert(1)</script>")
+        self.assertNotEqual(a, b)
+
+    def test_variant_store_reuses_across_runs(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "variants.db")
+            payloads = ["<b>one</b>", "two words"]
+            first = ObfuscationEngine(multiplier=4, store_path=path, cache_bytes=0)
+            list(first.process_stream(iter(payloads)))
+            first.close()
+            self.assertEqual(first.stats["store_computed"], 2)
+
+            second = ObfuscationEngine(multiplier=4, store_path=path, cache_bytes=0)
+            results = list(second.process_stream(iter(payloads + ["three"])))
+            second.close()
+            self.assertEqual(second.stats["store_reused"], 2)
+            self.assertEqual(second.stats["store_computed"], 1)
+            self.assertEqual(len(results), 12)
+
+    def test_seeded_store_computes_only_round_one(self):
+        payloads = [f"<script>alert({i})</script>" for i in range(20)]
+        plain = ObfuscationEngine(multiplier=1, seed=5)
+        expected = list(plain.process_stream(iter(payloads)))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "variants.db")
+            runs = []
+            for _ in range(2):
+                engine = ObfuscationEngine(multiplier=1, seed=5, store_path=path)
+                self.assertEqual(list(engine.process_stream(iter(payloads))), expected)
+                engine.close()
+                runs.append(engine.stats)
+        # A cold run makes the same technique calls as a run without the store
+        self.assertEqual(runs[0]["technique_calls"], plain.stats["technique_calls"])
+        self.assertLessEqual(runs[1]["technique_calls"], runs[0]["technique_calls"])
+        self.assertEqual(runs[1]["store_reused"], 20)
+
     def test_stream_processing(self):
         engine = ObfuscationEngine(multiplier=2)
         payloads = iter(["payload1", "payload2"])
         results = list(engine.process_stream(payloads))
         self.assertEqual(len(results), 4)
 
+    def test_parallel_stream_preserves_order(self):
+        engine = ObfuscationEngine(multiplier=3)
+        payloads = [f"<script>alert({i})</script>" for i in range(50)]
+        results = list(engine.process_stream_parallel(iter(payloads), workers=2, batch_size=7))
+        self.assertEqual(len(results), 150)
+        self.assertEqual([r[0] for r in results[::3]], payloads)
+
+    def test_parallel_stream_forwards_worker_logs(self):
+        engine = ObfuscationEngine(multiplier=20, technique_names=["base64"])
+        with self.assertLogs("core.engine", level="WARNING") as cm:
+            list(engine.process_stream_parallel(iter(["abc"]), workers=2))
+        self.assertTrue(any("unique variants" in line for line in cm.output))
+
+
+class TestPayloadResults(unittest.TestCase):
+    def setUp(self):
+        self.results = ObfuscationEngine(multiplier=5, preserve_original=True, seed=1).process_payload("<b>x</b>")
+
+    def test_behaves_like_list_of_tuples(self):
+        r = self.results
+        self.assertIsInstance(r, PayloadResults)
+        self.assertEqual(r[0], ("<b>x</b>", "<b>x</b>", "original", "none"))
+        original, obfuscated, technique, category = r[-1]
+        self.assertEqual(original, "<b>x</b>")
+        self.assertEqual(r, [tuple(t) for t in r])
+        self.assertEqual(r[1:3], list(r)[1:3])
+        self.assertEqual(len(r), len(r.variants))
+
+    def test_pickle_round_trip(self):
+        import pickle
+
+        self.assertEqual(pickle.loads(pickle.dumps(self.results)), self.results)
+
+    def test_write_results_matches_write(self):
+        for fmt in ("text", "jsonl"):
+            outputs = []
+            for bulk in (False, True):
+                fd, path = tempfile.mkstemp()
+                os.close(fd)
+                try:
+                    writer = open_writer(fmt, path, timestamp="run")
+                    if bulk:
+                        writer.write_results(self.results)
+                    else:
+                        for result in list(self.results):
+                            writer.write(result)
+                    writer.close()
+                    with open(path, encoding="utf-8") as f:
+                        lines = f.read().split("\n")
+                    if fmt == "jsonl":
+                        lines = [json.loads(line) for line in lines if line]
+                        for record in lines:
+                            record.pop("timestamp")
+                    outputs.append(lines)
+                finally:
+                    os.unlink(path)
+            self.assertEqual(outputs[0], outputs[1], fmt)
+
+
+class TestGlobalDedup(unittest.TestCase):
+    def test_drops_variants_seen_for_earlier_payloads(self):
+        engine = ObfuscationEngine(multiplier=10, seed=1, dedup_bytes=1 << 20)
+        payloads = ["alert(1)", "<b>x</b>", "alert(1)"]
+        results = [r for _, r in zip(payloads, engine.iter_results(iter(payloads)))]
+        variants = [v for r in results for v in r.variants]
+        self.assertEqual(len(variants), len(set(variants)))
+        self.assertEqual(len(results[2]), 0)
+        self.assertEqual(engine.stats["dedup_dropped"], 10)
+        self.assertEqual(engine.stats["dedup_checked"], 30)
+        self.assertEqual(engine.dedup.mode, "exact")
+
+    def test_same_output_with_workers(self):
+        payloads = [f"<img src=x onerror=alert({i % 7})>" for i in range(40)]
+        outputs = [
+            list(ObfuscationEngine(multiplier=8, seed=2, dedup_bytes=1 << 20).process_stream_parallel(
+                iter(payloads), workers=workers, batch_size=8,
+            ))
+            for workers in (1, 2)
+        ]
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_switches_to_bloom_beyond_budget(self):
+        dedup = GlobalDedup(max_bytes=GlobalDedup.ENTRY_BYTES * 100, fp_rate=0.01)
+        kept = sum(dedup.add(f"variant {i}") for i in range(5000))
+        self.assertEqual(dedup.mode, "bloom")
+        self.assertGreater(kept, 5000 * 0.98)
+        # Repeats are never let through, whatever the filter size
+        self.assertFalse(any(dedup.add(f"variant {i}") for i in range(5000)))
+
+    def test_validate_fp_rate(self):
+        self.assertEqual(validate_fp_rate(0.01), 0.01)
+        for bad in (0, 1, -0.1, 2):
+            with self.assertRaises(ValueError):
+                validate_fp_rate(bad)
+
+
+class TestNearDuplicateFilter(unittest.TestCase):
+    def test_similarity(self):
+        a = Signature("<script>alert(document.cookie)</script>")
+        self.assertEqual(a.similarity(a), 1.0)
+        # One changed byte changes the four 4-byte shingles that cover it
+        self.assertAlmostEqual(a.similarity(Signature("<script>alert(document.cookiE)</script>")), 28 / 36)
+        self.assertLess(a.similarity(Signature("PHNjcmlwdD5hbGVydCgxKTwvc2NyaXB0Pg==")), 0.1)
+
+    def test_minhash_estimate_for_long_variants(self):
+        text = "".join(f"<a href='/item/{i}'>item {i}</a>" for i in range(200))
+        edited = text[:1000] + "X" + text[1001:]
+        self.assertIsNone(Signature(text).words)
+        self.assertGreater(Signature(text).similarity(Signature(edited)), 0.9)
+        encoded = "".join(f"%{b:02X}" for b in text.encode())
+        self.assertLess(Signature(text).similarity(Signature(encoded)), 0.1)
+
+    def test_rejects_near_duplicates_and_keeps_drawing(self):
+        near = NearDuplicateFilter(0.75)
+        accepted = near.new_payload()
+        self.assertTrue(near.accept("<script>alert(document.cookie)</script>", accepted))
+        self.assertFalse(near.accept("<script>alert(document.cookiE)</script>", accepted))
+        self.assertTrue(near.accept("%3Cscript%3Ealert(document.cookie)%3C%2Fscript%3E", accepted))
+        self.assertEqual(near.stats["near_dup_rejected"], 1)
+        self.assertEqual(near.stats["near_dup_bytes"], 39)
+
+        payload = "<script>alert(document.cookie)</script>"
+        engine = ObfuscationEngine(multiplier=10, seed=1, near_dup_threshold=0.7)
+        results = engine.process_payload(payload)
+        self.assertEqual(len(results), 10)
+        self.assertGreater(engine.stats["near_dup_rejected"], 0)
+        sigs = [Signature(v) for v in results.variants]
+        for i, a in enumerate(sigs):
+            for b in sigs[i + 1:]:
+                self.assertLess(a.similarity(b), 0.7)
+
+    def test_validate_similarity(self):
+        self.assertEqual(validate_similarity(1), 1.0)
+        for bad in (0, -0.5, 1.5):
+            with self.assertRaises(ValueError):
+                validate_similarity(bad)
+
 
 class TestInputHandler(unittest.TestCase):
     def test_read_payloads(self):
@@ -255,6 +833,74 @@ class TestInputHandler(unittest.TestCase):
         with self.assertRaises(ValueError):
             list(read_payloads("/nonexistent/file.txt"))
 
+    def test_raw_byte_filtering(self):
+        with tempfile.NamedTemporaryFile(mode="wb", suffix=".txt", delete=False) as f:
+            f.write("a\r\n  # indented\n\u3000# wide space\n\r\n é \n\tb\nlast".encode("utf-8"))
+            path = f.name
+        try:
+            self.assertEqual(list(read_payloads(path)), ["a", " é ", "\tb", "last"])
+        finally:
+            os.unlink(path)
+
+    def test_lone_cr_ends_line(self):
+        # Universal newlines, as the text-mode reader had: "\r" alone ends a line
+        with tempfile.NamedTemporaryFile(mode="wb", suffix=".txt", delete=False) as f:
+            f.write(b"a\rb\n#c\rd\r\ne\r")
+            path = f.name
+        try:
+            self.assertEqual(list(read_payloads(path)), ["a", "b", "d", "e"])
+            self.assertEqual(list(read_payloads(path, chunk_bytes=2)), ["a", "b", "d", "e"])
+            self.assertEqual(
+                list(read_payloads_with_offsets(path)), [(2, "a"), (4, "b"), (10, "d"), (12, "e")],
+            )
+            self.assertEqual(list(read_payloads_with_offsets(path, 4)), [(10, "d"), (12, "e")])
+        finally:
+            os.unlink(path)
+
+    def test_chunked_parallel_read(self):
+        lines = [f"payload{i}" if i % 7 else f"# comment {i}" for i in range(2000)]
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False, encoding="utf-8") as f:
+            f.write("\n".join(lines))
+            path = f.name
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            ranges = chunk_ranges(data, 1000)
+            self.assertGreater(len(ranges), 10)
+            self.assertEqual(ranges[0][0], 0)
+            self.assertEqual(ranges[-1][1], len(data))
+            for (_, end), (start, _) in zip(ranges, ranges[1:]):
+                self.assertEqual(end, start)
+                self.assertEqual(data[end - 1:end], b"\n")
+            expected = [line for line in lines if not line.startswith("#")]
+            self.assertEqual(list(read_payloads(path, workers=3, chunk_bytes=1000)), expected)
+            self.assertEqual(list(read_payloads(path, chunk_bytes=1000)), expected)
+        finally:
+            os.unlink(path)
+
+    def test_gzip_input(self):
+        import gzip
+        with tempfile.NamedTemporaryFile(suffix=".txt.gz", delete=False) as f:
+            path = f.name
+        try:
+            with gzip.open(path, "wt", encoding="utf-8") as f:
+                f.write("one\n# skip\ntwo\n")
+            self.assertEqual(list(read_payloads(path)), ["one", "two"])
+            self.assertEqual(list(read_payloads_with_offsets(path)), [(4, "one"), (15, "two")])
+        finally:
+            os.unlink(path)
+
+    def test_read_payloads_with_offsets(self):
+        with tempfile.NamedTemporaryFile(mode="wb", suffix=".txt", delete=False) as f:
+            f.write("a\n# c\n\nbé\nc\n".encode("utf-8"))
+            path = f.name
+        try:
+            pairs = list(read_payloads_with_offsets(path))
+            self.assertEqual(pairs, [(2, "a"), (11, "bé"), (13, "c")])
+            self.assertEqual(list(read_payloads_with_offsets(path, 11)), [(13, "c")])
+        finally:
+            os.unlink(path)
+
 
 class TestOutputHandler(unittest.TestCase):
     def test_text_output(self):
@@ -286,6 +932,355 @@ class TestOutputHandler(unittest.TestCase):
             os.unlink(path)
 
 
+    def test_jsonl_output(self):
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".jsonl", delete=False) as f:
+            path = f.name
+        try:
+            data = [("o\"1", "é\\x", "base64", "encoding"), ("o\"1", "\u2028", "hex", "encoding")]
+            write_jsonl(iter(data), path)
+            with open(path, "r", encoding="utf-8") as f:
+                lines = [line.rstrip("\n") for line in f]
+            self.assertEqual(len(lines), 2)
+            for line, (original, obfuscated, technique, category) in zip(lines, data):
+                entry = json.loads(line)
+                self.assertEqual(entry["original"], original)
+                self.assertEqual(entry["obfuscated"], obfuscated)
+                self.assertEqual(entry["technique_category"], category)
+                # Byte-identical to the json.dumps() serialization
+                self.assertEqual(line, json.dumps(entry, ensure_ascii=False))
+        finally:
+            os.unlink(path)
+
+    def test_run_timestamp(self):
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False) as f:
+            path = f.name
+        try:
+            writer = open_writer("json", path, timestamp="run")
+            for i in range(5000):
+                writer.write(("o", f"v{i}", "base64", "encoding"))
+            writer.close()
+            with open(path, "r") as f:
+                parsed = json.load(f)
+            self.assertEqual(len(parsed), 5000)
+            self.assertEqual(len({entry["timestamp"] for entry in parsed}), 1)
+        finally:
+            os.unlink(path)
+
+
+    def test_compressed_output(self):
+        import bz2
+        import gzip
+        import lzma
+        data = [("orig", f"obf{i}", "base64", "encoding") for i in range(10000)]
+        expected = "".join(f"obf{i}\n" for i in range(10000))
+        for ext, opener in ((".gz", gzip.open), (".bz2", bz2.open), (".xz", lzma.open)):
+            with self.subTest(ext=ext):
+                with tempfile.NamedTemporaryFile(suffix=".txt" + ext, delete=False) as f:
+                    path = f.name
+                try:
+                    write_text(iter(data), path)  # compression chosen by extension
+                    with opener(path, "rt", encoding="utf-8") as f:
+                        self.assertEqual(f.read(), expected)
+                finally:
+                    os.unlink(path)
+
+    def test_compress_flag_json(self):
+        import gzip
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+            path = f.name
+        try:
+            write_json(iter([("orig", "obf1", "base64", "encoding")]), path, compress="gzip", compress_level=1)
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                self.assertEqual(json.load(f)[0]["obfuscated"], "obf1")
+            with self.assertRaises(ValueError):
+                open_writer("json", path, resume_records=1, compress="gzip")
+        finally:
+            os.unlink(path)
+
+
+    def test_tee_writer(self):
+        tmp = tempfile.mkdtemp()
+        paths = {fmt: os.path.join(tmp, "out." + fmt) for fmt in ("text", "json", "jsonl")}
+        try:
+            engine = ObfuscationEngine(multiplier=6)  # unseeded: outputs only agree if shared
+            writer = TeeWriter([open_writer(fmt, path) for fmt, path in paths.items()])
+            for result in engine.process_stream(iter(["<script>alert(1)</script>", "abc"])):
+                writer.write(result)
+            writer.close()
+            with open(paths["text"], encoding="utf-8") as f:
+                text = f.read().splitlines()
+            with open(paths["json"], encoding="utf-8") as f:
+                as_json = [entry["obfuscated"] for entry in json.load(f)]
+            with open(paths["jsonl"], encoding="utf-8") as f:
+                as_jsonl = [json.loads(line)["obfuscated"] for line in f]
+            self.assertEqual(writer.count, 12)
+            self.assertEqual(text, as_json)
+            self.assertEqual(text, as_jsonl)
+        finally:
+            for path in paths.values():
+                os.unlink(path)
+            os.rmdir(tmp)
+
+
+class TestShardedOutput(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.output = os.path.join(self.tmp, "out.txt")
+        self.results = [
+            ("orig", f"variant{i}", "base64" if i % 3 else "hex_encode", "encoding")
+            for i in range(25)
+        ]
+
+    def tearDown(self):
+        for name in os.listdir(self.tmp):
+            os.unlink(os.path.join(self.tmp, name))
+        os.rmdir(self.tmp)
+
+    def _write(self, **options):
+        writer = ShardedWriter("text", self.output, **options)
+        for result in self.results:
+            writer.write(result)
+        writer.close()
+        with open(manifest_path(self.output), encoding="utf-8") as f:
+            return json.load(f)
+
+    def _read(self, shard):
+        with open(os.path.join(self.tmp, shard["path"]), encoding="utf-8") as f:
+            return f.read()
+
+    def test_roll_by_records(self):
+        manifest = self._write(max_records=10)
+        self.assertEqual(manifest["records"], 25)
+        self.assertEqual([s["records"] for s in manifest["shards"]], [10, 10, 5])
+        self.assertEqual([s["path"] for s in manifest["shards"]],
+                         ["out-00000.txt", "out-00001.txt", "out-00002.txt"])
+        self.assertEqual(manifest["shards"][1]["record_range"], [10, 20])
+        joined = "".join(self._read(s) for s in manifest["shards"])
+        self.assertEqual(joined, "".join(r[1] + "\n" for r in self.results))
+        for shard in manifest["shards"]:
+            start, end = shard["byte_range"]
+            self.assertEqual(joined[start:end], self._read(shard))
+
+    def test_roll_by_bytes(self):
+        manifest = self._write(max_bytes=40)
+        # "variantN\n" is 9-10 bytes: a shard rolls on the record reaching 40 bytes
+        self.assertTrue(all(s["bytes"] < 50 for s in manifest["shards"]))
+        self.assertEqual(sum(s["records"] for s in manifest["shards"]), 25)
+
+    def test_route_by_technique(self):
+        manifest = self._write(shard_by="technique")
+        counts = {s["key"]: s["records"] for s in manifest["shards"]}
+        self.assertEqual(counts, {"hex_encode": 9, "base64": 16})
+        hex_shard = next(s for s in manifest["shards"] if s["key"] == "hex_encode")
+        self.assertEqual(hex_shard["path"], "out.hex_encode.txt")
+        self.assertEqual(self._read(hex_shard).split(), [f"variant{i}" for i in range(0, 25, 3)])
+
+    def _corpus_payloads(self, **options):
+        # Equal one-character originals are one string object; "b" has no variants
+        output = os.path.join(self.tmp, "out.poec")
+        writer = ShardedWriter("corpus", output, **options)
+        for original, n in (("a", 2), ("a", 2), ("b", 0)):
+            results = PayloadResults(original)
+            for i in range(n):
+                results.append(f"{original}{i}", ("base64" if i else "hex_encode", "encoding"))
+            writer.write_results(results)
+        writer.close()
+        with open(manifest_path(output), encoding="utf-8") as f:
+            manifest = json.load(f)
+        shards = {}
+        for shard in manifest["shards"]:
+            with CorpusReader(os.path.join(self.tmp, shard["path"])) as reader:
+                shards[shard["key"], shard["index"]] = [
+                    (reader.payload(k), len(reader.variants_of(k))) for k in range(reader.payload_count)
+                ]
+        return shards
+
+    def test_corpus_shards_keep_payloads(self):
+        self.assertEqual(self._corpus_payloads(), {(None, 0): [("a", 2), ("a", 2), ("b", 0)]})
+        self.assertEqual(
+            self._corpus_payloads(max_records=3),
+            {(None, 0): [("a", 2), ("a", 1)], (None, 1): [("a", 1), ("b", 0)]},
+        )
+        self.assertEqual(
+            self._corpus_payloads(shard_by="technique"),
+            {("hex_encode", 0): [("a", 1), ("a", 1)], ("base64", 0): [("a", 1), ("a", 1)]},
+        )
+
+
+class TestCorpusFormat(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".poec")
+        os.close(fd)
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def test_round_trip_and_random_access(self):
+        engine = ObfuscationEngine(multiplier=5, preserve_original=True)
+        payloads = ["<script>alert(1)</script>", "SELECT 1 -- é", "abc"]
+        results = list(engine.process_stream(iter(payloads)))
+        writer = open_writer("corpus", self.path)
+        for result in results:
+            writer.write(result)
+        writer.close()
+
+        with CorpusReader(self.path) as reader:
+            self.assertEqual(len(reader), len(results))
+            self.assertEqual(reader.payload_count, 3)
+            self.assertEqual(list(reader), results)
+            self.assertEqual(reader[-1], results[-1])
+            variants = reader.variants_of(1)
+            self.assertEqual([reader[n] for n in variants], [r for r in results if r[0] == payloads[1]])
+            payload, technique, _, data = reader.raw_variant(variants[0])
+            self.assertIsInstance(data, memoryview)
+            self.assertEqual(payload, 1)
+            self.assertEqual(reader.techniques[technique], results[variants[0]][2])
+            self.assertEqual(bytes(reader.raw_payload(1)), payloads[1].encode("utf-8"))
+            del data
+            with self.assertRaises(IndexError):
+                reader[len(results)]
+
+    def test_originals_stored_once(self):
+        original = "x" * 1000
+        writer = open_writer("corpus", self.path)
+        for i in range(100):
+            writer.write((original, f"v{i}", "base64", "encoding"))
+        writer.close()
+        self.assertLess(os.path.getsize(self.path), 4000)
+
+    def test_record_per_payload(self):
+        # Equal consecutive lines stay separate payloads; no variants still gets a record
+        engine = ObfuscationEngine(multiplier=2)
+        writer = open_writer("corpus", self.path)
+        for results in engine.iter_results(iter(["abc def", "abc def", "xyz"])):
+            writer.write_results(results)
+        writer.write_results(PayloadResults("empty"))
+        writer.close()
+
+        with CorpusReader(self.path) as reader:
+            self.assertEqual(reader.payload_count, 4)
+            self.assertEqual([reader.payload(k) for k in range(4)], ["abc def", "abc def", "xyz", "empty"])
+            self.assertEqual(len(reader.variants_of(0)), len(reader.variants_of(1)))
+            self.assertEqual(len(reader.variants_of(3)), 0)
+            self.assertEqual(reader.variants_of(2).stop, len(reader))
+            for k in range(3):
+                self.assertTrue(all(reader.raw_variant(n)[0] == k for n in reader.variants_of(k)))
+
+    def test_rejects_other_files(self):
+        with open(self.path, "w") as f:
+            f.write("[]\n" * 20)
+        with self.assertRaises(ValueError):
+            CorpusReader(self.path)
+        with self.assertRaises(ValueError):
+            open_writer("corpus", self.path + ".gz")
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.input = os.path.join(self.tmp, "in.txt")
+        with open(self.input, "w", encoding="utf-8") as f:
+            for i in range(40):
+                f.write(f"<script>alert({i})</script>\n")
+
+    def tearDown(self):
+        for name in os.listdir(self.tmp):
+            os.unlink(os.path.join(self.tmp, name))
+        os.rmdir(self.tmp)
+
+    def _run(self, fmt, output, stop_after=None, resume=False):
+        """Mirror poe.py's pipeline; stop_after simulates the process being killed."""
+        state = None
+        if resume:
+            state = load_checkpoint(output)
+            truncate_output(output, state)
+        engine = ObfuscationEngine(multiplier=5, seed=7)
+        writer = open_writer(fmt, output, state["records"] if state else None)
+        checkpointer = Checkpointer(output, writer, every=6, state=state)
+        offset = state["input_offset"] if state else 0
+        payloads = checkpointer.track(read_payloads_with_offsets(self.input, offset))
+        results = engine.process_stream(payloads, on_payload_done=checkpointer.payload_done)
+        for n, result in enumerate(results):
+            if n == stop_after:
+                writer.fh.close()  # killed: no closing bracket, no checkpoint removal
+                return
+            writer.write(result)
+        writer.close()
+        checkpointer.remove()
+
+    def _assert_resume_matches(self, fmt, load):
+        full = os.path.join(self.tmp, "full")
+        resumed = os.path.join(self.tmp, "resumed")
+        self._run(fmt, full)
+        self._run(fmt, resumed, stop_after=83)
+        self.assertTrue(os.path.exists(resumed + ".ckpt"))
+        self._run(fmt, resumed, resume=True)
+        self.assertFalse(os.path.exists(resumed + ".ckpt"))
+        self.assertEqual(load(resumed), load(full))
+
+    def test_text_resume(self):
+        def load(path):
+            with open(path, encoding="utf-8") as f:
+                return f.read()
+        self._assert_resume_matches("text", load)
+
+    def test_json_resume(self):
+        def load(path):
+            with open(path, encoding="utf-8") as f:
+                return [(r["original"], r["obfuscated"], r["technique"]) for r in json.load(f)]
+        self._assert_resume_matches("json", load)
+
+    def test_jsonl_resume(self):
+        def load(path):
+            with open(path, encoding="utf-8") as f:
+                return [json.loads(line)["obfuscated"] for line in f]
+        self._assert_resume_matches("jsonl", load)
+
+    def test_missing_checkpoint(self):
+        with self.assertRaises(ValueError):
+            load_checkpoint(os.path.join(self.tmp, "nothing"))
+
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".txt")
+        os.close(fd)
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def _read(self):
+        with open(self.path, encoding="utf-8") as f:
+            return f.read()
+
+    def test_matches_synchronous_path(self):
+        payloads = [f"<script>alert({i})</script>" for i in range(600)]
+        write_text(ObfuscationEngine(multiplier=5, seed=3).process_stream(iter(payloads)), self.path)
+        expected = self._read()
+
+        done = []
+        writer = open_writer("text", self.path)
+        timings = run_pipeline(
+            ObfuscationEngine(multiplier=5, seed=3), iter(payloads), writer,
+            batch_size=50, queue_batches=2, on_payload_done=lambda: done.append(writer.count),
+        )
+        writer.close()
+        self.assertEqual(self._read(), expected)
+        self.assertEqual(len(done), 600)
+        self.assertEqual(tuple(timings), STAGES)
+        self.assertEqual(timings["obfuscate"].items, 12)
+
+    def test_stage_error_propagates(self):
+        def payloads():
+            yield "abc"
+            raise RuntimeError("input went away")
+
+        writer = open_writer("text", self.path)
+        with self.assertRaises(RuntimeError):
+            run_pipeline(ObfuscationEngine(multiplier=2), payloads(), writer, batch_size=1)
+        writer.close()
+
+
 class TestPerformance(unittest.TestCase):
     def test_100_payloads_under_5_seconds(self):
         with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False, encoding="utf-8") as f:
@@ -1,6 +1,7 @@
 """Stateless validation functions for POE."""
 
 import os
+from typing import Tuple
 
 
 def validate_file_readable(path: str) -> str:
@@ -21,14 +22,85 @@ def validate_utf8(data: bytes) -> str:
         raise ValueError(f"Input is not valid UTF-8: {e}")
 
 
-def validate_multiplier(value: int) -> int:
+def validate_multiplier(value: int, enumeration: bool = False) -> int:
+    """1-20 variants per payload; enumeration mode lifts the upper limit."""
+    if enumeration:
+        if not isinstance(value, int) or value < 1:
+            raise ValueError(f"Multiplier must be a positive integer, got: {value}")
+        return value
     if not isinstance(value, int) or value < 1 or value > 20:
         raise ValueError(f"Multiplier must be an integer between 1 and 20, got: {value}")
     return value
 
 
+def validate_workers(value: int) -> int:
+    if not isinstance(value, int) or value < 1:
+        raise ValueError(f"Workers must be a positive integer, got: {value}")
+    return value
+
+
+def validate_cache_size(value: int) -> int:
+    if not isinstance(value, int) or value < 0:
+        raise ValueError(f"Cache size must be a non-negative number of MB, got: {value}")
+    return value
+
+
+def validate_checkpoint_every(value: int) -> int:
+    if not isinstance(value, int) or value < 0:
+        raise ValueError(f"Checkpoint interval must be a non-negative payload count, got: {value}")
+    return value
+
+
+def validate_compress_level(method: str, value: int) -> int:
+    lowest = 0 if method == "xz" else 1
+    if not isinstance(value, int) or value < lowest or value > 9:
+        raise ValueError(f"Compression level for {method} must be {lowest}-9, got: {value}")
+    return value
+
+
+_SIZE_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+
+def validate_size(value: str) -> int:
+    """Parse a byte size such as 500000, 64K, 100M or 2G."""
+    text = str(value).strip().upper()
+    if text.endswith("B"):
+        text = text[:-1]
+    unit = text[-1:] if text[-1:] in _SIZE_UNITS else ""
+    number = text[:-1] if unit else text
+    if not number.isdigit() or int(number) < 1:
+        raise ValueError(f"Size must be a positive number of bytes (e.g. 500000, 64K, 100M), got: {value}")
+    return int(number) * _SIZE_UNITS[unit]
+
+
+def validate_shard_records(value: int) -> int:
+    if not isinstance(value, int) or value < 1:
+        raise ValueError(f"Shard size must be a positive record count, got: {value}")
+    return value
+
+
+def validate_fp_rate(value: float) -> float:
+    if not isinstance(value, (int, float)) or not 0 < value < 1:
+        raise ValueError(f"False-positive rate must be between 0 and 1 (exclusive), got: {value}")
+    return float(value)
+
+
+def validate_similarity(value: float) -> float:
+    if not isinstance(value, (int, float)) or not 0 < value <= 1:
+        raise ValueError(f"Similarity threshold must be in (0, 1], got: {value}")
+    return float(value)
+
+
+def validate_tee(spec: str) -> Tuple[str, str]:
+    """Parse a --tee FORMAT:PATH spec."""
+    fmt, sep, path = spec.partition(":")
+    if not sep or not path:
+        raise ValueError(f"Tee output must be FORMAT:PATH, got: {spec}")
+    return validate_format(fmt), path
+
+
 def validate_format(fmt: str) -> str:
     fmt = fmt.lower().strip()
-    if fmt not in ("text", "json"):
-        raise ValueError(f"Unsupported format: {fmt}. Use 'text' or 'json'.")
+    if fmt not in ("text", "json", "jsonl", "corpus"):
+        raise ValueError(f"Unsupported format: {fmt}. Use 'text', 'json', 'jsonl' or 'corpus'.")
     return fmt